@@ -28,7 +28,7 @@
     'website': "https://www.yourcompany.com",
 
     'category': 'Project',  # Plus approprié que 'Uncategorized'
-    'version': '1.0.0',
+    'version': '1.3.0',
 
     # Dépendances nécessaires
     'depends': [
@@ -52,6 +52,21 @@
         'views/cd_ref_workflow.xml',
         'views/work_program_view.xml',
         'views/hr_department_view.xml',
+        'views/work_program_import_view.xml',
+        'views/workflow_name_dedup_view.xml',
+        'views/work_program_workload_view.xml',
+        'views/work_program_kpi_view.xml',
+        'views/work_program_submission_view.xml',
+        'views/work_program_tracking_archive_view.xml',
+        'views/work_program_profile_view.xml',
+        'views/work_program_rollover_view.xml',
+        'views/workflow_consistency_view.xml',
+        'views/work_program_export_view.xml',
+        'views/work_program_archive_view.xml',
+        'views/work_program_scheduler_view.xml',
+
+        # Données
+        'data/work_program_cron.xml',
         # Templates en dernier
         'views/templates.xml',
         'views/work_program_layout_controller.xml',
@@ -1,39 +1,29 @@
 # -*- coding: utf-8 -*-
-from odoo import http
-from odoo.http import request
+from datetime import date
+
+from odoo import api, http
+from odoo.http import request, content_disposition
+
+from ..models.work_program_profiling import profiled
 
 
 class WorkProgramController(http.Controller):
 
     @http.route('/work_program/form', type='http', auth='public', website=True)
+    @profiled('controller.work_program_form')
     def work_program_form(self):
         """
         Affiche le formulaire pour créer un programme de travail.
-        Récupère toutes les données nécessaires du backend pour les menus déroulants.
-        """
-        # Utilisation de sudo() pour accéder aux modèles avec les droits de super-utilisateur,
-        # ce qui est courant pour les pages publiques.
-        employees = request.env['hr.employee'].sudo().search([])
-        projects = request.env['project.project'].sudo().search([])
-        activities = request.env['workflow.activity'].sudo().search([])
-        procedures = request.env['workflow.procedure'].sudo().search([])
-        task_descriptions = request.env['workflow.task.formulation'].sudo().search([])
-        deliverables = request.env['workflow.deliverable'].sudo().search([])
-        departments = request.env['hr.department'].sudo().search([])
-
+        Les listes déroulantes volumineuses (employés, projets, activités, procédures,
+        formulations, livrables, départements) ne sont plus rendues dans la page :
+        elles sont chargées à la demande via /work_program/lookup.
+        """
         # Récupération des listes de sélection directement depuis le modèle
         priorities = request.env['work.program']._fields['priority'].selection
         complexities = request.env['work.program']._fields['complexity'].selection
         satisfaction_levels = request.env['work.program']._fields['satisfaction_level'].selection
 
         values = {
-            'employees': employees,
-            'projects': projects,
-            'activities': activities,
-            'procedures': procedures,
-            'task_descriptions': task_descriptions,
-            'deliverables': deliverables,
-            'departments': departments,
             'priorities': priorities,
             'complexities': complexities,
             'satisfaction_levels': satisfaction_levels,
@@ -42,51 +32,88 @@ class WorkProgramController(http.Controller):
         # Rendre le template du formulaire
         return request.render('workprogramm.work_program_form_template', values)
 
+    @http.route('/work_program/lookup/<string:model_key>', type='json', auth='public', website=True)
+    @profiled('controller.work_program_lookup')
+    def work_program_lookup(self, model_key, term='', offset=0, limit=20):
+        """
+        Recherche paginée par préfixe pour les listes déroulantes du formulaire.
+        Retourne {'results': [{'id': ..., 'name': ...}], 'more': bool}.
+        """
+        return request.env['work.program.lookup'].sudo().lookup(model_key, term=term, offset=offset, limit=limit)
+
+    @http.route('/work_program/cascade/<int:activity_id>', type='json', auth='public', website=True)
+    @profiled('controller.work_program_cascade')
+    def work_program_cascade(self, activity_id):
+        """
+        Retourne en un seul appel les procédures (avec leurs formulations de tâches)
+        et les livrables dépendant de l'activité sélectionnée.
+        """
+        return request.env['work.program.cascade'].sudo().get_activity_subtree(activity_id)
+
+    def _prepare_work_program_vals(self, post, form):
+        """
+        Convertit les données du formulaire en valeurs pour work.program.
+        """
+        # Récupère les IDs des champs many2one
+        project_id = int(post.get('project_id')) if post.get('project_id') else False
+        activity_id = int(post.get('activity_id')) if post.get('activity_id') else False
+        procedure_id = int(post.get('procedure_id')) if post.get('procedure_id') else False
+        task_description_id = int(post.get('task_description_id')) if post.get('task_description_id') else False
+        responsible_id = int(post.get('responsible_id')) if post.get('responsible_id') else False
+        department_id = int(post.get('work_programm_department_id')) if post.get('work_programm_department_id') else False
+
+        # Récupération des IDs des champs many2many
+        # CORRECTION CLÉ : Utilisation de form.getlist() pour les champs multiples
+        deliverable_ids_list = [int(d) for d in form.getlist('deliverable_ids')]
+        support_ids_list = [int(s) for s in form.getlist('support_ids')]
+
+        # Prépare les valeurs pour la création de l'enregistrement
+        vals = {
+            'project_id': project_id,
+            'activity_id': activity_id,
+            'procedure_id': procedure_id,
+            'task_description_id': task_description_id,
+            'inputs_needed': post.get('inputs_needed'),
+            'responsible_id': responsible_id,
+            'deliverable_ids': [(6, 0, deliverable_ids_list)],
+            'support_ids': [(6, 0, support_ids_list)],
+            'work_programm_department_id': department_id,
+            'my_month': post.get('my_month'),
+            'my_week_of': post.get('my_week_of'),
+            'priority': post.get('priority'),
+            'complexity': post.get('complexity'),
+            'assignment_date': post.get('assignment_date'),
+            'duration_effort': float(post.get('duration_effort') or 0.0),
+            'initial_deadline': post.get('initial_deadline'),
+            'nb_postpones': int(post.get('nb_postpones') or 0),
+            'actual_deadline': post.get('actual_deadline'),
+            'completion_percentage': float(post.get('completion_percentage') or 0.0),
+            'satisfaction_level': post.get('satisfaction_level'),
+            'comments': post.get('comments'),
+            'champ1': post.get('champ1'),
+            'champ2': post.get('champ2'),
+        }
+        return vals
+
     @http.route('/work_program/submit', type='http', auth='public', website=True, methods=['POST'])
+    @profiled('controller.work_program_submit')
     def work_program_submit(self, **post):
         """
         Traite les données du formulaire soumis.
+        En mode tamponné (paramètre système ``workprogramm.submit_buffered``), la
+        soumission est seulement validée et mise en file ; le programme est créé par
+        la tâche planifiée et l'utilisateur reçoit une adresse de suivi.
         """
         try:
-            # Récupère les IDs des champs many2one
-            project_id = int(post.get('project_id')) if post.get('project_id') else False
-            activity_id = int(post.get('activity_id')) if post.get('activity_id') else False
-            procedure_id = int(post.get('procedure_id')) if post.get('procedure_id') else False
-            task_description_id = int(post.get('task_description_id')) if post.get('task_description_id') else False
-            responsible_id = int(post.get('responsible_id')) if post.get('responsible_id') else False
-            department_id = int(post.get('work_programm_department_id')) if post.get('work_programm_department_id') else False
-
-            # Récupération des IDs des champs many2many
-            # CORRECTION CLÉ : Utilisation de request.httprequest.form.getlist() pour les champs multiples
-            deliverable_ids_list = [int(d) for d in request.httprequest.form.getlist('deliverable_ids')]
-            support_ids_list = [int(s) for s in request.httprequest.form.getlist('support_ids')]
-
-            # Prépare les valeurs pour la création de l'enregistrement
-            vals = {
-                'project_id': project_id,
-                'activity_id': activity_id,
-                'procedure_id': procedure_id,
-                'task_description_id': task_description_id,
-                'inputs_needed': post.get('inputs_needed'),
-                'responsible_id': responsible_id,
-                'deliverable_ids': [(6, 0, deliverable_ids_list)],
-                'support_ids': [(6, 0, support_ids_list)],
-                'work_programm_department_id': department_id,
-                'my_month': post.get('my_month'),
-                'my_week_of': post.get('my_week_of'),
-                'priority': post.get('priority'),
-                'complexity': post.get('complexity'),
-                'assignment_date': post.get('assignment_date'),
-                'duration_effort': float(post.get('duration_effort') or 0.0),
-                'initial_deadline': post.get('initial_deadline'),
-                'nb_postpones': int(post.get('nb_postpones') or 0),
-                'actual_deadline': post.get('actual_deadline'),
-                'completion_percentage': float(post.get('completion_percentage') or 0.0),
-                'satisfaction_level': post.get('satisfaction_level'),
-                'comments': post.get('comments'),
-                'champ1': post.get('champ1'),
-                'champ2': post.get('champ2'),
-            }
+            vals = self._prepare_work_program_vals(post, request.httprequest.form)
+
+            Submission = request.env['work.program.submission'].sudo()
+            if Submission.is_buffered():
+                submission = Submission.enqueue(vals)
+                return request.render('workprogramm.work_program_success_template', {
+                    'submission': submission,
+                    'status_url': f'/work_program/submit/status/{submission.token}',
+                })
 
             # Crée l'enregistrement dans Odoo
             new_record = request.env['work.program'].sudo().create(vals)
@@ -96,4 +123,56 @@ class WorkProgramController(http.Controller):
 
         except Exception as e:
             # Gérer les erreurs et afficher un message approprié
-            return request.render('workprogramm.work_program_error_template', {'error_message': str(e)})
\ No newline at end of file
+            return request.render('workprogramm.work_program_error_template', {'error_message': str(e)})
+
+    @http.route('/work_program/submit/status/<string:token>', type='http', auth='public', website=True)
+    @profiled('controller.work_program_submit_status')
+    def work_program_submit_status(self, token):
+        """
+        Statut d'une soumission mise en file : {'state': ..., 'label': ..., 'error': ...}.
+        """
+        return request.make_json_response(request.env['work.program.submission'].sudo().get_status(token))
+
+    @http.route('/work_program/export', type='http', auth='user', methods=['GET'])
+    @profiled('controller.work_program_export')
+    def work_program_export(self, file_format='csv', department_ids='', week_from=None, week_to=None, statuses=''):
+        """
+        Export en flux des programmes de travail au format du fichier d'import.
+        Le fichier est produit par paquets pendant l'envoi de la réponse, avec un
+        curseur propre au flux (celui de la requête est fermé au retour de la route).
+        """
+        if file_format not in ('csv', 'xlsx'):
+            return request.not_found()
+        request.env['work.program'].check_access_rights('read')
+        filters = {
+            'department_ids': [int(value) for value in department_ids.split(',') if value.strip().isdigit()],
+            'week_from': week_from or None,
+            'week_to': week_to or None,
+            'statuses': [value for value in statuses.split(',') if value],
+        }
+        registry, uid, context = request.env.registry, request.env.uid, dict(request.env.context)
+
+        def generate():
+            with registry.cursor() as cr:
+                env = api.Environment(cr, uid, context)
+                yield from env['work.program.export'].stream(file_format, **filters)
+
+        content_type = {
+            'csv': 'text/csv; charset=utf-8',
+            'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+        }[file_format]
+        filename = f"programmes_de_travail_{date.today().isoformat()}.{file_format}"
+        return request.make_response(generate(), headers=[
+            ('Content-Type', content_type),
+            ('Content-Disposition', content_disposition(filename)),
+        ])
+
+    @http.route('/work_program/changes/<string:model_key>', type='json', auth='user')
+    @profiled('controller.work_program_changes')
+    def work_program_changes(self, model_key, cursor=None, limit=500):
+        """
+        Flux de modifications (programmes ou catalogue workflow.*) depuis ``cursor``.
+        Retourne {'records', 'deleted', 'cursor', 'has_more', 'reset'} ; rappeler avec
+        le curseur retourné tant que ``has_more`` est vrai.
+        """
+        return request.env['work.program.change.feed'].get_changes(model_key, cursor=cursor, limit=limit)
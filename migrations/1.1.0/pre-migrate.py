@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+import logging
+
+_logger = logging.getLogger(__name__)
+
+MONTH_KEYS = ['january', 'february', 'march', 'april', 'may', 'june', 'july',
+              'august', 'september', 'october', 'november', 'december']
+FRENCH_MONTHS = ['janvier', 'février', 'mars', 'avril', 'mai', 'juin', 'juillet',
+                 'août', 'septembre', 'octobre', 'novembre', 'décembre']
+
+
+def migrate(cr, version):
+    """
+    - my_week_of : sélection de chaînes 'AAAA-MM-JJ' -> colonne date (lundi de la semaine).
+    - my_month : noms de mois traduits -> clés stables ('january' ... 'december').
+    """
+    if not version:
+        return
+
+    cr.execute("""
+        SELECT data_type FROM information_schema.columns
+         WHERE table_name = 'work_program' AND column_name = 'my_week_of'
+    """)
+    row = cr.fetchone()
+    if row and row[0] != 'date':
+        cr.execute(r"""
+            ALTER TABLE work_program
+            ALTER COLUMN my_week_of TYPE date
+            USING CASE WHEN my_week_of ~ '^\d{4}-\d{2}-\d{2}$' THEN my_week_of::date END
+        """)
+        cr.execute("""
+            UPDATE work_program
+               SET my_week_of = my_week_of - (EXTRACT(ISODOW FROM my_week_of)::int - 1)
+             WHERE my_week_of IS NOT NULL AND EXTRACT(ISODOW FROM my_week_of) <> 1
+        """)
+        _logger.info("work_program.my_week_of converti en date (%s lignes réalignées sur le lundi)", cr.rowcount)
+
+    mapping = {}
+    for index, key in enumerate(MONTH_KEYS):
+        mapping[key] = key
+        mapping[FRENCH_MONTHS[index]] = key
+        mapping[FRENCH_MONTHS[index].replace('é', 'e').replace('û', 'u')] = key
+        mapping[str(index + 1)] = key
+        mapping['%02d' % (index + 1)] = key
+    cr.execute("""
+        UPDATE work_program w
+           SET my_month = m.key
+          FROM (SELECT * FROM unnest(%s::varchar[], %s::varchar[])) AS m(label, key)
+         WHERE lower(trim(w.my_month)) = m.label
+           AND w.my_month IS DISTINCT FROM m.key
+    """, [list(mapping), list(mapping.values())])
+    _logger.info("work_program.my_month : %s valeurs converties en clés stables", cr.rowcount)
+    cr.execute("""
+        UPDATE work_program SET my_month = NULL
+         WHERE my_month IS NOT NULL AND my_month <> ALL(%s::varchar[])
+    """, [MONTH_KEYS])
+    if cr.rowcount:
+        _logger.warning("work_program.my_month : %s valeurs non reconnues ont été vidées", cr.rowcount)
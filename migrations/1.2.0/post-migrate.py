@@ -0,0 +1,31 @@
+# -*- coding: utf-8 -*-
+import logging
+
+from odoo import api, SUPERUSER_ID
+
+_logger = logging.getLogger(__name__)
+
+NATURAL_KEY_MODELS = [
+    'workflow.domain',
+    'workflow.process',
+    'workflow.subprocess',
+    'workflow.activity',
+    'workflow.procedure',
+    'workflow.deliverable',
+    'workflow.task.formulation',
+]
+
+
+def migrate(cr, version):
+    """
+    Les contraintes name_uniq n'ont pas pu être créées tant que des doublons
+    existaient : ceux-ci sont fusionnés (références redirigées) puis les
+    contraintes sont recréées.
+    """
+    if not version:
+        return
+    env = api.Environment(cr, SUPERUSER_ID, {})
+    for model_name in NATURAL_KEY_MODELS:
+        merged = env[model_name]._enforce_name_uniqueness()
+        if merged:
+            _logger.info("%s : %s doublon(s) fusionné(s) avant application de name_uniq", model_name, merged)
@@ -0,0 +1,14 @@
+# -*- coding: utf-8 -*-
+
+# Gabarits repassés en mise à jour par pre-migrate
+UPDATED_TEMPLATES = ['work_program_form_template']
+
+
+def migrate(cr, version):
+    """Rétablit la protection noupdate des gabarits réécrits par le chargement du module."""
+    if not version:
+        return
+    cr.execute("""
+        UPDATE ir_model_data SET noupdate = true
+         WHERE module = 'workprogramm' AND model = 'ir.ui.view' AND name = ANY(%s)
+    """, [UPDATED_TEMPLATES])
@@ -0,0 +1,22 @@
+# -*- coding: utf-8 -*-
+import logging
+
+_logger = logging.getLogger(__name__)
+
+# Gabarits déclarés noupdate dont l'arch a changé (listes chargées à la demande)
+UPDATED_TEMPLATES = ['work_program_form_template']
+
+
+def migrate(cr, version):
+    """
+    Le formulaire public ne génère plus toutes les options des listes : les
+    gabarits noupdate sont repassés en mise à jour pour que le chargement du
+    module réécrive leur arch (la protection est rétablie par post-migrate).
+    """
+    if not version:
+        return
+    cr.execute("""
+        UPDATE ir_model_data SET noupdate = false
+         WHERE module = 'workprogramm' AND model = 'ir.ui.view' AND name = ANY(%s) AND noupdate
+    """, [UPDATED_TEMPLATES])
+    _logger.info("%s gabarit(s) du formulaire public réinitialisé(s)", cr.rowcount)
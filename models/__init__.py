@@ -1,6 +1,25 @@
 # -*- coding: utf-8 -*-
 
 from . import models
-from . import work_program
+from . import work_program_lookup
+from . import work_program_cascade
+from . import work_program_profiling
+from . import workflow_reference_cache
+from . import work_program_change_feed
+from . import workflow_name_key
 from . import cd_ref_workflow
-from  .import hr_department_extension
\ No newline at end of file
+from . import work_program
+from  .import hr_department_extension
+from . import work_program_import
+from . import workflow_name_dedup
+from . import work_program_archive
+from . import work_program_workload
+from . import work_program_kpi
+from . import work_program_submission
+from . import work_program_tracking_archive
+from . import work_program_access
+from . import work_program_rollover
+from . import workflow_consistency
+from . import work_program_export
+from . import work_program_text_search
+from . import work_program_scheduler
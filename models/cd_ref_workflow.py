@@ -1,17 +1,171 @@
 # -*- coding: utf-8 -*-
 import logging
-from odoo import models, api, fields
+from collections import defaultdict
+
+from odoo import models, api, fields, tools, _
 from odoo.exceptions import UserError, ValidationError
 
+from .work_program_profiling import profiled
+
 _logger = logging.getLogger(__name__)
 
+# --- MIXIN clé naturelle (nom) ---
+class WorkflowNaturalKeyMixin(models.AbstractModel):
+    """
+    Couche d'index sur le nom, utilisé comme clé naturelle par les imports et les
+    recherches : index btree (égalité, ``IN``) via ``index=True`` et index trigramme
+    (``ilike``) lorsque l'extension pg_trgm est disponible. Fournit aussi la fusion
+    des doublons de nom, préalable à la contrainte d'unicité.
+    """
+    _name = 'workflow.natural.key.mixin'
+    _description = 'Clé naturelle (nom) des cadres de référence'
+
+    def init(self):
+        super().init()
+        if not self._abstract and getattr(self.pool, 'has_trigram', False):
+            tools.create_index(self.env.cr, f'{self._table}_name_trgm_index', self._table,
+                               ['(name::text) gin_trgm_ops'], method='gin')
+
+    @api.model
+    def _get_name_duplicates(self):
+        """Groupes d'identifiants partageant le même nom, le plus ancien en premier."""
+        self.flush_model(['name'])
+        self.env.cr.execute(f"""
+            SELECT array_agg(id ORDER BY id) FROM "{self._table}"
+             WHERE name IS NOT NULL
+             GROUP BY name HAVING count(*) > 1
+        """)
+        return [ids for (ids,) in self.env.cr.fetchall()]
+
+    @api.model
+    def _get_reference_columns(self):
+        """
+        Champs many2one ``(modèle, table, colonne)`` et many2many ``(modèle, champ,
+        table de relation, colonne, autre colonne)`` pointant vers ce modèle, pour
+        tout le registre.
+        """
+        many2one_columns = set()
+        many2many_columns = set()
+        for model in self.env.registry.values():
+            if model._abstract or not model._auto:
+                continue
+            for field in model._fields.values():
+                if not field.store or field.comodel_name != self._name:
+                    continue
+                if field.type == 'many2one':
+                    many2one_columns.add((model._name, model._table, field.name))
+                elif field.type == 'many2many':
+                    many2many_columns.add((model._name, field.name, field.relation, field.column2, field.column1))
+        return many2one_columns, many2many_columns
+
+    @api.model
+    def _merge_duplicate_names(self):
+        """
+        Fusionne les enregistrements de même nom sur le plus ancien : les clés
+        étrangères (many2one, many2many, pièces jointes, identifiants externes) sont
+        redirigées en une requête par colonne, puis les doublons supprimés. Les
+        champs stockés qui en dépendent (hiérarchie, chemin) sont recalculés sur les
+        enregistrements redirigés, ainsi que la recherche plein texte et les
+        indicateurs des programmes concernés.
+        Retourne le nombre d'enregistrements supprimés.
+        """
+        groups = self._get_name_duplicates()
+        if not groups:
+            return 0
+        duplicate_ids = [dup for ids in groups for dup in ids[1:]]
+        keep_ids = [ids[0] for ids in groups for dummy in ids[1:]]
+        mapping_sql = "(SELECT unnest(%s::int[]) AS dup, unnest(%s::int[]) AS keep)"
+        params = [duplicate_ids, keep_ids]
+        self.env.flush_all()
+        cr = self.env.cr
+
+        many2one_columns, many2many_columns = self._get_reference_columns()
+        # (modèle, champ) -> ids des enregistrements redirigés
+        repointed = defaultdict(set)
+        Program = self.env['work.program']
+        Kpi = self.env['work.program.kpi']
+        cr.execute(f"""
+            SELECT id FROM work_program
+             WHERE {' OR '.join(f'"{column}" = ANY(%(dups)s)' for model_name, table, column in many2one_columns
+                                if model_name == Program._name) or 'false'}
+        """, {'dups': duplicate_ids})
+        program_ids = [row[0] for row in cr.fetchall()]
+        kpi_before = Kpi._get_contributions(Program.browse(program_ids))
+        for model_name, table, column in sorted(many2one_columns):
+            cr.execute(f"""
+                UPDATE "{table}" t SET "{column}" = m.keep
+                  FROM {mapping_sql} m
+                 WHERE t."{column}" = m.dup
+             RETURNING t.id
+            """, params)
+            repointed[(model_name, column)].update(row[0] for row in cr.fetchall())
+        for model_name, field_name, relation, column, other_column in sorted(many2many_columns):
+            cr.execute(f'SELECT DISTINCT "{other_column}" FROM "{relation}" WHERE "{column}" = ANY(%s)',
+                       [duplicate_ids])
+            repointed[(model_name, field_name)].update(row[0] for row in cr.fetchall())
+            cr.execute(f"""
+                INSERT INTO "{relation}" ("{other_column}", "{column}")
+                SELECT DISTINCT r."{other_column}", m.keep
+                  FROM "{relation}" r JOIN {mapping_sql} m ON r."{column}" = m.dup
+                ON CONFLICT DO NOTHING
+            """, params)
+            cr.execute(f"""
+                DELETE FROM "{relation}" r USING {mapping_sql} m WHERE r."{column}" = m.dup
+            """, params)
+        for table in ('ir_attachment', 'ir_model_data'):
+            res_column = 'res_model' if table == 'ir_attachment' else 'model'
+            cr.execute(f"""
+                UPDATE "{table}" t SET res_id = m.keep
+                  FROM {mapping_sql} m
+                 WHERE t.{res_column} = %s AND t.res_id = m.dup
+            """, params + [self._name])
+
+        self.env.invalidate_all()
+        for (model_name, field_name), ids in repointed.items():
+            if ids:
+                self.env[model_name].browse(ids).modified([field_name])
+        self.browse(duplicate_ids).unlink()
+        self.env.flush_all()
+        if program_ids:
+            Program._update_search_vector(program_ids)
+            self.env.invalidate_all()
+            Kpi._apply_contributions(kpi_before, Kpi._get_contributions(Program.browse(program_ids)))
+        _logger.info(f"{self._name}: {len(duplicate_ids)} duplicate(s) merged into {len(groups)} record(s)")
+        return len(duplicate_ids)
+
+    @api.model
+    def _enforce_name_uniqueness(self):
+        """Fusionne les doublons puis (re)crée les contraintes SQL, dont name_uniq."""
+        merged = self._merge_duplicate_names()
+        self._add_sql_constraints()
+        return merged
+
+
+# --- MIXIN chemin hiérarchique matérialisé ---
+class WorkflowHierarchyPathMixin(models.AbstractModel):
+    """
+    Chemin hiérarchique matérialisé ``domaine/processus/sous-processus/activité/``
+    (identifiants) permettant des recherches par préfixe sur un index
+    ``text_pattern_ops``, par ex. ``[('hierarchy_path', '=like', '12/%')]``.
+    """
+    _name = 'workflow.hierarchy.path.mixin'
+    _description = 'Chemin hiérarchique matérialisé'
+
+    def init(self):
+        super().init()
+        if not self._abstract and 'hierarchy_path' in self._fields and self._fields['hierarchy_path'].store:
+            tools.create_index(self.env.cr, f'{self._table}_hierarchy_path_index', self._table,
+                               ['hierarchy_path text_pattern_ops'])
+
+
 # --- MODÈLE workflow.hierarchy ---
 class WorkflowHierarchy(models.Model):
     _name = 'workflow.hierarchy'
+    _inherit = ['workflow.natural.key.mixin']
     _description = 'Gestion de la hiérarchie Domaine-Processus-Activité (Many2many)'
 
-    name = fields.Char(string='Nom de l\'entrée hiérarchique', required=True, default='Nouvelle entrée')
-    department_id = fields.Many2one('hr.department', string='Department')
+    name = fields.Char(string='Nom de l\'entrée hiérarchique', required=True, default='Nouvelle entrée', index=True)
+    department_id = fields.Many2one('hr.department', string='Department', index=True)
     domain_ids = fields.Many2many('workflow.domain', string='Domaines')
     process_ids = fields.Many2many('workflow.process', string='Processus')
     sub_process_ids = fields.Many2many('workflow.subprocess', string='Sous-processus')
@@ -49,6 +203,22 @@ class WorkflowHierarchy(models.Model):
         if self.allowed_department_ids and not self.department_id:
             self.department_id = self.allowed_department_ids[0]
 
+    @api.model
+    def _get_reference_ids(self, model_name, names):
+        """
+        {nom: id} des enregistrements existants : à l'identique (via le cache des noms
+        de référence si possible) puis par clé de nom normalisée. Un nom ambigu est
+        associé au tuple des ids correspondants.
+        """
+        if 'name_key' in self.env[model_name]._fields:
+            return self.env[model_name]._resolve_names(names)
+        if model_name in self.env['workflow.reference.cache'].CACHED_MODELS:
+            return self.env['workflow.reference.cache'].get_ids(model_name, names)
+        name_map = {}
+        for record in self.env[model_name].search_read([('name', 'in', list(set(names)))], ['name'], order='id'):
+            name_map.setdefault(record['name'], record['id'])
+        return name_map
+
     @api.model
     def _find_or_create_m2m_records(self, model_name, field_name_in_row):
         """
@@ -59,8 +229,12 @@ class WorkflowHierarchy(models.Model):
         if not names_str:
             return [(5, 0, 0)]
         names = [name.strip() for name in names_str.split(',') if name.strip()]
+        name_map = self._get_reference_ids(model_name, names)
         for name in names:
-            record = self.env[model_name].search([('name', '=', name)], limit=1)
+            if isinstance(name_map.get(name), tuple):
+                _logger.warning(f"Ambiguous {model_name} '{name}' matches ids {name_map[name]}, skipped")
+                continue
+            record = self.env[model_name].browse(name_map.get(name))
             if not record:
                 _logger.info(f"Creating new {model_name}: {name}")
                 try:
@@ -71,39 +245,178 @@ class WorkflowHierarchy(models.Model):
             record_ids.append(record.id)
         return [(6, 0, record_ids)]
 
+    # Colonnes du fichier d'import : colonne -> (modèle de référence, champ Many2many)
+    _IMPORT_M2M_COLUMNS = {
+        'domain': ('workflow.domain', 'domain_ids'),
+        'process': ('workflow.process', 'process_ids'),
+        'sub_process': ('workflow.subprocess', 'sub_process_ids'),
+        'activity': ('workflow.activity', 'activity_ids'),
+        'procedure': ('workflow.procedure', 'procedure_ids'),
+        'deliverable': ('workflow.deliverable', 'deliverable_ids'),
+        'task_formulation': ('workflow.task.formulation', 'task_formulation_ids'),
+    }
+
     @api.model
+    def _split_import_names(self, names_str):
+        return [name.strip() for name in (names_str or '').split(',') if name.strip()]
+
+    @api.model
+    def _find_or_create_names_bulk(self, model_name, names):
+        """
+        Version ensembliste de _find_or_create_m2m_records : les noms existants sont
+        résolus en bloc (à l'identique puis par clé de nom normalisée) et les manquants
+        créés en un seul ``create`` multi-enregistrements, une fois par clé : « Procédure
+        A » et « procedure a » donnent un seul enregistrement. Un nom ambigu n'est pas
+        créé. Retourne {nom: id ou tuple d'ids si ambigu}.
+        """
+        names = set(names)
+        if not names:
+            return {}
+        Model = self.env[model_name]
+        name_map = self._get_reference_ids(model_name, names)
+        missing = sorted(names - set(name_map))
+        aliases = {}
+        if missing and 'name_key' in Model._fields:
+            # Une seule création par clé ; les autres graphies pointent vers le même enregistrement
+            name_keys = Model._get_name_keys(missing)
+            first_by_key = {}
+            for name in missing:
+                key = name_keys.get(name) or name
+                if key in first_by_key:
+                    aliases[name] = first_by_key[key]
+                else:
+                    first_by_key[key] = name
+            missing = sorted(first_by_key.values())
+        if missing:
+            _logger.info(f"Creating {len(missing)} new {model_name} record(s)")
+            try:
+                with self.env.cr.savepoint():
+                    created = Model.create([{'name': name} for name in missing])
+                name_map.update(zip(missing, created.ids))
+            except Exception as e:
+                _logger.error(f"Bulk creation of {model_name} failed, falling back to one by one: {e}", exc_info=True)
+                for name in missing:
+                    try:
+                        with self.env.cr.savepoint():
+                            name_map[name] = Model.create({'name': name}).id
+                    except Exception as e:
+                        _logger.error(f"Failed to create {model_name} '{name}': {e}", exc_info=True)
+        for name, first_name in aliases.items():
+            if first_name in name_map:
+                name_map[name] = name_map[first_name]
+        return name_map
+
+    @api.model
+    def _prepare_hierarchy_vals(self, row, name_maps):
+        hierarchy_name = row.get('name', 'Nouvelle entrée')
+        vals = {'name': hierarchy_name}
+        for column, (model_name, field_name) in self._IMPORT_M2M_COLUMNS.items():
+            name_map = name_maps.get(model_name, {})
+            names = self._split_import_names(row.get(column))
+            self.env[model_name]._check_ambiguous_names(name_map, names)
+            if names:
+                vals[field_name] = [(6, 0, [name_map[name] for name in names if name in name_map])]
+            else:
+                vals[field_name] = [(5, 0, 0)]
+        if 'notes' in row:
+            vals['notes'] = row['notes']
+        vals['active'] = row.get('active', '1') == '1'
+        return vals
+
+    @api.model
+    @profiled('workflow.hierarchy.import_hierarchies')
+    def import_hierarchies(self, rows):
+        """
+        Import ensembliste de lignes de hiérarchie.
+
+        Les noms distincts de chaque modèle de référence sont collectés sur tout le
+        fichier, les existants lus en une requête par modèle, les manquants créés en
+        un seul ``create`` par modèle; les entrées de hiérarchie sont ensuite créées
+        en un seul ``create`` et mises à jour par ``write``.
+        Retourne un rapport par ligne ``{'row', 'name', 'status', 'id', 'message'}``.
+        """
+        rows = list(rows)
+        names_by_model = {}
+        for row in rows:
+            for column, (model_name, dummy) in self._IMPORT_M2M_COLUMNS.items():
+                names_by_model.setdefault(model_name, set()).update(self._split_import_names(row.get(column)))
+        name_maps = {
+            model_name: self._find_or_create_names_bulk(model_name, names)
+            for model_name, names in names_by_model.items()
+        }
+
+        report = []
+        to_create = {}
+        to_write = {}
+        hierarchy_names = {row.get('name', 'Nouvelle entrée') for row in rows}
+        existing = {}
+        for entry in self.search([('name', 'in', list(hierarchy_names))], order='id'):
+            existing.setdefault(entry.name, entry)
+        for index, row in enumerate(rows):
+            hierarchy_name = row.get('name', 'Nouvelle entrée')
+            line = {'row': index, 'name': hierarchy_name, 'status': False, 'id': False, 'message': ''}
+            report.append(line)
+            try:
+                vals = self._prepare_hierarchy_vals(row, name_maps)
+            except Exception as e:
+                _logger.error(f"Error importing workflow hierarchy row: {row}. Error: {e}", exc_info=True)
+                line.update(status='error', message=str(e))
+                continue
+            # Les doublons de nom dans le fichier sont fusionnés : la dernière ligne l'emporte.
+            if hierarchy_name in existing:
+                line.update(status='updated', id=existing[hierarchy_name].id)
+                to_write.setdefault(hierarchy_name, ([], {}))[0].append(index)
+                to_write[hierarchy_name][1].update(vals)
+            else:
+                line['status'] = 'created'
+                to_create.setdefault(hierarchy_name, ([], {}))[0].append(index)
+                to_create[hierarchy_name][1].update(vals)
+
+        for hierarchy_name, (indexes, vals) in to_write.items():
+            try:
+                with self.env.cr.savepoint():
+                    existing[hierarchy_name].write(vals)
+            except Exception as e:
+                _logger.error(f"Error updating workflow hierarchy entry {hierarchy_name}: {e}", exc_info=True)
+                for index in indexes:
+                    report[index].update(status='error', message=str(e))
+
+        if to_create:
+            _logger.info(f"Creating {len(to_create)} new workflow hierarchy entries")
+            items = list(to_create.values())
+            try:
+                with self.env.cr.savepoint():
+                    created = self.create([vals for indexes, vals in items])
+                for (indexes, vals), entry in zip(items, created):
+                    for index in indexes:
+                        report[index]['id'] = entry.id
+            except Exception as e:
+                _logger.error(f"Bulk creation of workflow hierarchy entries failed, falling back to one by one: {e}",
+                              exc_info=True)
+                for indexes, vals in items:
+                    try:
+                        with self.env.cr.savepoint():
+                            entry = self.create(vals)
+                        for index in indexes:
+                            report[index]['id'] = entry.id
+                    except Exception as e:
+                        for index in indexes:
+                            report[index].update(status='error', message=str(e))
+        return report
+
+    @api.model
+    @profiled('workflow.hierarchy.import_hierarchy')
     def import_hierarchy(self, row):
         """
         Méthode pour importer ou mettre à jour une ligne de données avec des champs Many2many.
         """
         hierarchy_name = row.get('name', 'Nouvelle entrée')
-        vals = {'name': hierarchy_name}
         try:
-            vals['domain_ids'] = self.with_context(domain=row.get('domain'))._find_or_create_m2m_records(
-                'workflow.domain', 'domain'
-            )
-            vals['process_ids'] = self.with_context(process=row.get('process'))._find_or_create_m2m_records(
-                'workflow.process', 'process'
-            )
-            vals['sub_process_ids'] = self.with_context(sub_process=row.get('sub_process'))._find_or_create_m2m_records(
-                'workflow.subprocess', 'sub_process'
-            )
-            vals['activity_ids'] = self.with_context(activity=row.get('activity'))._find_or_create_m2m_records(
-                'workflow.activity', 'activity'
-            )
-            vals['procedure_ids'] = self.with_context(procedure=row.get('procedure'))._find_or_create_m2m_records(
-                'workflow.procedure', 'procedure'
-            )
-            vals['deliverable_ids'] = self.with_context(deliverable=row.get('deliverable'))._find_or_create_m2m_records(
-                'workflow.deliverable', 'deliverable'
-            )
-            vals['task_formulation_ids'] = self.with_context(
-                task_formulation=row.get('task_formulation'))._find_or_create_m2m_records(
-                'workflow.task.formulation', 'task_formulation'
-            )
-            if 'notes' in row:
-                vals['notes'] = row['notes']
-            vals['active'] = row.get('active', '1') == '1'
+            name_maps = {
+                model_name: self._find_or_create_names_bulk(model_name, self._split_import_names(row.get(column)))
+                for column, (model_name, dummy) in self._IMPORT_M2M_COLUMNS.items()
+            }
+            vals = self._prepare_hierarchy_vals(row, name_maps)
 
             existing_hierarchy_entry = self.search([('name', '=', hierarchy_name)], limit=1)
             if existing_hierarchy_entry:
@@ -124,8 +437,10 @@ class WorkflowHierarchy(models.Model):
 # --- MODÈLE workflow.domain ---
 class WorkflowDomain(models.Model):
     _name = 'workflow.domain'
+    _inherit = ['workflow.natural.key.mixin', 'workflow.reference.cache.mixin',
+                'work.program.change.feed.mixin', 'workflow.name.key.mixin']
     _description = 'Domaines de workflow (One2many vers processus)'
-    name = fields.Char(string='Nom du domaine', required=True)
+    name = fields.Char(string='Nom du domaine', required=True, index=True)
     dpt_type = fields.Selection(
         [('internal', 'Internal'), ('external', 'External')],
         string="Domain Type",
@@ -135,58 +450,114 @@ class WorkflowDomain(models.Model):
         help="Specifies whether the domain is internal or external."
     )
     process_ids = fields.One2many('workflow.process', 'domain_id', string='Processus associés')
-    #_sql_constraints = [('name_uniq', 'unique (name)', 'Le nom du domaine doit être unique !')]
+    _sql_constraints = [('name_uniq', 'unique (name)', 'Le nom du domaine doit être unique !')]
 
 # --- MODÈLE workflow.process ---
 class WorkflowProcess(models.Model):
     _name = 'workflow.process'
+    _inherit = ['workflow.natural.key.mixin', 'workflow.reference.cache.mixin',
+                'work.program.change.feed.mixin', 'workflow.name.key.mixin']
     _description = 'Processus métier (One2many vers sous-processus, Many2one vers domaine)'
 
-    name = fields.Char(string='Nom du processus', required=True)
+    name = fields.Char(string='Nom du processus', required=True, index=True)
     domain_id = fields.Many2one('workflow.domain', string='Domaine associé', ondelete='restrict')
     sub_process_ids = fields.One2many('workflow.subprocess', 'process_id', string='Sous-processus associés')
-    #_sql_constraints = [('name_uniq', 'unique (name)', 'Le nom du processus doit être unique !')]
+    _sql_constraints = [('name_uniq', 'unique (name)', 'Le nom du processus doit être unique !')]
 
 # --- MODÈLE workflow.subprocess ---
 class WorkflowSubProcess(models.Model):
     _name = 'workflow.subprocess'
+    _inherit = ['workflow.natural.key.mixin', 'workflow.reference.cache.mixin',
+                'work.program.change.feed.mixin', 'workflow.name.key.mixin']
     _description = 'Sous-processus (One2many vers activités, Many2one vers processus)'
-    name = fields.Char(string='Nom du sous-processus', required=True)
+    name = fields.Char(string='Nom du sous-processus', required=True, index=True)
     process_id = fields.Many2one('workflow.process', string='Processus associé', ondelete='restrict')
     activity_ids = fields.One2many('workflow.activity', 'sub_process_id', string='Activités associées')
-    #_sql_constraints = [('name_uniq', 'unique (name)', 'Le nom du sous-processus doit être unique !')]
+    _sql_constraints = [('name_uniq', 'unique (name)', 'Le nom du sous-processus doit être unique !')]
 
 # --- MODÈLE workflow.activity ---
 class WorkflowActivity(models.Model):
     _name = 'workflow.activity'
+    _inherit = ['work.program.lookup.mixin', 'work.program.cascade.mixin', 'workflow.hierarchy.path.mixin',
+                'workflow.natural.key.mixin', 'workflow.reference.cache.mixin',
+                'work.program.change.feed.mixin', 'workflow.name.key.mixin']
     _description = 'Activités métier (One2many vers procédures et livrables, Many2one vers sous-processus)'
-    name = fields.Char(string="Nom de l'activité", required=True)
+    name = fields.Char(string="Nom de l'activité", required=True, index=True)
     sub_process_id = fields.Many2one('workflow.subprocess', string='Sous-processus associé', ondelete='restrict')
     procedure_ids = fields.One2many('workflow.procedure', 'activity_id', string='Procédures associées')
     deliverable_ids = fields.One2many('workflow.deliverable', 'activity_id', string='Livrables associés')
-    #_sql_constraints = [('name_uniq', 'unique (name)', 'Le nom de l\'activité doit être unique !')]
+    # Ancêtres dénormalisés, tenus à jour par l'ORM lors d'un changement de parent
+    process_id = fields.Many2one('workflow.process', string='Processus', related='sub_process_id.process_id',
+                                 store=True, index=True)
+    domain_id = fields.Many2one('workflow.domain', string='Domaine', related='sub_process_id.process_id.domain_id',
+                                store=True, index=True)
+    hierarchy_path = fields.Char(string='Chemin hiérarchique', compute='_compute_hierarchy_path', store=True,
+                                 help="Identifiants domaine/processus/sous-processus/activité, pour les recherches par préfixe.")
+    _sql_constraints = [('name_uniq', 'unique (name)', 'Le nom de l\'activité doit être unique !')]
+
+    @api.depends('sub_process_id', 'process_id', 'domain_id')
+    def _compute_hierarchy_path(self):
+        for record in self:
+            activity_id = record._origin.id
+            ids = (record.domain_id.id, record.process_id.id, record.sub_process_id.id, activity_id)
+            record.hierarchy_path = ''.join(f'{value or 0}/' for value in ids) if activity_id else False
 
 # --- MODÈLE workflow.procedure ---
 class WorkflowProcedure(models.Model):
     _name = 'workflow.procedure'
+    _inherit = ['work.program.lookup.mixin', 'work.program.cascade.mixin', 'workflow.hierarchy.path.mixin',
+                'workflow.natural.key.mixin', 'workflow.reference.cache.mixin',
+                'work.program.change.feed.mixin', 'workflow.name.key.mixin']
     _description = 'Procédures de workflow (Many2one vers activité, One2many vers formulations de tâches)'
-    name = fields.Char(string='Nom de la procédure', required=True)
+    name = fields.Char(string='Nom de la procédure', required=True, index=True)
     activity_id = fields.Many2one('workflow.activity', string='Activité associée', ondelete='restrict')
     task_formulation_ids = fields.One2many('workflow.task.formulation', 'procedure_id', string='Formulations de tâches associées')
-    #_sql_constraints = [('name_uniq', 'unique (name)', 'Le nom de la procédure doit être unique !')]
+    # Ancêtres dénormalisés, tenus à jour par l'ORM lors d'un changement de parent
+    sub_process_id = fields.Many2one('workflow.subprocess', string='Sous-processus', related='activity_id.sub_process_id',
+                                     store=True, index=True)
+    process_id = fields.Many2one('workflow.process', string='Processus', related='activity_id.process_id',
+                                 store=True, index=True)
+    domain_id = fields.Many2one('workflow.domain', string='Domaine', related='activity_id.domain_id',
+                                store=True, index=True)
+    hierarchy_path = fields.Char(string='Chemin hiérarchique', related='activity_id.hierarchy_path', store=True)
+    _sql_constraints = [('name_uniq', 'unique (name)', 'Le nom de la procédure doit être unique !')]
 
 # --- MODÈLE workflow.deliverable ---
 class WorkflowDeliverable(models.Model):
     _name = 'workflow.deliverable'
+    _inherit = ['work.program.lookup.mixin', 'work.program.cascade.mixin', 'workflow.hierarchy.path.mixin',
+                'workflow.natural.key.mixin', 'workflow.reference.cache.mixin',
+                'work.program.change.feed.mixin', 'workflow.name.key.mixin']
     _description = 'Livrables de workflow (Many2one vers activité)'
-    name = fields.Char(string='Nom du livrable', required=True)
+    name = fields.Char(string='Nom du livrable', required=True, index=True)
     activity_id = fields.Many2one('workflow.activity', string='Activité associée', ondelete='restrict')
-    #_sql_constraints = [('name_uniq', 'unique (name)', 'Le nom du livrable doit être unique !')]
+    # Ancêtres dénormalisés, tenus à jour par l'ORM lors d'un changement de parent
+    sub_process_id = fields.Many2one('workflow.subprocess', string='Sous-processus', related='activity_id.sub_process_id',
+                                     store=True, index=True)
+    process_id = fields.Many2one('workflow.process', string='Processus', related='activity_id.process_id',
+                                 store=True, index=True)
+    domain_id = fields.Many2one('workflow.domain', string='Domaine', related='activity_id.domain_id',
+                                store=True, index=True)
+    hierarchy_path = fields.Char(string='Chemin hiérarchique', related='activity_id.hierarchy_path', store=True)
+    _sql_constraints = [('name_uniq', 'unique (name)', 'Le nom du livrable doit être unique !')]
 
 # --- MODÈLE workflow.task.formulation ---
 class WorkflowTaskFormulation(models.Model):
     _name = 'workflow.task.formulation'
+    _inherit = ['work.program.lookup.mixin', 'work.program.cascade.mixin', 'workflow.hierarchy.path.mixin',
+                'workflow.natural.key.mixin', 'workflow.reference.cache.mixin',
+                'work.program.change.feed.mixin', 'workflow.name.key.mixin']
     _description = 'Formulation des tâches (Many2one vers procédure)'
-    name = fields.Char(string='Description de la tâche', required=True)
+    name = fields.Char(string='Description de la tâche', required=True, index=True)
     procedure_id = fields.Many2one('workflow.procedure', string='Procédure associée', ondelete='restrict')
-    #_sql_constraints = [('name_uniq', 'unique (name)', 'La description de la tâche doit être unique !')]
\ No newline at end of file
+    activity_id = fields.Many2one('workflow.activity', string='Activité', related='procedure_id.activity_id',
+                                  store=True, index=True)
+    # Ancêtres dénormalisés, tenus à jour par l'ORM lors d'un changement de parent
+    sub_process_id = fields.Many2one('workflow.subprocess', string='Sous-processus', related='activity_id.sub_process_id',
+                                     store=True, index=True)
+    process_id = fields.Many2one('workflow.process', string='Processus', related='activity_id.process_id',
+                                 store=True, index=True)
+    domain_id = fields.Many2one('workflow.domain', string='Domaine', related='activity_id.domain_id',
+                                store=True, index=True)
+    hierarchy_path = fields.Char(string='Chemin hiérarchique', related='activity_id.hierarchy_path', store=True)
+    _sql_constraints = [('name_uniq', 'unique (name)', 'La description de la tâche doit être unique !')]
\ No newline at end of file
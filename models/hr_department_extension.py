@@ -6,4 +6,10 @@ class HRDepartmentExtension(models.Model):
     _inherit = 'hr.department'
 
     dpt_type = fields.Selection([('internal', 'Internal'), ('external', 'External')], string="Department Type",
-                                index=True)
\ No newline at end of file
+                                index=True)
+
+    def write(self, vals):
+        res = super().write(vals)
+        if 'dpt_type' in vals:
+            self.env['work.program'].sudo()._sync_external_department(self.ids)
+        return res
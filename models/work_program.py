@@ -1,32 +1,50 @@
 # -*- coding: utf-8 -*-
 import calendar
 import logging
+import time
 from email.policy import default
 from datetime import datetime, date, timedelta
 
-from odoo import models, api, fields, _
+import babel.dates
+
+from odoo import models, api, fields, tools, _
 from odoo.exceptions import UserError, ValidationError
+from odoo.tools.misc import babel_locale_parse
+
+from .work_program_profiling import profiled
 
 _logger = logging.getLogger(__name__)
 
 class WorkProgram(models.Model):
     _name = 'work.program'
-    _inherit = ['mail.thread', 'mail.activity.mixin']
+    _inherit = ['mail.thread', 'mail.activity.mixin', 'workflow.hierarchy.path.mixin', 'workflow.natural.key.mixin',
+                'work.program.change.feed.mixin']
     _description = 'Programme de travail'
+    _change_feed_department_field = 'work_programm_department_id'
+    _change_feed_employee_fields = ('responsible_id', 'support_ids')
 
     user_id = fields.Many2one('res.users', default=lambda self: self.env.user, string='Utilisateur Associé')
     # CHANGEMENT ICI : Renommage du champ
     work_programm_department_id = fields.Many2one(
         'hr.department',
         string="Département autorisé",
-        help="Sélectionnez le département autorisé pour ce workflow."
+        help="Sélectionnez le département autorisé pour ce workflow.",
+        index=True
     )
 
-    name = fields.Char(string='Nom du programme', default='Nouveau programme')
+    name = fields.Char(string='Nom du programme', default='Nouveau programme', index=True)
     week_of = fields.Integer(string='Semaine de', help="Numéro de semaine dans l'année")
     project_id = fields.Many2one('project.project', string='Projet / Programme', ondelete='restrict')
     activity_id = fields.Many2one('workflow.activity', string='Activité', ondelete='restrict')
     procedure_id = fields.Many2one('workflow.procedure', string='Type de tâche (Procédure)', ondelete='restrict')
+    # Ancêtres de l'activité dénormalisés : filtrer par domaine devient un seul prédicat indexé
+    sub_process_id = fields.Many2one('workflow.subprocess', string='Sous-processus', related='activity_id.sub_process_id',
+                                     store=True, index=True)
+    process_id = fields.Many2one('workflow.process', string='Processus', related='activity_id.process_id',
+                                 store=True, index=True)
+    domain_id = fields.Many2one('workflow.domain', string='Domaine', related='activity_id.domain_id',
+                                store=True, index=True)
+    hierarchy_path = fields.Char(string='Chemin hiérarchique', related='activity_id.hierarchy_path', store=True)
     task_description_id = fields.Many2one('workflow.task.formulation', string='Description de la tâche', ondelete='restrict')
     inputs_needed = fields.Text(string='Entrées nécessaires', help="Entrées nécessaires pour la tâche, si applicable")
     deliverable_ids = fields.Many2many('workflow.deliverable', string='Livrables de la tâche')
@@ -45,7 +63,7 @@ class WorkProgram(models.Model):
     initial_deadline = fields.Date(string='Date limite initiale')
     nb_postpones = fields.Integer(string='Nombre de reports', default=0)
     actual_deadline = fields.Date(string='Date limite réelle')
-    responsible_id = fields.Many2one('hr.employee', string='Responsable', ondelete='restrict')
+    responsible_id = fields.Many2one('hr.employee', string='Responsable', ondelete='restrict', index=True)
     support_ids = fields.Many2many('hr.employee', string='Support')
     status = fields.Selection([
         ('draft', 'Brouillon'),
@@ -77,15 +95,67 @@ class WorkProgram(models.Model):
             is_external = record.work_programm_department_id.dpt_type == 'external'
             record.is_external_department = is_external
 
+    # Stocké et indexé : filtrable et groupable en SQL. Un changement de dpt_type sur le
+    # département est répercuté en masse par _sync_external_department.
     is_external_department = fields.Boolean(
         string='Département Externe',
         compute='_compute_external_department',
-        store=False
+        store=True,
+        index=True
     )
 
+    def _auto_init(self):
+        # Remplissage initial en une requête plutôt qu'un calcul ORM enregistrement par enregistrement ;
+        # à l'installation, la table n'existe pas encore et l'ORM crée la colonne vide
+        if tools.table_exists(self.env.cr, self._table) \
+                and not tools.column_exists(self.env.cr, self._table, 'is_external_department'):
+            tools.create_column(self.env.cr, self._table, 'is_external_department', 'boolean')
+            self.env.cr.execute("""
+                UPDATE work_program wp
+                   SET is_external_department = COALESCE(d.dpt_type = 'external', FALSE)
+                  FROM hr_department d
+                 WHERE d.id = wp.work_programm_department_id
+            """)
+            self.env.cr.execute("""
+                UPDATE work_program SET is_external_department = FALSE
+                 WHERE is_external_department IS NULL
+            """)
+        return super()._auto_init()
+
+    @api.model
+    def _sync_external_department(self, department_ids):
+        """Répercute en une requête le type des départements donnés sur leurs programmes."""
+        if not department_ids:
+            return
+        self.env['hr.department'].flush_model(['dpt_type'])
+        self.flush_model(['work_programm_department_id', 'is_external_department'])
+        self.env.cr.execute("""
+            UPDATE work_program wp
+               SET is_external_department = COALESCE(d.dpt_type = 'external', FALSE)
+              FROM hr_department d
+             WHERE d.id = wp.work_programm_department_id
+               AND d.id IN %s
+               AND wp.is_external_department IS DISTINCT FROM COALESCE(d.dpt_type = 'external', FALSE)
+            RETURNING wp.id
+        """, [tuple(department_ids)])
+        program_ids = [row[0] for row in self.env.cr.fetchall()]
+        if program_ids:
+            self.browse(program_ids).invalidate_recordset(['is_external_department'])
+            _logger.info(f"{len(program_ids)} programme(s) de travail mis à jour après changement de type de département")
+
     @api.onchange('activity_id')
     def _onchange_activity_id(self):
         if self.activity_id:
+            # Les sélections incohérentes avec la nouvelle activité sont retirées à partir
+            # de l'index de cascade en mémoire, sans requête supplémentaire.
+            cascade = self.env['work.program.cascade']
+            activity_id = self.activity_id._origin.id
+            procedure_ids = cascade.get_child_ids('activity', activity_id, 'procedure')
+            deliverable_ids = cascade.get_child_ids('activity', activity_id, 'deliverable')
+            if self.procedure_id and self.procedure_id._origin.id not in procedure_ids:
+                self.procedure_id = False
+            if self.deliverable_ids:
+                self.deliverable_ids = self.deliverable_ids.filtered(lambda d: d._origin.id in deliverable_ids)
             return {
                 'domain': {
                     'procedure_id': [('activity_id', '=', self.activity_id.id)],
@@ -100,77 +170,188 @@ class WorkProgram(models.Model):
     @api.onchange('procedure_id')
     def _onchange_procedure_id(self):
         if self.procedure_id:
+            task_description_ids = self.env['work.program.cascade'].get_child_ids(
+                'procedure', self.procedure_id._origin.id, 'task_description')
+            if self.task_description_id and self.task_description_id._origin.id not in task_description_ids:
+                self.task_description_id = False
             return {'domain': {'task_description_id': [('procedure_id', '=', self.procedure_id.id)]}}
         else:
             self.task_description_id = False
             return {'domain': {'task_description_id': []}}
 
+    # Colonnes du fichier d'import résolues par nom : colonne -> (modèle cible, champ, multiple)
+    _IMPORT_NAME_COLUMNS = {
+        'Departments': ('hr.department', 'work_programm_department_id', False),
+        'Activity': ('workflow.activity', 'activity_id', False),
+        'Task Type (Procedure)': ('workflow.procedure', 'procedure_id', False),
+        'Task Description': ('workflow.task.formulation', 'task_description_id', False),
+        'Task Deliverable(s)': ('workflow.deliverable', 'deliverable_ids', True),
+        'Responsible': ('hr.employee', 'responsible_id', False),
+        'Support': ('hr.employee', 'support_ids', True),
+    }
+
+    @api.model
+    def _split_import_names(self, value):
+        """Découpe une cellule « nom1, nom2 » en liste de noms nettoyés."""
+        return [name.strip() for name in (value or '').split(',') if name.strip()]
+
+    @api.model
+    def _get_name_id_map(self, model_name, names):
+        """
+        Résout un ensemble de noms en une seule requête ``name IN (...)`` (ou depuis le
+        cache partagé pour les modèles de référence workflow.*). Retourne un dictionnaire {nom: id}; en cas de doublons, le plus petit id
+        l'emporte, comme le faisait ``search(..., limit=1)``. Les modèles à clé de nom
+        normalisée (workflow.*, employés, départements) rapprochent aussi les noms
+        aux accents, à la casse ou aux espaces près ; un nom ambigu est associé au
+        tuple des ids correspondants.
+        """
+        names = {name for name in names if name}
+        if not names:
+            return {}
+        if 'name_key' in self.env[model_name]._fields:
+            return self.env[model_name]._resolve_names(names)
+        if model_name in self.env['workflow.reference.cache'].CACHED_MODELS:
+            return self.env['workflow.reference.cache'].get_ids(model_name, names)
+        name_map = {}
+        records = self.env[model_name].search_read([('name', 'in', list(names))], ['name'], order='id')
+        for record in records:
+            name_map.setdefault(record['name'], record['id'])
+        return name_map
+
+    @api.model
+    def _get_import_lookups(self, rows):
+        """
+        Précharge les correspondances nom -> id pour toutes les lignes d'un lot :
+        une requête par modèle cible au lieu d'une par cellule.
+        """
+        names_by_model = {}
+        for row in rows:
+            for column, (model_name, dummy, multiple) in self._IMPORT_NAME_COLUMNS.items():
+                value = row.get(column)
+                if not value:
+                    continue
+                names = self._split_import_names(value) if multiple else [value]
+                names_by_model.setdefault(model_name, set()).update(names)
+        return {
+            model_name: self._get_name_id_map(model_name, names)
+            for model_name, names in names_by_model.items()
+        }
+
+    @api.model
+    def _prepare_import_vals(self, row, lookups):
+        """Construit les valeurs d'un work.program à partir d'une ligne du fichier d'import."""
+        vals = {
+            'name': row.get('Task Description', 'Nouveau programme'),
+            'my_month': self._normalize_month(row.get('Month')),
+            'week_of': int(row.get('Week of')) if row.get('Week of') else False,
+            'inputs_needed': row.get('Inputs needed (If applicable)'),
+            'priority': row.get('Priority', 'medium').lower() if row.get('Priority') else 'medium',
+            'complexity': row.get('Complexity', 'medium').lower() if row.get('Complexity') else 'medium',
+            'assignment_date': row.get('Assignment date'),
+            'duration_effort': float(row.get('Duration / Effort (Hrs)')) if row.get('Duration / Effort (Hrs)') else 0.0,
+            'initial_deadline': row.get('Initial Dateline'),
+            'nb_postpones': int(row.get('Nb of Postpones')) if row.get('Nb of Postpones') else 0,
+            'actual_deadline': row.get('Actual Deadline'),
+            'status': row.get('Status', 'draft').lower() if row.get('Status') else 'draft',
+            'completion_percentage': float(row.get('% of completion')) if row.get('% of completion') else 0.0,
+            'satisfaction_level': row.get('Satisfaction Level', '').lower() if row.get('Satisfaction Level') else False,
+            'comments': row.get('Comments / Remarques / Problems encountered / Additionals informations'),
+            'champ1': row.get('Champ 1', ''),
+            'champ2': row.get('Champ 2', '')
+        }
+
+        for column, (model_name, field_name, multiple) in self._IMPORT_NAME_COLUMNS.items():
+            value = row.get(column)
+            if not value:
+                continue
+            name_map = lookups.get(model_name, {})
+            self.env[model_name]._check_ambiguous_names(
+                name_map, self._split_import_names(value) if multiple else [value])
+            if multiple:
+                record_ids = [name_map[name] for name in self._split_import_names(value) if name in name_map]
+                vals[field_name] = [(6, 0, record_ids)]
+            elif value in name_map:
+                vals[field_name] = name_map[value]
+        return vals
+
+    @api.model
+    def _prepare_import_error_vals(self, row, name, error):
+        return {
+            'name': f"ERREUR-IMPORT-{name}",
+            'comments': f"Échec de l'importation : {row}. Erreur : {error}",
+            'status': 'cancelled'
+        }
+
+    # Contexte des opérations de masse : ni suivi des champs, ni abonnement automatique,
+    # ni note « créé » par enregistrement (un résumé est journalisé par paquet)
+    _BULK_CONTEXT = {
+        'tracking_disable': True,
+        'mail_create_nolog': True,
+        'mail_create_nosubscribe': True,
+        'mail_notrack': True,
+        'mail_auto_subscribe_no_notify': True,
+    }
+
+    def _bulk_mode(self):
+        return self.with_context(**self._BULK_CONTEXT)
+
+    @api.model
+    def _count_mail_rows(self, ids):
+        """Nombre de lignes mail_message / mail_followers / mail_tracking_value des programmes donnés."""
+        self.env.flush_all()
+        self.env.cr.execute("""
+            SELECT (SELECT count(*) FROM mail_message WHERE model = %(model)s AND res_id = ANY(%(ids)s)),
+                   (SELECT count(*) FROM mail_followers WHERE res_model = %(model)s AND res_id = ANY(%(ids)s)),
+                   (SELECT count(*) FROM mail_tracking_value tv
+                      JOIN mail_message m ON m.id = tv.mail_message_id
+                     WHERE m.model = %(model)s AND m.res_id = ANY(%(ids)s))
+        """, {'model': self._name, 'ids': list(ids)})
+        messages, followers, tracking_values = self.env.cr.fetchone()
+        return {'mail_message': messages, 'mail_followers': followers, 'mail_tracking_value': tracking_values}
+
+    @api.model
+    def measure_bulk_mode(self, nb_records=200):
+        """
+        Compare la création puis la mise à jour de ``nb_records`` programmes en mode
+        standard et en mode masse, dans un savepoint annulé ensuite.
+
+        Retourne ``{'standard': {...}, 'bulk': {...}, 'saved': {...}}`` avec, pour
+        chaque mode, la durée en secondes et le nombre de lignes de chatter créées.
+        Les valeurs de suivi sont écrites par mail.thread au précommit, exécuté avant
+        le comptage. Aucun champ de ce module n'est suivi (``tracking``) : le compte
+        de mail_tracking_value reste nul sauf si un autre module en ajoute, l'écart
+        porte alors sur les messages et les abonnés.
+        """
+        if not self.env.user.has_group('workprogramm.workprogramm_group_admin'):
+            raise UserError(_("Seuls les administrateurs peuvent lancer cette mesure."))
+        result = {}
+        # Les écritures différées déjà en attente ne doivent pas être annulées avec le savepoint
+        self.env.flush_all()
+        self.env.cr.precommit.run()
+        for mode, model in (('standard', self), ('bulk', self._bulk_mode())):
+            with self.env.cr.savepoint() as savepoint:
+                start = time.perf_counter()
+                records = model.create([{'name': f"MESURE-{mode}-{index}"} for index in range(nb_records)])
+                records.write({'status': 'ongoing', 'completion_percentage': 50.0})
+                self.env.flush_all()
+                # Valeurs de suivi et notifications différées de mail.thread
+                self.env.cr.precommit.run()
+                duration = time.perf_counter() - start
+                result[mode] = dict(self._count_mail_rows(records.ids), seconds=round(duration, 3))
+                savepoint.rollback()
+            self.env.invalidate_all()
+        result['saved'] = {key: result['standard'][key] - result['bulk'][key] for key in result['standard']}
+        _logger.info(f"Mesure du mode masse sur {nb_records} programmes : {result}")
+        return result
+
     @api.model
+    @profiled('work.program.import_work_program')
     def import_work_program(self, row):
+        if not self.env.context.get('tracking_disable'):
+            return self._bulk_mode().import_work_program(row)
+        vals = {'name': row.get('Task Description', 'Nouveau programme')}
         try:
-            vals = {
-                'name': row.get('Task Description', 'Nouveau programme'),
-                'my_month': row.get('Month', '').lower() if row.get('Month') else False,
-                'week_of': int(row.get('Week of')) if row.get('Week of') else False,
-                'inputs_needed': row.get('Inputs needed (If applicable)'),
-                'priority': row.get('Priority', 'medium').lower() if row.get('Priority') else 'medium',
-                'complexity': row.get('Complexity', 'medium').lower() if row.get('Complexity') else 'medium',
-                'assignment_date': row.get('Assignment date'),
-                'duration_effort': float(row.get('Duration / Effort (Hrs)')) if row.get('Duration / Effort (Hrs)') else 0.0,
-                'initial_deadline': row.get('Initial Dateline'),
-                'nb_postpones': int(row.get('Nb of Postpones')) if row.get('Nb of Postpones') else 0,
-                'actual_deadline': row.get('Actual Deadline'),
-                'status': row.get('Status', 'draft').lower() if row.get('Status') else 'draft',
-                'completion_percentage': float(row.get('% of completion')) if row.get('% of completion') else 0.0,
-                'satisfaction_level': row.get('Satisfaction Level', '').lower() if row.get('Satisfaction Level') else False,
-                'comments': row.get('Comments / Remarques / Problems encountered / Additionals informations'),
-                'champ1': row.get('Champ 1', ''),
-                'champ2': row.get('Champ 2', '')
-            }
-
-            # CHANGEMENT ICI : Adaptation de l'import pour le Many2one
-            if row.get('Departments'):
-                dept = self.env['hr.department'].search([('name', '=', row['Departments'])], limit=1)
-                if dept:
-                    vals['work_programm_department_id'] = dept.id
-
-            if row.get('Activity'):
-                activity = self.env['workflow.activity'].search([('name', '=', row['Activity'])], limit=1)
-                if activity:
-                    vals['activity_id'] = activity.id
-
-            if row.get('Task Type (Procedure)'):
-                procedure = self.env['workflow.procedure'].search([('name', '=', row['Task Type (Procedure)'])], limit=1)
-                if procedure:
-                    vals['procedure_id'] = procedure.id
-
-            if row.get('Task Description'):
-                task_description = self.env['workflow.task.formulation'].search([('name', '=', row['Task Description'])], limit=1)
-                if task_description:
-                    vals['task_description_id'] = task_description.id
-
-            if row.get('Task Deliverable(s)'):
-                deliverables = [name.strip() for name in row['Task Deliverable(s)'].split(',') if name.strip()]
-                deliverable_ids = []
-                for deliverable_name in deliverables:
-                    deliverable = self.env['workflow.deliverable'].search([('name', '=', deliverable_name)], limit=1)
-                    if deliverable:
-                        deliverable_ids.append(deliverable.id)
-                vals['deliverable_ids'] = [(6, 0, deliverable_ids)]
-
-            if row.get('Responsible'):
-                responsible = self.env['hr.employee'].search([('name', '=', row['Responsible'])], limit=1)
-                if responsible:
-                    vals['responsible_id'] = responsible.id
-
-            if row.get('Support'):
-                supports = [name.strip() for name in row['Support'].split(',') if name.strip()]
-                support_ids = []
-                for support_name in supports:
-                    support = self.env['hr.employee'].search([('name', '=', support_name)], limit=1)
-                    if support:
-                        support_ids.append(support.id)
-                vals['support_ids'] = [(6, 0, support_ids)]
+            vals = self._prepare_import_vals(row, self._get_import_lookups([row]))
 
             existing_record = self.search([('name', '=', vals['name'])], limit=1)
             if existing_record:
@@ -182,47 +363,251 @@ class WorkProgram(models.Model):
                 return self.create(vals)
         except Exception as e:
             _logger.error(f"Erreur lors de l'importation de la ligne du programme de travail : {row}. Erreur : {e}", exc_info=True)
-            return self.create({
-                'name': f"ERREUR-IMPORT-{vals['name']}",
-                'comments': f"Échec de l'importation : {row}. Erreur : {e}",
-                'status': 'cancelled'
-            })
+            return self.create(self._prepare_import_error_vals(row, vals['name'], e))
+
+    @api.model
+    @profiled('work.program.import_work_programs')
+    def import_work_programs(self, rows):
+        """
+        Import par lot de lignes de programme de travail.
+
+        Tous les noms référencés (départements, activités, procédures, formulations,
+        livrables, employés) sont résolus en une requête par modèle pour l'ensemble
+        du lot, les programmes existants sont recherchés en une seule requête, puis
+        les créations sont regroupées en un seul ``create`` et les mises à jour
+        identiques en un seul ``write``. L'import s'exécute en mode masse (voir
+        ``_BULK_CONTEXT``) : aucune ligne de suivi ni d'abonné n'est produite.
+
+        Retourne un rapport par ligne : liste de dictionnaires
+        ``{'row', 'name', 'status', 'id', 'message'}`` où ``status`` vaut
+        ``created``, ``updated`` ou ``error``.
+        """
+        if not self.env.context.get('tracking_disable'):
+            return self._bulk_mode().import_work_programs(rows)
+        rows = list(rows)
+        report = [{'row': index, 'name': False, 'status': False, 'id': False, 'message': ''}
+                  for index in range(len(rows))]
+        lookups = self._get_import_lookups(rows)
+
+        prepared = []
+        for index, row in enumerate(rows):
+            name = row.get('Task Description', 'Nouveau programme')
+            report[index]['name'] = name
+            try:
+                prepared.append((index, self._prepare_import_vals(row, lookups)))
+            except Exception as e:
+                _logger.error(f"Erreur lors de l'importation de la ligne du programme de travail : {row}. Erreur : {e}", exc_info=True)
+                report[index].update(status='error', message=str(e))
+                prepared.append((index, self._prepare_import_error_vals(row, name, e)))
+
+        names = {vals['name'] for index, vals in prepared if report[index]['status'] != 'error'}
+        existing = {}
+        for record in self.search([('name', 'in', list(names))], order='id'):
+            existing.setdefault(record.name, record)
+
+        # Les lignes portant le même nom dans le lot sont fusionnées : la dernière l'emporte,
+        # comme avec des appels successifs à import_work_program.
+        to_create = {}
+        to_write = {}
+        error_creates = []
+        for index, vals in prepared:
+            if report[index]['status'] == 'error':
+                error_creates.append((index, vals))
+            elif vals['name'] in existing:
+                report[index]['status'] = 'updated'
+                to_write.setdefault(vals['name'], ([], {}))
+                to_write[vals['name']][0].append(index)
+                to_write[vals['name']][1].update(vals)
+            else:
+                report[index]['status'] = 'created'
+                to_create.setdefault(vals['name'], ([], {}))
+                to_create[vals['name']][0].append(index)
+                to_create[vals['name']][1].update(vals)
+
+        # Regroupement des write aux valeurs identiques (le nom, clé de rapprochement, n'est pas réécrit)
+        write_groups = {}
+        for name, (indexes, vals) in to_write.items():
+            vals = {key: value for key, value in vals.items() if key != 'name'}
+            group = write_groups.setdefault(repr(sorted(vals.items())), [self.browse(), vals, []])
+            group[0] |= existing[name]
+            group[2].extend(indexes)
+        for records, vals, indexes in write_groups.values():
+            for index in indexes:
+                report[index]['id'] = existing[report[index]['name']].id
+            _logger.info(f"Mise à jour de {len(records)} programme(s) de travail")
+            self._import_batch_apply(report, [(indexes, vals)], records=records)
+
+        create_items = list(to_create.values()) + [([index], vals) for index, vals in error_creates]
+        if create_items:
+            _logger.info(f"Création de {len(create_items)} programme(s) de travail")
+            self._import_batch_apply(report, create_items)
+        return report
+
+    def _import_batch_apply(self, report, items, records=None):
+        """
+        Applique un groupe de create (``records`` vide) ou un write groupé dans un
+        savepoint. En cas d'échec du groupe, chaque élément est rejoué isolément afin
+        que seule la ligne fautive soit signalée en erreur.
+        """
+        try:
+            with self.env.cr.savepoint():
+                if records is not None:
+                    records.write(items[0][1])
+                else:
+                    created = self.create([vals for indexes, vals in items])
+                    for (indexes, vals), record in zip(items, created):
+                        for index in indexes:
+                            report[index]['id'] = record.id
+            return
+        except Exception as e:
+            if len(items) == 1 and (records is None or len(records) == 1):
+                for index in items[0][0]:
+                    report[index].update(status='error', id=False, message=str(e))
+                _logger.error(f"Erreur lors de l'importation du programme de travail : {e}", exc_info=True)
+                return
+
+        if records is not None:
+            indexes, vals = items[0]
+            for record in records:
+                record_indexes = [index for index in indexes if report[index]['name'] == record.name]
+                self._import_batch_apply(report, [(record_indexes, vals)], records=record)
+        else:
+            for item in items:
+                self._import_batch_apply(report, [item])
+
+    # Clés stables des mois (indépendantes de la langue) ; les libellés sont traduits à l'affichage
+    MONTH_KEYS = ['january', 'february', 'march', 'april', 'may', 'june', 'july',
+                  'august', 'september', 'october', 'november', 'december']
+
+    @tools.ormcache('lang')
+    def _get_month_names(self, lang):
+        """Noms des mois dans la langue donnée, calculés une fois par langue et par worker."""
+        locale = babel_locale_parse(lang or 'en_US')
+        names = babel.dates.get_month_names('wide', locale=locale)
+        return tuple(names[i].capitalize() for i in range(1, 13))
+
+    @api.model
+    def _normalize_month(self, value):
+        """Ramène un nom de mois (anglais ou français, toute casse) ou un numéro à sa clé stable."""
+        if not value:
+            return False
+        value = str(value).strip().lower()
+        if value in self.MONTH_KEYS:
+            return value
+        if value.isdigit() and 1 <= int(value) <= 12:
+            return self.MONTH_KEYS[int(value) - 1]
+        for lang in ('fr_FR', 'en_US'):
+            names = [name.lower() for name in self._get_month_names(lang)]
+            if value in names:
+                return self.MONTH_KEYS[names.index(value)]
+        return False
 
     def _get_default_current_month(self):
-        return _(calendar.month_name[int(datetime.now().strftime("%m"))])
+        return self.MONTH_KEYS[date.today().month - 1]
 
     def _get_default_current_month_selection(self):
-        return [(_(calendar.month_name[i]), _(calendar.month_name[i])) for i in range(1, 13)]
+        return list(zip(self.MONTH_KEYS, self._get_month_names(self.env.lang or 'en_US')))
 
     my_month = fields.Selection(
-        selection=_get_default_current_month_selection,
+        selection='_get_default_current_month_selection',
         default=_get_default_current_month,
         string='Mois'
     )
 
+    @api.model
+    def _get_monday(self, value):
+        value = fields.Date.to_date(value)
+        return value and value - timedelta(days=value.weekday())
+
     def _get_default_my_week(self):
-        today = date.today()
-        current_monday = today - timedelta(days=today.weekday())
-        return current_monday.strftime("%Y-%m-%d")
+        return self._get_monday(date.today())
 
-    def _get_week_selection(self):
-        my_week = []
-        current_year = date.today().year
-        january_first = date(current_year, 1, 1)
+    @tools.ormcache('lang', 'year')
+    def _get_week_selection_cached(self, lang, year):
+        """Semaines (lundi) de l'année, calculées une fois par langue et par année."""
+        month_names = self._get_month_names(lang)
+        january_first = date(year, 1, 1)
         monday_first = january_first - timedelta(days=january_first.weekday())
+        my_week = []
         for i in range(0, 53):
             week_start = monday_first + timedelta(weeks=i)
-            if week_start.year > current_year:
+            if week_start.year > year:
                 break
-            my_day = week_start.day
-            my_month_name = _(week_start.strftime("%B"))
-            my_label = f"{my_day} - {my_month_name}"
-            my_value = week_start.strftime("%Y-%m-%d")
-            my_week.append((my_value, my_label))
-        return my_week
-
-    my_week_of = fields.Selection(
-        selection=_get_week_selection,
+            my_label = f"{week_start.day} - {month_names[week_start.month - 1]}"
+            my_week.append((week_start.strftime("%Y-%m-%d"), my_label))
+        return tuple(my_week)
+
+    def _get_week_selection(self, year=None):
+        return list(self._get_week_selection_cached(self.env.lang or 'en_US', year or date.today().year))
+
+    # Semaine stockée comme date du lundi : indexable et valable d'une année sur l'autre
+    my_week_of = fields.Date(
         default=_get_default_my_week,
+        index=True,
         string="Selection week"
-    )
\ No newline at end of file
+    )
+
+    @api.model
+    def _normalize_week_vals(self, vals):
+        vals = dict(vals)
+        if vals.get('my_week_of'):
+            vals['my_week_of'] = self._get_monday(vals['my_week_of'])
+        if 'my_month' in vals and vals['my_month'] and vals['my_month'] not in self.MONTH_KEYS:
+            vals['my_month'] = self._normalize_month(vals['my_month'])
+        return vals
+
+    def _get_postponed_counts(self, vals):
+        """
+        Nouveau nombre de reports des programmes dont la date limite réelle recule.
+
+        La date de référence est l'ancienne date limite réelle, ou à défaut la date
+        limite initiale. Une valeur explicite de ``nb_postpones`` reste prioritaire.
+        """
+        if 'actual_deadline' not in vals or 'nb_postpones' in vals or not vals['actual_deadline']:
+            return {}
+        new_deadline = fields.Date.to_date(vals['actual_deadline'])
+        postponed = {}
+        for record in self:
+            reference = record.actual_deadline or record.initial_deadline
+            if reference and new_deadline > reference:
+                postponed.setdefault((record.nb_postpones or 0) + 1, []).append(record.id)
+        return postponed
+
+    @api.model_create_multi
+    @profiled('work.program.create')
+    def create(self, vals_list):
+        records = super().create([self._normalize_week_vals(vals) for vals in vals_list])
+        kpi = self.env['work.program.kpi']
+        kpi._apply_contributions({}, kpi._get_contributions(records))
+        return records
+
+    @profiled('work.program.write')
+    def write(self, vals):
+        vals = self._normalize_week_vals(vals)
+        kpi = self.env['work.program.kpi']
+        track_kpi = bool(kpi._TRIGGER_FIELDS.intersection(vals))
+        before = kpi._get_contributions(self) if track_kpi else {}
+        postponed = self._get_postponed_counts(vals)
+        res = super().write(vals)
+        for nb_postpones, ids in postponed.items():
+            super(WorkProgram, self.browse(ids)).write({'nb_postpones': nb_postpones})
+        if track_kpi:
+            kpi._apply_contributions(before, kpi._get_contributions(self))
+        return res
+
+    @api.model
+    @profiled('work.program.search')
+    def search(self, domain, *args, **kwargs):
+        return super().search(domain, *args, **kwargs)
+
+    @api.model
+    @profiled('work.program.web_search_read')
+    def web_search_read(self, *args, **kwargs):
+        return super().web_search_read(*args, **kwargs)
+
+    def unlink(self):
+        kpi = self.env['work.program.kpi']
+        before = kpi._get_contributions(self)
+        res = super().unlink()
+        kpi._apply_contributions(before, {})
+        return res
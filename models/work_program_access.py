@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+import logging
+import statistics
+import time
+
+from odoo import models, api, fields, _
+from odoo.exceptions import UserError
+from odoo.tools.safe_eval import safe_eval
+
+_logger = logging.getLogger(__name__)
+
+
+class ResUsersWorkProgramAccess(models.Model):
+    """
+    Ensemble précalculé des départements accessibles à un utilisateur.
+
+    Les règles d'accès de work.program et workflow.hierarchy lisent cet ensemble
+    stocké au lieu de parcourir la chaîne utilisateur > employé > département : la
+    règle devient un ``department IN (SELECT ...)`` sur la table de relation et une
+    colonne indexée. Responsable et supports sont comparés par ``user_id`` en SQL :
+    aucun identifiant n'est figé dans le domaine, qui ne dépend que de
+    l'utilisateur ; son cache reste donc valable quand l'ensemble est recalculé ou
+    qu'un employé est lié à l'utilisateur.
+    """
+    _inherit = 'res.users'
+
+    work_program_department_ids = fields.Many2many(
+        'hr.department', 'res_users_work_program_department_rel', 'user_id', 'department_id',
+        string='Départements accessibles', compute='_compute_work_program_department_ids', store=True,
+        help="Départements des employés liés à l'utilisateur, utilisés par les règles d'accès des programmes de travail.")
+
+    @api.depends('employee_ids.department_id')
+    def _compute_work_program_department_ids(self):
+        for user in self:
+            user.work_program_department_ids = user.employee_ids.department_id
+
+
+class HrDepartmentWorkProgramAccess(models.Model):
+    _inherit = 'hr.department'
+
+    work_program_user_ids = fields.Many2many(
+        'res.users', 'res_users_work_program_department_rel', 'department_id', 'user_id',
+        string='Utilisateurs ayant accès', readonly=True,
+        help="Utilisateurs dont un employé appartient au département (règles d'accès des programmes de travail).")
+
+
+class WorkProgramAccessBenchmark(models.AbstractModel):
+    """
+    Mesure du coût des règles d'accès sur la liste des programmes de travail.
+
+    Génère des programmes synthétiques en SQL dans un savepoint annulé ensuite,
+    puis chronomètre la requête d'une vue liste (page de 80 lignes + comptage)
+    avec l'ancienne règle (chaîne employé > département et jointures sur les
+    utilisateurs) et avec la règle actuelle.
+    """
+    _name = 'work.program.access.benchmark'
+    _description = "Mesure des règles d'accès des programmes de travail"
+
+    # Règle d'origine, conservée pour comparaison
+    LEGACY_RULE = ("['|', ('work_programm_department_id', 'in', user.employee_id.department_id.id), "
+                   "'|', ('responsible_id.user_id', '=', user.id), ('support_ids.user_id', 'in', [user.id])]")
+
+    @api.model
+    def _generate_programs(self, nb_programs):
+        """Insère ``nb_programs`` programmes répartis sur les départements et employés existants."""
+        self.env.cr.execute("SELECT array_agg(id) FROM hr_department")
+        department_ids = self.env.cr.fetchone()[0] or []
+        self.env.cr.execute("SELECT array_agg(id) FROM hr_employee")
+        employee_ids = self.env.cr.fetchone()[0] or []
+        if not department_ids or not employee_ids:
+            raise UserError(_("Au moins un département et un employé sont nécessaires pour la mesure."))
+        self.env.cr.execute("""
+            INSERT INTO work_program (name, work_programm_department_id, responsible_id, status, my_week_of,
+                                      create_uid, write_uid, create_date, write_date)
+            SELECT 'BENCH-' || n,
+                   (%(departments)s::int[])[1 + n %% array_length(%(departments)s::int[], 1)],
+                   (%(employees)s::int[])[1 + (n / 7) %% array_length(%(employees)s::int[], 1)],
+                   (ARRAY['draft', 'ongoing', 'done', 'cancelled'])[1 + n %% 4],
+                   date_trunc('week', now())::date - 7 * (n %% 52),
+                   %(uid)s, %(uid)s, now() at time zone 'UTC', now() at time zone 'UTC'
+              FROM generate_series(1, %(nb)s) AS n
+            RETURNING id
+        """, {'departments': department_ids, 'employees': employee_ids, 'nb': nb_programs, 'uid': self.env.uid})
+        program_ids = [row[0] for row in self.env.cr.fetchall()]
+        support_field = self.env['work.program']._fields['support_ids']
+        # Un employé en support pour un programme sur cinq
+        self.env.cr.execute(f"""
+            INSERT INTO {support_field.relation} ({support_field.column1}, {support_field.column2})
+            SELECT p.id, (%(employees)s::int[])[1 + (p.id / 3) %% array_length(%(employees)s::int[], 1)]
+              FROM unnest(%(programs)s::int[]) AS p(id)
+             WHERE p.id %% 5 = 0
+            ON CONFLICT DO NOTHING
+        """, {'employees': employee_ids, 'programs': program_ids})
+        self.env.cr.execute("ANALYZE work_program")
+        self.env.cr.execute(f"ANALYZE {support_field.relation}")
+
+    @api.model
+    def _time_list_view(self, domain, repeat):
+        """Durée médiane (ms) d'une page de vue liste : search limitée + search_count."""
+        Program = self.env['work.program'].sudo()
+        durations = []
+        for __ in range(repeat):
+            self.env.invalidate_all()
+            start = time.perf_counter()
+            Program.search(domain, limit=80, order='id desc').ids
+            Program.search_count(domain)
+            durations.append((time.perf_counter() - start) * 1000)
+        return round(statistics.median(durations), 2)
+
+    @api.model
+    def run(self, nb_programs=500000, repeat=5, user_id=None):
+        """
+        Compare l'ancienne et la nouvelle règle pour ``user_id`` (utilisateur courant
+        par défaut) sur ``nb_programs`` programmes synthétiques.
+
+        Retourne ``{'nb_programs', 'legacy_ms', 'current_ms', 'speedup'}``.
+        """
+        if not self.env.user.has_group('workprogramm.workprogramm_group_admin'):
+            raise UserError(_("Seuls les administrateurs peuvent lancer cette mesure."))
+        user = self.env['res.users'].browse(user_id) if user_id else self.env.user
+        rule = self.env.ref('workprogramm.workprogramm_work_program_own_department')
+        eval_context = self.env['ir.rule'].with_user(user)._eval_context()
+        legacy_domain = safe_eval(self.LEGACY_RULE, eval_context)
+        current_domain = safe_eval(rule.domain_force, eval_context)
+        with self.env.cr.savepoint() as savepoint:
+            self._generate_programs(nb_programs)
+            result = {
+                'nb_programs': nb_programs,
+                'legacy_ms': self._time_list_view(legacy_domain, repeat),
+                'current_ms': self._time_list_view(current_domain, repeat),
+            }
+            savepoint.rollback()
+        self.env.invalidate_all()
+        result['speedup'] = result['current_ms'] and round(result['legacy_ms'] / result['current_ms'], 2)
+        _logger.info(f"Mesure des règles d'accès des programmes de travail : {result}")
+        return result
@@ -0,0 +1,242 @@
+# -*- coding: utf-8 -*-
+import logging
+import threading
+from datetime import date, timedelta
+
+from odoo import models, api, fields, _
+from odoo.exceptions import UserError
+
+_logger = logging.getLogger(__name__)
+
+
+class WorkProgramArchive(models.Model):
+    """
+    Archive des programmes de travail clôturés (terminés ou annulés).
+
+    Une tâche planifiée déplace par paquets, en SQL, les programmes clôturés dont
+    la semaine et la date limite réelle sont plus anciennes que le délai configuré
+    (paramètre système ``workprogramm.archive_after_weeks``, 0 pour désactiver),
+    avec leurs livrables et supports. Les programmes gardent leur identifiant :
+    le chatter et les indicateurs restent rattachés, et la restauration en masse
+    les réinsère à l'identique dans work.program. Les activités planifiées des
+    programmes archivés sont supprimées ; les liens des modèles qui gardent
+    l'identifiant du programme (suivi archivé, soumissions) sont rétablis à la
+    restauration.
+    """
+    _name = 'work.program.archive'
+    _description = 'Archive des programmes de travail'
+    _order = 'my_week_of desc, id desc'
+
+    name = fields.Char(string='Nom du programme', readonly=True)
+    user_id = fields.Many2one('res.users', string='Utilisateur Associé', readonly=True)
+    work_programm_department_id = fields.Many2one('hr.department', string='Département autorisé', readonly=True,
+                                                  index=True)
+    my_week_of = fields.Date(string='Semaine', readonly=True, index=True)
+    my_month = fields.Char(string='Mois', readonly=True)
+    week_of = fields.Integer(string='Semaine de', readonly=True)
+    project_id = fields.Many2one('project.project', string='Projet / Programme', readonly=True)
+    activity_id = fields.Many2one('workflow.activity', string='Activité', readonly=True)
+    procedure_id = fields.Many2one('workflow.procedure', string='Type de tâche (Procédure)', readonly=True)
+    task_description_id = fields.Many2one('workflow.task.formulation', string='Description de la tâche', readonly=True)
+    domain_id = fields.Many2one('workflow.domain', string='Domaine', readonly=True)
+    process_id = fields.Many2one('workflow.process', string='Processus', readonly=True)
+    sub_process_id = fields.Many2one('workflow.subprocess', string='Sous-processus', readonly=True)
+    inputs_needed = fields.Text(string='Entrées nécessaires', readonly=True)
+    deliverable_ids = fields.Many2many('workflow.deliverable', 'work_program_archive_deliverable_rel',
+                                       'archive_id', 'deliverable_id', string='Livrables de la tâche', readonly=True)
+    priority = fields.Char(string='Priorité', readonly=True)
+    complexity = fields.Char(string='Complexité', readonly=True)
+    assignment_date = fields.Date(string="Date d'assignation", readonly=True)
+    duration_effort = fields.Float(string='Durée / Effort (heures)', readonly=True)
+    initial_deadline = fields.Date(string='Date limite initiale', readonly=True)
+    nb_postpones = fields.Integer(string='Nombre de reports', readonly=True)
+    actual_deadline = fields.Date(string='Date limite réelle', readonly=True)
+    responsible_id = fields.Many2one('hr.employee', string='Responsable', readonly=True, index=True)
+    support_ids = fields.Many2many('hr.employee', 'work_program_archive_support_rel',
+                                   'archive_id', 'employee_id', string='Support', readonly=True)
+    status = fields.Selection([
+        ('done', 'Terminé'),
+        ('cancelled', 'Annulé'),
+    ], string='Statut', readonly=True)
+    completion_percentage = fields.Float(string="Pourcentage d'achèvement", readonly=True)
+    satisfaction_level = fields.Char(string='Niveau de satisfaction', readonly=True)
+    comments = fields.Text(string='Commentaires / Remarques', readonly=True)
+    champ1 = fields.Char(string='Champ 1', readonly=True)
+    champ2 = fields.Text(string='Champ 2', readonly=True)
+    is_external_department = fields.Boolean(string='Département Externe', readonly=True)
+    is_recurring = fields.Boolean(string='Récurrent', readonly=True)
+    # Identifiant simple : le programme source peut lui-même être archivé
+    rollover_source_id = fields.Integer(string='Reconduit depuis', readonly=True)
+    archive_date = fields.Datetime(string='Archivé le', readonly=True)
+
+    _CONFIG_ARCHIVE_AFTER_WEEKS = 'workprogramm.archive_after_weeks'
+    _DEFAULT_ARCHIVE_AFTER_WEEKS = 52
+    _BATCH_SIZE = 5000
+    _MANY2MANY_FIELDS = ('deliverable_ids', 'support_ids')
+    # Modèle -> (lien vidé par l'archivage, identifiant conservé du programme)
+    _PROGRAM_LINKS = {
+        'work.program.tracking.archive': ('work_program_id', 'work_program_res_id'),
+        'work.program.submission': ('work_program_id', 'work_program_res_id'),
+    }
+    # Champs stockés recalculés après restauration (la hiérarchie a pu changer depuis l'archivage)
+    _RECOMPUTED_FIELDS = ('sub_process_id', 'process_id', 'domain_id', 'hierarchy_path', 'is_external_department')
+
+    @api.model
+    def _get_archive_after_weeks(self):
+        value = self.env['ir.config_parameter'].sudo().get_param(
+            self._CONFIG_ARCHIVE_AFTER_WEEKS, str(self._DEFAULT_ARCHIVE_AFTER_WEEKS))
+        try:
+            return max(int(value), 0)
+        except ValueError:
+            return self._DEFAULT_ARCHIVE_AFTER_WEEKS
+
+    @api.model
+    def _get_common_columns(self):
+        """Colonnes communes à work_program et à l'archive, copiées dans les deux sens."""
+        Program = self.env['work.program']
+        return ['id', 'create_uid', 'create_date'] + [
+            name for name, field in self._fields.items()
+            if field.store and field.column_type and name in Program._fields and Program._fields[name].store
+            and name not in models.MAGIC_COLUMNS
+        ]
+
+    @api.model
+    def _move(self, ids, to_archive):
+        """Déplace en SQL les programmes ``ids`` vers l'archive (ou l'inverse) avec leurs many2many."""
+        Program = self.env['work.program']
+        source, target = (Program, self) if to_archive else (self, Program)
+        columns = self._get_common_columns()
+        target_columns = columns + ['write_uid', 'write_date']
+        values = columns + ['%(uid)s', "now() at time zone 'UTC'"]
+        expressions = {}
+        if to_archive:
+            target_columns.append('archive_date')
+            values.append("now() at time zone 'UTC'")
+        else:
+            # Lien de report conservé si la source existe (ou est restaurée avec) et n'a pas été reconduite
+            # depuis ; une seule copie restaurée par source (contrainte d'unicité)
+            expressions['rollover_source_id'] = f"""
+                CASE WHEN (src.rollover_source_id = ANY(%(ids)s)
+                           OR EXISTS (SELECT 1 FROM work_program p WHERE p.id = src.rollover_source_id))
+                      AND NOT EXISTS (SELECT 1 FROM work_program p WHERE p.rollover_source_id = src.rollover_source_id)
+                      AND src.id = (SELECT min(a.id) FROM {source._table} a
+                                     WHERE a.id = ANY(%(ids)s) AND a.rollover_source_id = src.rollover_source_id)
+                     THEN src.rollover_source_id END"""
+        self.env.cr.execute(f"""
+            INSERT INTO {target._table} ({', '.join(f'"{column}"' for column in target_columns)})
+            SELECT {', '.join(expressions.get(value) or (value if value not in columns else f'src."{value}"')
+                              for value in values)}
+              FROM {source._table} src
+             WHERE src.id = ANY(%(ids)s)
+        """, {'ids': list(ids), 'uid': self.env.uid})
+        for field_name in self._MANY2MANY_FIELDS:
+            source_field, target_field = source._fields[field_name], target._fields[field_name]
+            self.env.cr.execute(f"""
+                INSERT INTO {target_field.relation} ({target_field.column1}, {target_field.column2})
+                SELECT {source_field.column1}, {source_field.column2}
+                  FROM {source_field.relation}
+                 WHERE {source_field.column1} = ANY(%s)
+                ON CONFLICT DO NOTHING
+            """, [list(ids)])
+        Tombstone = self.env['work.program.tombstone']
+        if to_archive:
+            # Un programme archivé disparaît du flux de modifications comme un programme supprimé
+            self.env.cr.execute("SELECT id, work_programm_department_id FROM work_program WHERE id = ANY(%s)",
+                                [list(ids)])
+            rows = self.env.cr.fetchall()
+            archived_ids = [row[0] for row in rows]
+            Tombstone._record(Program._name, archived_ids, [row[1] for row in rows],
+                              Program._get_change_feed_user_ids(archived_ids))
+            # Les activités planifiées ne survivent pas au programme : pas de rappels vers un enregistrement absent
+            self.env.cr.execute("DELETE FROM mail_activity WHERE res_model = %s AND res_id = ANY(%s)",
+                                [Program._name, list(ids)])
+        else:
+            Tombstone._forget(Program._name, ids)
+            for model_name, (link_field, res_id_field) in self._PROGRAM_LINKS.items():
+                self.env.cr.execute(f"""
+                    UPDATE {self.env[model_name]._table} SET "{link_field}" = "{res_id_field}"
+                     WHERE "{res_id_field}" = ANY(%s) AND "{link_field}" IS NULL
+                """, [list(ids)])
+        # Les lignes des many2many de la source sont supprimées en cascade
+        self.env.cr.execute(f"DELETE FROM {source._table} WHERE id = ANY(%s)", [list(ids)])
+
+    @api.model
+    def archive_programs(self, before_week, department_ids=None, batch_size=None, auto_commit=False):
+        """
+        Archive les programmes clôturés dont la semaine et la date limite réelle sont
+        antérieures à ``before_week``. Retourne le nombre de programmes archivés.
+        """
+        batch_size = batch_size or self._BATCH_SIZE
+        department_clause = "AND work_programm_department_id = ANY(%(departments)s)" if department_ids else ""
+        self.env.flush_all()
+        total = 0
+        while True:
+            self.env.cr.execute(f"""
+                SELECT id FROM work_program
+                 WHERE status IN ('done', 'cancelled')
+                   AND GREATEST(my_week_of, actual_deadline) < %(before)s
+                   {department_clause}
+                 ORDER BY id
+                 LIMIT %(limit)s
+            """, {'before': before_week, 'departments': list(department_ids or []), 'limit': batch_size})
+            ids = [row[0] for row in self.env.cr.fetchall()]
+            if ids:
+                self._move(ids, to_archive=True)
+                total += len(ids)
+            if auto_commit:
+                self.env.cr.commit()
+            if len(ids) < batch_size:
+                break
+        self.env.invalidate_all()
+        _logger.info(f"{total} programme(s) de travail clôturé(s) archivé(s) (semaines antérieures au {before_week})")
+        return total
+
+    @api.model
+    def _cron_archive_programs(self):
+        weeks = self._get_archive_after_weeks()
+        if not weeks:
+            return
+        Program = self.env['work.program']
+        before_week = Program._get_monday(date.today()) - timedelta(weeks=weeks)
+        auto_commit = not getattr(threading.current_thread(), 'testing', False)
+        self.archive_programs(before_week, auto_commit=auto_commit)
+
+    def restore(self):
+        """Réinsère en masse les programmes archivés dans work.program, avec leurs identifiants."""
+        if not self:
+            return self.env['work.program']
+        self.env['work.program'].check_access_rights('create')
+        self.env.flush_all()
+        ids = self.ids
+        self._move(ids, to_archive=False)
+        self.env.invalidate_all()
+        programs = self.env['work.program'].browse(ids)
+        for field_name in self._RECOMPUTED_FIELDS:
+            self.env.add_to_compute(programs._fields[field_name], programs)
+        programs.flush_recordset()
+        programs._update_search_vector(ids)
+        _logger.info(f"{len(ids)} programme(s) de travail restauré(s) depuis l'archive")
+        return programs
+
+    @api.model
+    def restore_weeks(self, week_from, week_to, department_ids=None):
+        """Restaure les programmes archivés des semaines ``week_from`` à ``week_to`` incluses."""
+        domain = [('my_week_of', '>=', week_from), ('my_week_of', '<=', week_to)]
+        if department_ids:
+            domain.append(('work_programm_department_id', 'in', list(department_ids)))
+        return self.search(domain).restore()
+
+    def action_restore(self):
+        if not self.env.user.has_group('workprogramm.workprogramm_group_admin'):
+            raise UserError(_("Seuls les administrateurs peuvent restaurer des programmes archivés."))
+        programs = self.restore()
+        return {
+            'type': 'ir.actions.client',
+            'tag': 'display_notification',
+            'params': {
+                'title': _("Restauration terminée"),
+                'message': _("%s programme(s) restauré(s).") % len(programs),
+                'type': 'success',
+                'next': {'type': 'ir.actions.client', 'tag': 'reload'},
+            },
+        }
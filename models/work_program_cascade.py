@@ -0,0 +1,204 @@
+# -*- coding: utf-8 -*-
+import logging
+import threading
+
+from odoo import models, api, SUPERUSER_ID
+
+_logger = logging.getLogger(__name__)
+
+
+class WorkProgramCascade(models.AbstractModel):
+    """
+    Index d'adjacence en mémoire de la cascade Activité > Procédures / Livrables
+    et Procédure > Formulations de tâches.
+
+    L'index est construit une seule fois par registre (trois requêtes), puis tenu
+    à jour de façon incrémentale après chaque commit modifiant les modèles
+    concernés. Les autres workers détectent un changement grâce à la séquence
+    PostgreSQL ``work_program_cascade_seq`` et reconstruisent alors leur index,
+    par un curseur neuf ouvert après la lecture de la version : un index partagé ne
+    précède jamais une modification déjà signalée.
+    """
+    _name = 'work.program.cascade'
+    _description = 'Index de la cascade activité / procédure / formulation'
+
+    _SEQUENCE = 'work_program_cascade_seq'
+    # Clé de nœud -> (table, colonne parent, type du parent)
+    _CHILD_TABLES = {
+        'procedure': ('workflow_procedure', 'activity_id', 'activity'),
+        'deliverable': ('workflow_deliverable', 'activity_id', 'activity'),
+        'task_description': ('workflow_task_formulation', 'procedure_id', 'procedure'),
+    }
+    _MODEL_KEYS = {
+        'workflow.activity': 'activity',
+        'workflow.procedure': 'procedure',
+        'workflow.deliverable': 'deliverable',
+        'workflow.task.formulation': 'task_description',
+    }
+    _lock = threading.RLock()
+
+    def init(self):
+        self.env.cr.execute(f"CREATE SEQUENCE IF NOT EXISTS {self._SEQUENCE}")
+
+    # ------------------------------------------------------------------
+    # Construction et lecture de l'index
+    # ------------------------------------------------------------------
+    @api.model
+    def _get_db_version(self):
+        self.env.cr.execute(f"SELECT last_value, is_called FROM {self._SEQUENCE}")
+        last_value, is_called = self.env.cr.fetchone()
+        return last_value if is_called else 0
+
+    @api.model
+    def _build_index(self, version):
+        """Construit l'index complet : {'children': {(type, id): {type_enfant: {id: nom}}}, 'parent': {...}}."""
+        children = {}
+        parents = {}
+        for child_key, (table, parent_column, parent_key) in self._CHILD_TABLES.items():
+            self.env.cr.execute(f"SELECT id, name, {parent_column} FROM {table} WHERE {parent_column} IS NOT NULL")
+            for child_id, name, parent_id in self.env.cr.fetchall():
+                children.setdefault((parent_key, parent_id), {}).setdefault(child_key, {})[child_id] = name
+                parents[(child_key, child_id)] = (parent_key, parent_id)
+        _logger.info(f"Index de cascade construit (version {version}, {len(parents)} éléments)")
+        return {'version': version, 'children': children, 'parent': parents}
+
+    @api.model
+    def _get_index(self):
+        """Retourne l'index du registre courant, reconstruit s'il est périmé."""
+        version = self._get_db_version()
+        if self.env.cr.postcommit.data.get('work_program_cascade'):
+            # Transaction en cours avec des modifications non validées : index local non partagé
+            return self._build_index(version)
+        with self._lock:
+            index = getattr(self.pool, '_work_program_cascade_index', None)
+            if index is None or index['version'] < version:
+                with self.pool.cursor() as cr:
+                    index = self.with_env(self.env(cr=cr))._build_index(version)
+                self.pool._work_program_cascade_index = index
+            return index
+
+    @api.model
+    def _format_children(self, node, child_key):
+        return [
+            {'id': child_id, 'name': name}
+            for child_id, name in sorted(node.get(child_key, {}).items(), key=lambda item: (item[1] or '', item[0]))
+        ]
+
+    @api.model
+    def get_activity_subtree(self, activity_id):
+        """
+        Retourne en un seul appel le sous-arbre dépendant d'une activité :
+        ``{'procedures': [{'id', 'name', 'task_descriptions': [...]}], 'deliverables': [...]}``.
+        """
+        index = self._get_index()
+        with self._lock:
+            node = index['children'].get(('activity', activity_id), {})
+            procedures = self._format_children(node, 'procedure')
+            for procedure in procedures:
+                procedure['task_descriptions'] = self._format_children(
+                    index['children'].get(('procedure', procedure['id']), {}), 'task_description')
+            return {
+                'procedures': procedures,
+                'deliverables': self._format_children(node, 'deliverable'),
+            }
+
+    @api.model
+    def get_child_ids(self, parent_key, parent_id, child_key):
+        index = self._get_index()
+        with self._lock:
+            return set(index['children'].get((parent_key, parent_id), {}).get(child_key, {}))
+
+    # ------------------------------------------------------------------
+    # Mise à jour incrémentale
+    # ------------------------------------------------------------------
+    @api.model
+    def _notify_changes(self, model_name, ids):
+        """Enregistre des enregistrements modifiés ; l'index est mis à jour après le commit."""
+        if not ids:
+            return
+        key = self._MODEL_KEYS[model_name]
+        cr = self.env.cr
+        pending = cr.postcommit.data.get('work_program_cascade')
+        if pending is None:
+            pending = cr.postcommit.data['work_program_cascade'] = {}
+            registry = self.pool
+
+            def apply_cascade_changes():
+                changes = cr.postcommit.data.pop('work_program_cascade', {})
+                with registry.cursor() as new_cr:
+                    env = api.Environment(new_cr, SUPERUSER_ID, {})
+                    env['work.program.cascade']._apply_changes(changes)
+
+            cr.postcommit.add(apply_cascade_changes)
+        pending.setdefault(key, set()).update(ids)
+
+    @api.model
+    def _apply_changes(self, changes):
+        with self._lock:
+            index = getattr(self.pool, '_work_program_cascade_index', None)
+            new_version = self._bump_db_version()
+            if index is None:
+                return
+            if index['version'] + 1 != new_version:
+                # Un autre worker a modifié la cascade entre-temps : reconstruction à la prochaine lecture
+                self.pool._work_program_cascade_index = None
+                return
+            for child_key, ids in changes.items():
+                if child_key == 'activity':
+                    self._apply_activity_changes(index, ids)
+                else:
+                    self._apply_child_changes(index, child_key, ids)
+            index['version'] = new_version
+
+    @api.model
+    def _bump_db_version(self):
+        self.env.cr.execute(f"SELECT nextval('{self._SEQUENCE}')")
+        return self.env.cr.fetchone()[0]
+
+    @api.model
+    def _apply_activity_changes(self, index, ids):
+        self.env.cr.execute("SELECT id FROM workflow_activity WHERE id IN %s", [tuple(ids)])
+        existing = {row[0] for row in self.env.cr.fetchall()}
+        for activity_id in set(ids) - existing:
+            index['children'].pop(('activity', activity_id), None)
+
+    @api.model
+    def _apply_child_changes(self, index, child_key, ids):
+        table, parent_column, parent_key = self._CHILD_TABLES[child_key]
+        self.env.cr.execute(f"SELECT id, name, {parent_column} FROM {table} WHERE id IN %s", [tuple(ids)])
+        rows = {child_id: (name, parent_id) for child_id, name, parent_id in self.env.cr.fetchall()}
+        for child_id in ids:
+            old_parent = index['parent'].pop((child_key, child_id), None)
+            if old_parent:
+                index['children'].get(old_parent, {}).get(child_key, {}).pop(child_id, None)
+            name, parent_id = rows.get(child_id, (None, None))
+            if parent_id:
+                index['children'].setdefault((parent_key, parent_id), {}).setdefault(child_key, {})[child_id] = name
+                index['parent'][(child_key, child_id)] = (parent_key, parent_id)
+
+
+class WorkProgramCascadeMixin(models.AbstractModel):
+    """Signale à l'index de cascade les créations, modifications et suppressions."""
+    _name = 'work.program.cascade.mixin'
+    _description = "Mise à jour de l'index de cascade"
+
+    # Champs dont la modification impacte l'index
+    _cascade_fields = {'name', 'activity_id', 'procedure_id'}
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        records = super().create(vals_list)
+        self.env['work.program.cascade']._notify_changes(self._name, records.ids)
+        return records
+
+    def write(self, vals):
+        res = super().write(vals)
+        if self._cascade_fields.intersection(vals):
+            self.env['work.program.cascade']._notify_changes(self._name, self.ids)
+        return res
+
+    def unlink(self):
+        ids = self.ids
+        res = super().unlink()
+        self.env['work.program.cascade']._notify_changes(self._name, ids)
+        return res
@@ -0,0 +1,305 @@
+# -*- coding: utf-8 -*-
+import base64
+import binascii
+import json
+import logging
+
+from odoo import models, api, fields, tools, _
+from odoo.exceptions import UserError
+
+_logger = logging.getLogger(__name__)
+
+
+class WorkProgramTombstone(models.Model):
+    """
+    Trace des enregistrements supprimés (ou archivés), lue par le flux de modifications.
+
+    La colonne ``delete_xid`` (hors ORM) porte l'identifiant de la transaction qui a
+    enregistré la trace ; le flux parcourt les traces dans l'ordre (delete_xid, id).
+    La colonne ``user_ids`` (hors ORM) garde les utilisateurs qui voyaient
+    l'enregistrement par affectation (responsable, supports), en plus du département.
+    """
+    _name = 'work.program.tombstone'
+    _description = 'Suppressions publiées par le flux de modifications'
+    _order = 'id'
+    _log_access = False
+
+    res_model = fields.Char(string='Modèle', required=True, readonly=True)
+    res_id = fields.Integer(string='Enregistrement', required=True, readonly=True)
+    department_id = fields.Many2one('hr.department', string='Département', readonly=True, ondelete='set null')
+    delete_date = fields.Datetime(string='Supprimé le', required=True, readonly=True, index=True)
+
+    _KEEP_DAYS = 90
+    _CONFIG_PURGED_UPTO = 'workprogramm.change_feed_purged_upto'
+
+    def init(self):
+        # Valeur par défaut volatile : les traces existantes reçoivent la transaction courante
+        self.env.cr.execute(f"""
+            ALTER TABLE {self._table} ADD COLUMN IF NOT EXISTS delete_xid bigint NOT NULL DEFAULT txid_current()
+        """)
+        self.env.cr.execute(f"ALTER TABLE {self._table} ADD COLUMN IF NOT EXISTS user_ids int[]")
+        self.env.cr.execute(f"DROP INDEX IF EXISTS {self._table}_res_model_id_index")
+        tools.create_index(self.env.cr, f'{self._table}_res_model_xid_index', self._table,
+                           ['res_model', 'delete_xid', 'id'])
+
+    @api.model
+    def _record(self, model_name, ids, department_ids=None, user_ids=None):
+        """
+        Enregistre en une requête les suppressions ``ids`` de ``model_name``, avec pour
+        chacune son département et la liste des utilisateurs affectés.
+        """
+        if not ids:
+            return
+        ids = list(ids)
+        user_arrays = ['{%s}' % ','.join(str(user_id) for user_id in users) for users in user_ids or [[]] * len(ids)]
+        self.env.cr.execute(f"""
+            INSERT INTO {self._table} (res_model, res_id, department_id, user_ids, delete_date)
+            SELECT %s, res_id, department_id, user_ids::int[], now() at time zone 'UTC'
+              FROM unnest(%s::int[], %s::int[], %s::text[]) AS deleted(res_id, department_id, user_ids)
+        """, [model_name, ids, list(department_ids) if department_ids else [None] * len(ids), user_arrays])
+
+    @api.model
+    def _forget(self, model_name, ids):
+        """Retire les traces d'enregistrements réapparus (restauration)."""
+        if ids:
+            self.env.cr.execute(f"DELETE FROM {self._table} WHERE res_model = %s AND res_id = ANY(%s)",
+                                [model_name, list(ids)])
+
+    @api.model
+    def _cron_purge(self):
+        """Supprime les traces anciennes ; un curseur antérieur impose alors une resynchronisation complète."""
+        limit_date = fields.Datetime.subtract(fields.Datetime.now(), days=self._KEEP_DAYS)
+        self.env.cr.execute(f"DELETE FROM {self._table} WHERE delete_date < %s RETURNING delete_xid", [limit_date])
+        purged_xids = [row[0] for row in self.env.cr.fetchall()]
+        if purged_xids:
+            params = self.env['ir.config_parameter'].sudo()
+            purged_upto = max(int(params.get_param(self._CONFIG_PURGED_UPTO, '0') or 0), max(purged_xids))
+            params.set_param(self._CONFIG_PURGED_UPTO, str(purged_upto))
+            _logger.info(f"{len(purged_xids)} trace(s) de suppression purgée(s)")
+
+
+class WorkProgramChangeFeedMixin(models.AbstractModel):
+    """
+    Publie les modèles dans le flux de modifications : colonne ``change_feed_xid``
+    (hors ORM) renseignée par un déclencheur avec la transaction de la dernière
+    écriture, y compris en SQL direct, index (change_feed_xid, id) pour le parcours
+    par curseur, et trace de chaque suppression.
+    """
+    _name = 'work.program.change.feed.mixin'
+    _description = 'Publication dans le flux de modifications'
+
+    # Champ de département porté par les traces de suppression, pour le filtrage par département
+    _change_feed_department_field = None
+    # Champs hr.employee dont les utilisateurs voient l'enregistrement (règle d'accès par affectation)
+    _change_feed_employee_fields = ()
+
+    _CHANGE_FEED_XID_FUNCTION = 'workprogramm_change_feed_xid'
+
+    def init(self):
+        super().init()
+        if self._abstract:
+            return
+        cr = self.env.cr
+        cr.execute(f"""
+            CREATE OR REPLACE FUNCTION {self._CHANGE_FEED_XID_FUNCTION}() RETURNS trigger AS $$
+            BEGIN
+                NEW.change_feed_xid := txid_current();
+                RETURN NEW;
+            END
+            $$ LANGUAGE plpgsql
+        """)
+        if not tools.column_exists(cr, self._table, 'change_feed_xid'):
+            tools.create_column(cr, self._table, 'change_feed_xid', 'bigint')
+        cr.execute(f"""
+            DROP TRIGGER IF EXISTS {self._table}_change_feed_xid ON "{self._table}";
+            CREATE TRIGGER {self._table}_change_feed_xid BEFORE INSERT OR UPDATE ON "{self._table}"
+                FOR EACH ROW EXECUTE FUNCTION {self._CHANGE_FEED_XID_FUNCTION}();
+        """)
+        # Le déclencheur renseigne les lignes existantes
+        cr.execute(f'UPDATE "{self._table}" SET change_feed_xid = NULL WHERE change_feed_xid IS NULL')
+        cr.execute(f"DROP INDEX IF EXISTS {self._table}_write_date_id_index")
+        tools.create_index(cr, f'{self._table}_change_feed_xid_index', self._table, ['change_feed_xid', 'id'])
+
+    @api.model
+    def _get_change_feed_user_ids(self, ids):
+        """Utilisateurs des employés affectés (``_change_feed_employee_fields``), alignés sur ``ids``."""
+        if not self._change_feed_employee_fields or not ids:
+            return None
+        links = []
+        for field_name in self._change_feed_employee_fields:
+            field = self._fields[field_name]
+            if field.type == 'many2many':
+                links.append(f'SELECT "{field.column1}", "{field.column2}" FROM "{field.relation}" '
+                             f'WHERE "{field.column1}" = ANY(%(ids)s)')
+            else:
+                links.append(f'SELECT id, "{field_name}" FROM "{self._table}" WHERE id = ANY(%(ids)s)')
+        self.flush_model(self._change_feed_employee_fields)
+        self.env.cr.execute(f"""
+            SELECT link.res_id, array_agg(DISTINCT e.user_id)
+              FROM ({' UNION ALL '.join(links)}) AS link(res_id, employee_id)
+              JOIN hr_employee e ON e.id = link.employee_id
+             WHERE e.user_id IS NOT NULL
+             GROUP BY link.res_id
+        """, {'ids': list(ids)})
+        user_ids = dict(self.env.cr.fetchall())
+        return [user_ids.get(record_id, []) for record_id in ids]
+
+    def unlink(self):
+        ids = self.ids
+        department_ids = None
+        if self._change_feed_department_field:
+            department_ids = [record[self._change_feed_department_field].id or None for record in self]
+        user_ids = self._get_change_feed_user_ids(ids)
+        res = super().unlink()
+        self.env['work.program.tombstone']._record(self._name, ids, department_ids, user_ids)
+        return res
+
+
+class WorkProgramChangeFeed(models.AbstractModel):
+    """
+    Flux de modifications des programmes de travail et du catalogue workflow.*.
+
+    Le client conserve un curseur opaque (position ``(transaction, id)`` dans le
+    modèle et dans les traces de suppression) et ne reçoit que les enregistrements
+    créés ou modifiés depuis, puis les identifiants supprimés, par pages bornées.
+    Les enregistrements sont lus sous les règles d'accès de l'utilisateur
+    (départements, responsable et supports pour les programmes) ; les traces de
+    suppression sont filtrées selon les mêmes critères.
+
+    Seules les écritures des transactions antérieures au ``xmin`` de l'instantané
+    courant (plus ancienne transaction encore ouverte) sont publiées : toute
+    transaction qui validera plus tard porte un identifiant supérieur ou égal et
+    ne peut donc pas valider derrière le curseur. Une transaction longue retarde
+    la publication des écritures suivantes jusqu'à sa fin.
+    """
+    _name = 'work.program.change.feed'
+    _description = 'Flux de modifications des programmes de travail'
+
+    # Clé exposée par la route -> (modèle, champs publiés)
+    FEED_MODELS = {
+        'program': ('work.program', [
+            'name', 'work_programm_department_id', 'my_week_of', 'project_id', 'activity_id', 'procedure_id',
+            'task_description_id', 'deliverable_ids', 'inputs_needed', 'priority', 'complexity',
+            'assignment_date', 'duration_effort', 'initial_deadline', 'nb_postpones', 'actual_deadline',
+            'responsible_id', 'support_ids', 'status', 'completion_percentage', 'comments',
+        ]),
+        'domain': ('workflow.domain', ['name', 'dpt_type']),
+        'process': ('workflow.process', ['name', 'domain_id']),
+        'subprocess': ('workflow.subprocess', ['name', 'process_id']),
+        'activity': ('workflow.activity', ['name', 'sub_process_id']),
+        'procedure': ('workflow.procedure', ['name', 'activity_id']),
+        'deliverable': ('workflow.deliverable', ['name', 'activity_id']),
+        'task_formulation': ('workflow.task.formulation', ['name', 'procedure_id']),
+    }
+    MAX_LIMIT = 1000
+
+    @api.model
+    def _encode_cursor(self, model_key, position, tombstone_position):
+        payload = {'m': model_key, 'p': list(position), 't': list(tombstone_position)}
+        return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+
+    @api.model
+    def _decode_cursor(self, model_key, cursor):
+        """Positions ``(transaction, id)`` dans le modèle et dans les traces de suppression."""
+        if not cursor:
+            return (0, 0), (0, 0)
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            if payload['m'] != model_key:
+                raise ValueError(payload['m'])
+            position, tombstone_position = payload['p'], payload['t']
+            return (int(position[0]), int(position[1])), (int(tombstone_position[0]), int(tombstone_position[1]))
+        except (binascii.Error, ValueError, KeyError, TypeError, IndexError):
+            raise UserError(_("Curseur de synchronisation invalide."))
+
+    @api.model
+    def _get_snapshot_xmin(self):
+        """Plus ancienne transaction encore ouverte lors de l'instantané de la transaction courante."""
+        self.env.cr.execute("SELECT txid_snapshot_xmin(txid_current_snapshot())")
+        return self.env.cr.fetchone()[0]
+
+    @api.model
+    def _fetch_changed_ids(self, model, position, xmin, limit):
+        """(id, transaction) des enregistrements modifiés après la position, sous les règles d'accès."""
+        query = model._where_calc([])
+        model._apply_ir_rules(query, 'read')
+        table = f'"{model._table}"'
+        query.add_where(f"{table}.change_feed_xid < %s", [xmin])
+        query.add_where(f"({table}.change_feed_xid, {table}.id) > (%s, %s)", list(position))
+        query.order = f"{table}.change_feed_xid, {table}.id"
+        query.limit = limit
+        select_sql, params = query.select(f"{table}.id", f"{table}.change_feed_xid")
+        self.env.cr.execute(select_sql, params)
+        return self.env.cr.fetchall()
+
+    @api.model
+    def _fetch_tombstones(self, model_name, tombstone_position, xmin, limit):
+        """(transaction, id, res_id) des traces postérieures à la position, filtrées comme la règle d'accès."""
+        department_clause = ""
+        params = {'model': model_name, 'xmin': xmin, 'xid': tombstone_position[0], 'id': tombstone_position[1],
+                  'limit': limit}
+        if model_name == 'work.program' and not (
+                self.env.user.has_group('workprogramm.workprogramm_group_manager')
+                or self.env.user.has_group('workprogramm.workprogramm_group_admin')):
+            department_clause = "AND (department_id = ANY(%(departments)s) OR %(uid)s = ANY(user_ids))"
+            params['departments'] = self.env.user.work_program_department_ids.ids
+            params['uid'] = self.env.uid
+        self.env.cr.execute(f"""
+            SELECT delete_xid, id, res_id FROM {self.env['work.program.tombstone']._table}
+             WHERE res_model = %(model)s
+               AND delete_xid < %(xmin)s
+               AND (delete_xid, id) > (%(xid)s, %(id)s)
+               {department_clause}
+             ORDER BY delete_xid, id
+             LIMIT %(limit)s
+        """, params)
+        return self.env.cr.fetchall()
+
+    @api.model
+    def get_changes(self, model_key, cursor=None, limit=500):
+        """
+        Page de modifications de ``model_key`` (voir FEED_MODELS) depuis ``cursor``.
+
+        Retourne ``{'records': [...], 'deleted': [ids], 'cursor': str, 'has_more': bool,
+        'reset': bool}``. ``reset`` indique que le curseur précède les traces de
+        suppression conservées : le client doit repartir d'un curseur vide.
+        """
+        if model_key not in self.FEED_MODELS:
+            raise UserError(_("Modèle inconnu : %s") % model_key)
+        model_name, field_names = self.FEED_MODELS[model_key]
+        model = self.env[model_name]
+        model.check_access_rights('read')
+        limit = min(max(int(limit or 500), 1), self.MAX_LIMIT)
+        position, tombstone_position = self._decode_cursor(model_key, cursor)
+
+        purged_upto = int(self.env['ir.config_parameter'].sudo().get_param(
+            self.env['work.program.tombstone']._CONFIG_PURGED_UPTO, '0') or 0)
+        if cursor and purged_upto and tombstone_position[0] <= purged_upto:
+            return {'records': [], 'deleted': [], 'cursor': False, 'has_more': False, 'reset': True}
+
+        self.env.flush_all()
+        xmin = self._get_snapshot_xmin()
+        # Une ligne de plus que demandé pour savoir s'il existe une page suivante
+        rows = self._fetch_changed_ids(model, position, xmin, limit + 1)
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        records = model.browse([row[0] for row in rows]).read(field_names) if rows else []
+        if rows:
+            position = rows[-1]
+
+        tombstones = self._fetch_tombstones(model_name, tombstone_position, xmin, limit + 1)
+        if len(tombstones) > limit:
+            has_more = True
+            tombstones = tombstones[:limit]
+            tombstone_position = tombstones[-1][:2]
+        else:
+            # Toutes les traces antérieures à xmin sont lues : le curseur avance jusqu'à xmin,
+            # sans quoi une purge ultérieure imposerait une resynchronisation inutile
+            tombstone_position = max(tombstone_position, (xmin, 0))
+        return {
+            'records': records,
+            'deleted': [tombstone[2] for tombstone in tombstones],
+            'cursor': self._encode_cursor(model_key, position, tombstone_position),
+            'has_more': has_more,
+            'reset': False,
+        }
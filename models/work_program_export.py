@@ -0,0 +1,230 @@
+# -*- coding: utf-8 -*-
+import csv
+import io
+import logging
+import tempfile
+import uuid
+from urllib.parse import urlencode
+
+import xlsxwriter
+
+from odoo import models, api, fields, _
+from odoo.exceptions import UserError
+
+_logger = logging.getLogger(__name__)
+
+
+class WorkProgramExport(models.AbstractModel):
+    """
+    Export en flux des programmes de travail dans la disposition du fichier d'import.
+
+    Les programmes sont lus par un curseur serveur (``DECLARE ... CURSOR``) par
+    paquets de ``_CHUNK_SIZE`` lignes ; pour chaque paquet, les noms des références
+    (départements, activités, procédures, formulations, employés) et les many2many
+    (livrables, supports) sont chargés en une requête par modèle. Chaque paquet est
+    écrit puis libéré : la mémoire reste constante quel que soit le volume.
+    """
+    _name = 'work.program.export'
+    _description = 'Export en flux des programmes de travail'
+
+    _CHUNK_SIZE = 2000
+
+    # Colonne du fichier -> colonne de work_program, dans l'ordre attendu par import_work_program
+    EXPORT_COLUMNS = [
+        ('Departments', 'work_programm_department_id'),
+        ('Month', 'my_month'),
+        ('Week of', 'week_of'),
+        ('Activity', 'activity_id'),
+        ('Task Type (Procedure)', 'procedure_id'),
+        ('Task Description', 'name'),
+        ('Inputs needed (If applicable)', 'inputs_needed'),
+        ('Task Deliverable(s)', 'deliverable_ids'),
+        ('Priority', 'priority'),
+        ('Complexity', 'complexity'),
+        ('Assignment date', 'assignment_date'),
+        ('Duration / Effort (Hrs)', 'duration_effort'),
+        ('Initial Dateline', 'initial_deadline'),
+        ('Nb of Postpones', 'nb_postpones'),
+        ('Actual Deadline', 'actual_deadline'),
+        ('Responsible', 'responsible_id'),
+        ('Support', 'support_ids'),
+        ('Status', 'status'),
+        ('% of completion', 'completion_percentage'),
+        ('Satisfaction Level', 'satisfaction_level'),
+        ('Comments / Remarques / Problems encountered / Additionals informations', 'comments'),
+        ('Champ 1', 'champ1'),
+        ('Champ 2', 'champ2'),
+    ]
+
+    @api.model
+    def _get_export_domain(self, department_ids=None, week_from=None, week_to=None, statuses=None):
+        Program = self.env['work.program']
+        domain = []
+        if department_ids:
+            domain.append(('work_programm_department_id', 'in', list(department_ids)))
+        if week_from:
+            domain.append(('my_week_of', '>=', Program._get_monday(week_from)))
+        if week_to:
+            domain.append(('my_week_of', '<=', Program._get_monday(week_to)))
+        if statuses:
+            domain.append(('status', 'in', list(statuses)))
+        return domain
+
+    @api.model
+    def _get_names(self, model_name, ids):
+        """{id: nom} pour un paquet, en une requête (ou depuis le cache des cadres de référence)."""
+        ids = {record_id for record_id in ids if record_id}
+        if not ids:
+            return {}
+        if model_name in self.env['workflow.reference.cache'].CACHED_MODELS:
+            return self.env['workflow.reference.cache'].get_names(model_name, ids)
+        records = self.env[model_name].sudo().with_context(active_test=False).browse(ids)
+        return {record['id']: record['name'] for record in records.read(['name'])}
+
+    @api.model
+    def _get_many2many_ids(self, field_name, program_ids):
+        """{programme: [ids]} d'un many2many de work.program pour un paquet, en une requête."""
+        field = self.env['work.program']._fields[field_name]
+        self.env.cr.execute(f"""
+            SELECT {field.column1}, array_agg({field.column2} ORDER BY {field.column2})
+              FROM {field.relation}
+             WHERE {field.column1} = ANY(%s)
+             GROUP BY {field.column1}
+        """, [program_ids])
+        return dict(self.env.cr.fetchall())
+
+    @api.model
+    def _format_chunk(self, rows, columns):
+        """Convertit un paquet de lignes SQL en lignes du fichier."""
+        Program = self.env['work.program']
+        program_ids = [row[0] for row in rows]
+        many2many = {name: self._get_many2many_ids(name, program_ids) for name in ('deliverable_ids', 'support_ids')}
+        names = {}
+        for index, column in enumerate(columns):
+            field = Program._fields[column]
+            if field.type == 'many2one':
+                names[column] = self._get_names(field.comodel_name, {row[index + 1] for row in rows})
+            elif field.type == 'many2many':
+                ids = {record_id for record_ids in many2many[column].values() for record_id in record_ids}
+                names[column] = self._get_names(field.comodel_name, ids)
+        for row in rows:
+            line = []
+            for index, column in enumerate(columns):
+                field = Program._fields[column]
+                value = row[index + 1]
+                if field.type == 'many2one':
+                    value = names[column].get(value, '')
+                elif field.type == 'many2many':
+                    value = ', '.join(names[column][record_id] for record_id in many2many[column].get(row[0], ())
+                                      if record_id in names[column])
+                elif field.type == 'float' and value is not None and float(value).is_integer():
+                    value = int(value)
+                elif field.type == 'date' and value:
+                    value = fields.Date.to_string(value)
+                line.append('' if value is None or value is False else value)
+            yield line
+
+    @api.model
+    def _iter_chunks(self, domain):
+        """
+        Génère les lignes du fichier par paquets, lues par un curseur serveur sous les
+        règles d'accès de l'utilisateur.
+        """
+        Program = self.env['work.program']
+        Program.check_access_rights('read')
+        query = Program._where_calc(domain)
+        Program._apply_ir_rules(query, 'read')
+        query.order = f'"{Program._table}"."id"'
+        columns = [column for header, column in self.EXPORT_COLUMNS]
+        # Les many2many n'ont pas de colonne : leur place est réservée dans la ligne et remplie par paquet
+        select_sql, params = query.select(f'"{Program._table}"."id"', *(
+            'NULL' if Program._fields[column].type == 'many2many' else f'"{Program._table}"."{column}"'
+            for column in columns))
+        cursor_name = f"work_program_export_{uuid.uuid4().hex}"
+        self.env.cr.execute(f"DECLARE {cursor_name} NO SCROLL CURSOR FOR {select_sql}", params)
+        try:
+            while True:
+                self.env.cr.execute(f"FETCH FORWARD {self._CHUNK_SIZE} FROM {cursor_name}")
+                rows = self.env.cr.fetchall()
+                if not rows:
+                    break
+                yield list(self._format_chunk(rows, columns))
+                self.env.invalidate_all()
+        finally:
+            self.env.cr.execute(f"CLOSE {cursor_name}")
+
+    @api.model
+    def _stream_csv(self, domain):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow([header for header, column in self.EXPORT_COLUMNS])
+        # BOM : le fichier s'ouvre directement avec les accents dans un tableur
+        yield '\ufeff'.encode() + buffer.getvalue().encode()
+        for lines in self._iter_chunks(domain):
+            buffer.seek(0)
+            buffer.truncate()
+            writer.writerows(lines)
+            yield buffer.getvalue().encode()
+
+    @api.model
+    def _stream_xlsx(self, domain):
+        # constant_memory : chaque ligne est écrite sur disque dès qu'elle est complète
+        with tempfile.TemporaryFile() as output:
+            workbook = xlsxwriter.Workbook(output, {'constant_memory': True, 'strings_to_numbers': False})
+            sheet = workbook.add_worksheet('Work programs')
+            sheet.write_row(0, 0, [header for header, column in self.EXPORT_COLUMNS])
+            row_index = 1
+            for lines in self._iter_chunks(domain):
+                for line in lines:
+                    sheet.write_row(row_index, 0, line)
+                    row_index += 1
+            workbook.close()
+            output.seek(0)
+            while True:
+                block = output.read(1 << 16)
+                if not block:
+                    break
+                yield block
+
+    @api.model
+    def stream(self, file_format='csv', **filters):
+        """Générateur des blocs du fichier exporté (``csv`` ou ``xlsx``) pour les filtres donnés."""
+        if file_format not in ('csv', 'xlsx'):
+            raise UserError(_("Format d'export inconnu : %s") % file_format)
+        domain = self._get_export_domain(**filters)
+        _logger.info(f"Export en flux des programmes de travail ({file_format}) : {domain}")
+        return self._stream_xlsx(domain) if file_format == 'xlsx' else self._stream_csv(domain)
+
+
+class WorkProgramExportWizard(models.TransientModel):
+    """Assistant d'export des programmes de travail au format du fichier d'import."""
+    _name = 'work.program.export.wizard'
+    _description = 'Export des programmes de travail'
+
+    file_format = fields.Selection([('csv', 'CSV'), ('xlsx', 'Excel (XLSX)')], string='Format', required=True,
+                                   default='csv')
+    department_ids = fields.Many2many('hr.department', string='Départements')
+    week_from = fields.Date(string='Semaine du')
+    week_to = fields.Date(string="Semaine jusqu'au")
+    status_draft = fields.Boolean(string='Brouillon', default=True)
+    status_ongoing = fields.Boolean(string='En cours', default=True)
+    status_done = fields.Boolean(string='Terminé', default=True)
+    status_cancelled = fields.Boolean(string='Annulé', default=False)
+
+    def action_export(self):
+        self.ensure_one()
+        statuses = [status for status in ('draft', 'ongoing', 'done', 'cancelled') if self[f'status_{status}']]
+        if not statuses:
+            raise UserError(_("Sélectionnez au moins un statut."))
+        params = {'file_format': self.file_format, 'statuses': ','.join(statuses)}
+        if self.department_ids:
+            params['department_ids'] = ','.join(str(department_id) for department_id in self.department_ids.ids)
+        if self.week_from:
+            params['week_from'] = fields.Date.to_string(self.week_from)
+        if self.week_to:
+            params['week_to'] = fields.Date.to_string(self.week_to)
+        return {
+            'type': 'ir.actions.act_url',
+            'url': '/work_program/export?' + urlencode(params),
+            'target': 'self',
+        }
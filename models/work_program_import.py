@@ -0,0 +1,317 @@
+# -*- coding: utf-8 -*-
+import csv
+import hashlib
+import io
+import itertools
+import logging
+import threading
+import time
+from datetime import date, datetime
+
+from odoo import models, api, fields, _
+from odoo.exceptions import UserError
+
+_logger = logging.getLogger(__name__)
+
+try:
+    import openpyxl
+except ImportError:
+    openpyxl = None
+
+
+class WorkProgramImportJob(models.Model):
+    """
+    Import en flux de fichiers CSV/XLSX vers work.program ou workflow.hierarchy.
+
+    Le fichier est lu ligne à ligne par un générateur et traité par paquets de
+    taille fixe. Chaque paquet est appliqué dans un savepoint puis validé avec le
+    point de reprise (empreinte du fichier + dernière ligne validée), ce qui permet
+    de relancer un import interrompu là où il s'est arrêté. Les programmes sont
+    importés en mode masse, sans chatter : un seul message de synthèse par paquet
+    est journalisé sur l'import.
+    """
+    _name = 'work.program.import.job'
+    _inherit = ['mail.thread']
+    _description = "Import en flux des programmes de travail"
+    _order = 'create_date desc, id desc'
+
+    name = fields.Char(string='Nom', required=True, default=lambda self: _('Nouvel import'))
+    import_type = fields.Selection([
+        ('work_program', 'Programmes de travail'),
+        ('hierarchy', 'Cadres de référence'),
+    ], string="Type d'import", required=True, default='work_program')
+    file_data = fields.Binary(string='Fichier', attachment=True, copy=False)
+    file_path = fields.Char(string='Chemin serveur', groups='base.group_system',
+                            help="Chemin d'un fichier accessible par le serveur, utilisé à la place de la pièce "
+                                 "jointe (administrateurs techniques uniquement).")
+    file_name = fields.Char(string='Nom du fichier')
+    file_hash = fields.Char(string='Empreinte du fichier', index=True, readonly=True, copy=False)
+    chunk_size = fields.Integer(string='Taille des paquets', default=500)
+    last_row = fields.Integer(string='Dernière ligne validée', default=0, readonly=True, copy=False)
+    state = fields.Selection([
+        ('draft', 'Brouillon'),
+        ('running', 'En cours'),
+        ('interrupted', 'Interrompu'),
+        ('failed', 'Échec'),
+        ('done', 'Terminé'),
+    ], string='Statut', default='draft', required=True, readonly=True, copy=False)
+    nb_created = fields.Integer(string='Créés', readonly=True, copy=False)
+    nb_updated = fields.Integer(string='Mis à jour', readonly=True, copy=False)
+    nb_errors = fields.Integer(string='Erreurs', readonly=True, copy=False)
+    log = fields.Text(string='Journal', readonly=True, copy=False)
+    nb_attempts = fields.Integer(string='Reprises automatiques', readonly=True, copy=False,
+                                 help="Reprises consécutives par la tâche planifiée sans terminer l'import.")
+
+    _IMPORT_METHODS = {
+        'work_program': ('work.program', 'import_work_programs'),
+        'hierarchy': ('workflow.hierarchy', 'import_hierarchies'),
+    }
+    # Nombre maximal de lignes d'erreur conservées dans le journal
+    _LOG_MAX_LINES = 500
+    # Un import « en cours » sans point de reprise depuis ce délai est considéré comme interrompu
+    _STALLED_AFTER_MINUTES = 30
+    # Au-delà, un import interrompu n'est plus repris automatiquement
+    _MAX_ATTEMPTS = 3
+
+    # ------------------------------------------------------------------
+    # Lecture du fichier
+    # ------------------------------------------------------------------
+    def _get_file_type(self):
+        self.ensure_one()
+        file_name = (self.file_name or self.file_path or '').lower()
+        if file_name.endswith('.xlsx'):
+            return 'xlsx'
+        if file_name.endswith('.csv'):
+            return 'csv'
+        raise UserError(_("Format de fichier non supporté : %s (CSV ou XLSX attendu).") % file_name)
+
+    def _get_attachment(self):
+        self.ensure_one()
+        return self.env['ir.attachment'].sudo().search([
+            ('res_model', '=', self._name),
+            ('res_field', '=', 'file_data'),
+            ('res_id', '=', self.id),
+        ], limit=1)
+
+    def _open_file(self):
+        """Ouvre le fichier source en lecture binaire sans le charger entièrement en mémoire."""
+        self.ensure_one()
+        if self.file_path:
+            return open(self.file_path, 'rb')
+        attachment = self._get_attachment()
+        if not attachment:
+            raise UserError(_("Aucun fichier à importer."))
+        if attachment.store_fname:
+            return open(attachment._full_path(attachment.store_fname), 'rb')
+        return io.BytesIO(attachment.raw or b'')
+
+    def _compute_file_hash(self):
+        self.ensure_one()
+        attachment = not self.file_path and self._get_attachment()
+        if attachment and attachment.checksum:
+            return attachment.checksum
+        sha = hashlib.sha1()
+        with self._open_file() as stream:
+            for block in iter(lambda: stream.read(1024 * 1024), b''):
+                sha.update(block)
+        return sha.hexdigest()
+
+    @api.model
+    def _normalize_cell(self, value):
+        if value is None:
+            return ''
+        if isinstance(value, datetime):
+            return value.date().isoformat() if value.time() == datetime.min.time() else value.isoformat(' ')
+        if isinstance(value, date):
+            return value.isoformat()
+        if isinstance(value, float) and value.is_integer():
+            return str(int(value))
+        return str(value)
+
+    @api.model
+    def _iter_csv_rows(self, stream):
+        text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+        try:
+            for row in csv.DictReader(text):
+                yield {(key or '').strip(): value for key, value in row.items()}
+        finally:
+            text.detach()
+
+    @api.model
+    def _iter_xlsx_rows(self, stream):
+        if openpyxl is None:
+            raise UserError(_("La bibliothèque Python openpyxl est nécessaire pour importer des fichiers XLSX."))
+        workbook = openpyxl.load_workbook(stream, read_only=True, data_only=True)
+        try:
+            rows = workbook.active.iter_rows(values_only=True)
+            header = [self._normalize_cell(cell).strip() for cell in next(rows, ())]
+            for values in rows:
+                if not any(value not in (None, '') for value in values):
+                    continue
+                yield {key: self._normalize_cell(value) for key, value in zip(header, values) if key}
+        finally:
+            workbook.close()
+
+    def _iter_rows(self):
+        """Générateur des lignes du fichier sous forme de dictionnaires {colonne: valeur}."""
+        self.ensure_one()
+        reader = self._iter_xlsx_rows if self._get_file_type() == 'xlsx' else self._iter_csv_rows
+        with self._open_file() as stream:
+            yield from reader(stream)
+
+    @api.model
+    def _iter_chunks(self, rows, chunk_size):
+        rows = iter(rows)
+        while True:
+            chunk = list(itertools.islice(rows, chunk_size))
+            if not chunk:
+                return
+            yield chunk
+
+    # ------------------------------------------------------------------
+    # Exécution
+    # ------------------------------------------------------------------
+    def _append_log(self, lines):
+        self.ensure_one()
+        if not lines:
+            return
+        existing = (self.log or '').splitlines()
+        self.log = '\n'.join((existing + lines)[-self._LOG_MAX_LINES:])
+
+    def _get_resumable_job(self, file_hash):
+        """Retourne un import antérieur non terminé du même fichier, s'il existe."""
+        self.ensure_one()
+        return self.search([
+            ('id', '!=', self.id),
+            ('file_hash', '=', file_hash),
+            ('import_type', '=', self.import_type),
+            '|', ('state', '=', 'interrupted'),
+            '&', ('state', '=', 'running'), ('write_date', '<', self._get_stalled_before()),
+        ], order='last_row desc, id desc', limit=1)
+
+    @api.model
+    def _get_stalled_before(self):
+        return fields.Datetime.subtract(fields.Datetime.now(), minutes=self._STALLED_AFTER_MINUTES)
+
+    def action_run(self):
+        for job in self:
+            # Une relance manuelle redonne droit aux reprises automatiques
+            job.nb_attempts = 0
+            job._run()
+        return True
+
+    def _run(self):
+        self.ensure_one()
+        if self.state == 'done':
+            raise UserError(_("Cet import est déjà terminé."))
+        if self.file_path and not (self.env.su or self.env.user._is_system()):
+            raise UserError(_("Seul un administrateur technique peut lancer un import depuis un chemin serveur."))
+        file_hash = self._compute_file_hash()
+        if self.file_hash and self.file_hash != file_hash:
+            # Le fichier a changé : le point de reprise n'est plus valable
+            self.write({'last_row': 0, 'nb_created': 0, 'nb_updated': 0, 'nb_errors': 0, 'log': False})
+        elif not self.last_row:
+            previous = self._get_resumable_job(file_hash)
+            if previous:
+                _logger.info(f"Reprise de l'import {previous.name} à la ligne {previous.last_row}")
+                self.write({
+                    'last_row': previous.last_row,
+                    'nb_created': previous.nb_created,
+                    'nb_updated': previous.nb_updated,
+                    'nb_errors': previous.nb_errors,
+                    'log': previous.log,
+                })
+                previous.write({'state': 'done', 'log': _("Repris par l'import %s") % self.name})
+        self.write({'file_hash': file_hash, 'state': 'running'})
+
+        model_name, method_name = self._IMPORT_METHODS[self.import_type]
+        import_method = getattr(self.env[model_name], method_name)
+        auto_commit = not getattr(threading.current_thread(), 'testing', False)
+        chunk_size = max(self.chunk_size, 1)
+        self._commit_checkpoint(auto_commit)
+
+        rows = itertools.islice(self._iter_rows(), self.last_row, None)
+        for chunk in self._iter_chunks(rows, chunk_size):
+            first_row = self.last_row + 1
+            start = time.perf_counter()
+            counts = {'created': 0, 'updated': 0, 'error': 0}
+            errors = []
+            try:
+                with self.env.cr.savepoint():
+                    for line in import_method(chunk):
+                        counts[line['status']] = counts.get(line['status'], 0) + 1
+                        if line['status'] == 'error':
+                            errors.append(f"Ligne {first_row + line['row']} ({line['name']}) : {line['message']}")
+            except Exception as e:
+                _logger.error(f"Échec du paquet {first_row}-{first_row + len(chunk) - 1} : {e}", exc_info=True)
+                counts = {'created': 0, 'updated': 0, 'error': len(chunk)}
+                errors = [f"Lignes {first_row}-{first_row + len(chunk) - 1} : paquet annulé ({e})"]
+            self.write({
+                'last_row': self.last_row + len(chunk),
+                'nb_created': self.nb_created + counts['created'],
+                'nb_updated': self.nb_updated + counts['updated'],
+                'nb_errors': self.nb_errors + counts['error'],
+            })
+            self._append_log(errors)
+            self._log_chunk_summary(first_row, len(chunk), counts, time.perf_counter() - start)
+            self._commit_checkpoint(auto_commit)
+            # Libère le cache ORM du paquet pour garder une mémoire constante
+            self.env.invalidate_all()
+
+        self.write({'state': 'done', 'nb_attempts': 0})
+        self._commit_checkpoint(auto_commit)
+        _logger.info(f"Import {self.name} terminé : {self.last_row} lignes, {self.nb_errors} erreur(s)")
+
+    def _log_chunk_summary(self, first_row, nb_rows, counts, duration):
+        """Message de synthèse unique pour un paquet, à la place du chatter de chaque programme."""
+        self.ensure_one()
+        self._message_log(body=_(
+            "Lignes %(first)s à %(last)s : %(created)s créé(s), %(updated)s mis à jour, "
+            "%(errors)s erreur(s) en %(duration).1f s.",
+            first=first_row, last=first_row + nb_rows - 1, created=counts.get('created', 0),
+            updated=counts.get('updated', 0), errors=counts.get('error', 0), duration=duration,
+        ))
+
+    def _commit_checkpoint(self, auto_commit):
+        self.env.flush_all()
+        if auto_commit:
+            self.env.cr.commit()
+
+    @api.model
+    def _cron_resume_interrupted(self):
+        """
+        Relance les imports interrompus (serveur arrêté pendant l'import). Chaque
+        reprise est comptée avant d'être lancée : un import qui échoue
+        ``_MAX_ATTEMPTS`` fois de suite passe à l'état « Échec » et n'est plus repris.
+        """
+        auto_commit = not getattr(threading.current_thread(), 'testing', False)
+        self.search([('state', '=', 'running'), ('write_date', '<', self._get_stalled_before())]).write({'state': 'interrupted'})
+        exhausted = self.search([('state', '=', 'interrupted'), ('nb_attempts', '>=', self._MAX_ATTEMPTS)])
+        for job in exhausted:
+            job.state = 'failed'
+            job._append_log([_("Import abandonné après %s reprise(s) automatique(s) en échec.") % job.nb_attempts])
+        for job in self.search([('state', '=', 'interrupted')]):
+            job.nb_attempts += 1
+            job._commit_checkpoint(auto_commit)
+            try:
+                job._run()
+            except Exception as e:
+                self.env.cr.rollback()
+                _logger.error(f"Impossible de reprendre l'import {job.name} : {e}", exc_info=True)
+                job.write({'state': 'interrupted'})
+                job._append_log([_("Reprise %(attempt)s en échec : %(error)s") % {'attempt': job.nb_attempts,
+                                                                                  'error': e}])
+                job._commit_checkpoint(auto_commit)
+
+    @api.model
+    def _import_file(self, file_path, import_type='work_program', chunk_size=500):
+        """Point d'entrée serveur (shell, tâche planifiée) : importe (ou reprend) un fichier local en flux."""
+        job = self.create({
+            'name': file_path.rsplit('/', 1)[-1],
+            'import_type': import_type,
+            'file_path': file_path,
+            'file_name': file_path,
+            'chunk_size': chunk_size,
+        })
+        job._run()
+        return job
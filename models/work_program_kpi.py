@@ -0,0 +1,230 @@
+# -*- coding: utf-8 -*-
+import logging
+
+from odoo import models, api, fields
+
+_logger = logging.getLogger(__name__)
+
+
+class WorkProgramKpi(models.Model):
+    """
+    Indicateurs de glissement des échéances, précalculés par dimension et par semaine.
+
+    Chaque ligne porte des compteurs additifs (programmes, terminés, à l'heure, en
+    retard, jours de glissement, ...) tenus à jour de façon incrémentale : chaque
+    création, modification ou suppression de work.program applique un delta par
+    ``INSERT ... ON CONFLICT DO UPDATE``, sans recalcul de la table entière. Les
+    taux sont recalculés sur les seules lignes touchées.
+    """
+    _name = 'work.program.kpi'
+    _description = 'Indicateurs de délais des programmes de travail'
+    _order = 'week desc, dimension, key_id'
+    _rec_name = 'dimension'
+
+    dimension = fields.Selection([
+        ('department', 'Département'),
+        ('project', 'Projet'),
+        ('activity', 'Activité'),
+        ('week', 'Semaine'),
+    ], string='Dimension', required=True, readonly=True)
+    key_id = fields.Integer(string='Identifiant de la dimension', required=True, readonly=True)
+    week = fields.Date(string='Semaine', required=True, readonly=True, index=True)
+    department_id = fields.Many2one('hr.department', string='Département', readonly=True, index=True)
+    project_id = fields.Many2one('project.project', string='Projet', readonly=True, index=True)
+    activity_id = fields.Many2one('workflow.activity', string='Activité', readonly=True, index=True)
+
+    total_count = fields.Integer(string='Programmes', readonly=True)
+    done_count = fields.Integer(string='Terminés', readonly=True)
+    on_time_count = fields.Integer(string='Terminés à temps', readonly=True)
+    late_count = fields.Integer(string='En retard', readonly=True)
+    slip_days_sum = fields.Integer(string='Jours de glissement', readonly=True)
+    postpone_sum = fields.Integer(string='Reports', readonly=True)
+    completion_sum = fields.Float(string="Somme des pourcentages d'achèvement", readonly=True)
+
+    avg_slip_days = fields.Float(string='Glissement moyen (jours)', readonly=True, group_operator='avg')
+    on_time_rate = fields.Float(string='Taux de respect des délais (%)', readonly=True, group_operator='avg')
+    completion_rate = fields.Float(string='Taux de réalisation (%)', readonly=True, group_operator='avg')
+    avg_completion = fields.Float(string="Achèvement moyen (%)", readonly=True, group_operator='avg')
+
+    _sql_constraints = [
+        ('dimension_key_week_uniq', 'unique (dimension, key_id, week)',
+         'Un seul indicateur par dimension et par semaine.'),
+    ]
+
+    # Compteurs additifs, dans l'ordre des colonnes de l'upsert
+    _COUNTERS = ['total_count', 'done_count', 'on_time_count', 'late_count',
+                 'slip_days_sum', 'postpone_sum', 'completion_sum']
+    # Dimension -> champ de work.program / de la ligne d'indicateur
+    _DIMENSIONS = {
+        'department': 'work_programm_department_id',
+        'project': 'project_id',
+        'activity': 'activity_id',
+        'week': False,
+    }
+    _DIMENSION_COLUMNS = {'department': 'department_id', 'project': 'project_id', 'activity': 'activity_id'}
+    # Champs de work.program dont la modification change les indicateurs
+    _TRIGGER_FIELDS = {'work_programm_department_id', 'project_id', 'activity_id', 'my_week_of', 'status',
+                       'initial_deadline', 'actual_deadline', 'nb_postpones', 'completion_percentage'}
+
+    # Colonnes lues par la reconstruction, dans work_program et dans work_program_archive
+    _REBUILD_COLUMNS = ('work_programm_department_id, project_id, activity_id, my_week_of, status, '
+                        'initial_deadline, actual_deadline, nb_postpones, completion_percentage')
+
+    def init(self):
+        self.env.cr.execute("SELECT 1 FROM work_program_kpi LIMIT 1")
+        if not self.env.cr.fetchone():
+            self._rebuild()
+
+    # ------------------------------------------------------------------
+    # Contributions et deltas
+    # ------------------------------------------------------------------
+    @api.model
+    def _program_measures(self, program):
+        """Compteurs apportés par un programme (None s'il n'entre pas dans les indicateurs)."""
+        if not program.my_week_of or program.status == 'cancelled':
+            return None
+        slip_days = 0
+        if program.initial_deadline and program.actual_deadline:
+            slip_days = max((program.actual_deadline - program.initial_deadline).days, 0)
+        done = program.status == 'done'
+        return (
+            1,
+            int(done),
+            int(done and not slip_days),
+            int(slip_days > 0),
+            slip_days,
+            program.nb_postpones or 0,
+            program.completion_percentage or 0.0,
+        )
+
+    @api.model
+    def _get_contributions(self, programs):
+        """{(dimension, key_id, week): compteurs} pour un ensemble de programmes."""
+        contributions = {}
+        for program in programs:
+            measures = self._program_measures(program)
+            if measures is None:
+                continue
+            for dimension, field_name in self._DIMENSIONS.items():
+                key_id = program[field_name].id if field_name else 0
+                if field_name and not key_id:
+                    continue
+                key = (dimension, key_id, program.my_week_of)
+                current = contributions.get(key)
+                contributions[key] = measures if current is None else tuple(
+                    a + b for a, b in zip(current, measures))
+        return contributions
+
+    @api.model
+    def _apply_contributions(self, before, after):
+        """Applique la différence ``after - before`` aux lignes d'indicateurs concernées."""
+        deltas = {}
+        for key in set(before) | set(after):
+            old = before.get(key, (0,) * len(self._COUNTERS))
+            new = after.get(key, (0,) * len(self._COUNTERS))
+            delta = tuple(b - a for a, b in zip(old, new))
+            if any(delta):
+                deltas[key] = delta
+        if not deltas:
+            return
+        keys = list(deltas)
+        columns = {counter: [deltas[key][index] for key in keys] for index, counter in enumerate(self._COUNTERS)}
+        dimension_ids = {
+            column: [key[1] if key[0] == dimension else None for key in keys]
+            for dimension, column in self._DIMENSION_COLUMNS.items()
+        }
+        self.env.cr.execute("""
+            INSERT INTO work_program_kpi (
+                dimension, key_id, week, department_id, project_id, activity_id,
+                total_count, done_count, on_time_count, late_count, slip_days_sum, postpone_sum, completion_sum,
+                create_uid, write_uid, create_date, write_date)
+            SELECT d.dimension, d.key_id, d.week, d.department_id, d.project_id, d.activity_id,
+                   d.total_count, d.done_count, d.on_time_count, d.late_count,
+                   d.slip_days_sum, d.postpone_sum, d.completion_sum,
+                   %(uid)s, %(uid)s, now() at time zone 'UTC', now() at time zone 'UTC'
+              FROM unnest(%(dimension)s::varchar[], %(key_id)s::int[], %(week)s::date[],
+                          %(department_id)s::int[], %(project_id)s::int[], %(activity_id)s::int[],
+                          %(total_count)s::int[], %(done_count)s::int[], %(on_time_count)s::int[],
+                          %(late_count)s::int[], %(slip_days_sum)s::int[], %(postpone_sum)s::int[],
+                          %(completion_sum)s::float8[])
+                   AS d(dimension, key_id, week, department_id, project_id, activity_id,
+                        total_count, done_count, on_time_count, late_count, slip_days_sum, postpone_sum,
+                        completion_sum)
+            ON CONFLICT (dimension, key_id, week) DO UPDATE SET
+                total_count = work_program_kpi.total_count + EXCLUDED.total_count,
+                done_count = work_program_kpi.done_count + EXCLUDED.done_count,
+                on_time_count = work_program_kpi.on_time_count + EXCLUDED.on_time_count,
+                late_count = work_program_kpi.late_count + EXCLUDED.late_count,
+                slip_days_sum = work_program_kpi.slip_days_sum + EXCLUDED.slip_days_sum,
+                postpone_sum = work_program_kpi.postpone_sum + EXCLUDED.postpone_sum,
+                completion_sum = work_program_kpi.completion_sum + EXCLUDED.completion_sum,
+                write_uid = EXCLUDED.write_uid,
+                write_date = EXCLUDED.write_date
+            RETURNING id
+        """, dict(
+            columns,
+            uid=self.env.uid,
+            dimension=[key[0] for key in keys],
+            key_id=[key[1] for key in keys],
+            week=[key[2] for key in keys],
+            **dimension_ids,
+        ))
+        kpi_ids = [row[0] for row in self.env.cr.fetchall()]
+        self._update_rates(kpi_ids)
+
+    @api.model
+    def _update_rates(self, kpi_ids=None):
+        """Recalcule les taux à partir des compteurs (lignes données ou toutes)."""
+        where = "WHERE id IN %s" if kpi_ids is not None else ""
+        if kpi_ids is not None and not kpi_ids:
+            return
+        self.env.cr.execute(f"""
+            UPDATE work_program_kpi SET
+                avg_slip_days = CASE WHEN total_count > 0 THEN slip_days_sum::float / total_count END,
+                on_time_rate = CASE WHEN done_count > 0 THEN 100.0 * on_time_count / done_count END,
+                completion_rate = CASE WHEN total_count > 0 THEN 100.0 * done_count / total_count END,
+                avg_completion = CASE WHEN total_count > 0 THEN completion_sum / total_count END
+            {where}
+        """, [tuple(kpi_ids)] if kpi_ids is not None else [])
+        # Les lignes vidées (plus aucun programme) sont supprimées
+        self.env.cr.execute(f"DELETE FROM work_program_kpi WHERE total_count <= 0 {where.replace('WHERE', 'AND')}",
+                            [tuple(kpi_ids)] if kpi_ids is not None else [])
+        self.invalidate_model()
+
+    @api.model
+    def _rebuild(self):
+        """Reconstruction complète des indicateurs (installation ou réparation), archives comprises."""
+        self.env['work.program'].flush_model()
+        self.env.cr.execute("DELETE FROM work_program_kpi")
+        for dimension, column in [('department', 'work_programm_department_id'), ('project', 'project_id'),
+                                  ('activity', 'activity_id'), ('week', None)]:
+            key_expr = f"wp.{column}" if column else "0"
+            target_column = self._DIMENSION_COLUMNS.get(dimension)
+            self.env.cr.execute(f"""
+                INSERT INTO work_program_kpi (
+                    dimension, key_id, week, {target_column + ',' if target_column else ''}
+                    total_count, done_count, on_time_count, late_count, slip_days_sum, postpone_sum, completion_sum,
+                    create_uid, write_uid, create_date, write_date)
+                SELECT %(dimension)s, {key_expr}, wp.my_week_of, {key_expr + ',' if target_column else ''}
+                       count(*),
+                       count(*) FILTER (WHERE wp.status = 'done'),
+                       count(*) FILTER (WHERE wp.status = 'done' AND NOT COALESCE(wp.actual_deadline > wp.initial_deadline, FALSE)),
+                       count(*) FILTER (WHERE wp.actual_deadline > wp.initial_deadline),
+                       COALESCE(sum(GREATEST(wp.actual_deadline - wp.initial_deadline, 0)), 0),
+                       COALESCE(sum(wp.nb_postpones), 0),
+                       COALESCE(sum(wp.completion_percentage), 0),
+                       %(uid)s, %(uid)s, now() at time zone 'UTC', now() at time zone 'UTC'
+                  FROM (SELECT {self._REBUILD_COLUMNS} FROM work_program
+                        UNION ALL
+                        SELECT {self._REBUILD_COLUMNS} FROM work_program_archive) wp
+                 WHERE wp.my_week_of IS NOT NULL
+                   AND COALESCE(wp.status, 'draft') != 'cancelled'
+                   {f'AND wp.{column} IS NOT NULL' if column else ''}
+                 GROUP BY {key_expr}, wp.my_week_of
+            """, {'dimension': dimension, 'uid': self.env.uid})
+        self._update_rates()
+        _logger.info("Indicateurs de délais des programmes de travail reconstruits")
+
+    def action_rebuild(self):
+        self._rebuild()
+        return True
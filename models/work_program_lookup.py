@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+import threading
+
+from odoo import models, api, SUPERUSER_ID
+from odoo.tools import LRU
+
+
+class WorkProgramLookup(models.AbstractModel):
+    """
+    Recherches paginées et mises en cache pour les listes déroulantes du formulaire public.
+
+    Les résultats sont gardés par chaque worker dans un LRU borné, par registre (donc
+    par base). Après chaque commit créant, renommant ou supprimant un enregistrement
+    des modèles concernés, la séquence PostgreSQL ``work_program_lookup_cache_seq``
+    est incrémentée : les workers comparent sa valeur à celle de leur cache et le
+    vident en cas d'écart, sans toucher aux autres caches du registre. Une page
+    manquante est lue par un curseur neuf, ouvert après la lecture de la version :
+    elle ne peut pas précéder une modification déjà signalée. Une transaction ayant
+    elle-même modifié ces modèles lit directement la base.
+    """
+    _name = 'work.program.lookup'
+    _description = 'Recherche des listes de choix du programme de travail'
+
+    # Clé exposée par la route -> (modèle, champs lus en plus de id/name)
+    LOOKUP_MODELS = {
+        'employee': ('hr.employee', []),
+        'project': ('project.project', []),
+        'activity': ('workflow.activity', []),
+        'procedure': ('workflow.procedure', []),
+        'task_description': ('workflow.task.formulation', []),
+        'deliverable': ('workflow.deliverable', []),
+        'department': ('hr.department', ['dpt_type']),
+    }
+    # Champs dont la modification invalide le cache
+    LOOKUP_TRIGGER_FIELDS = {'name', 'active', 'dpt_type'}
+    MAX_LIMIT = 50
+    _SEQUENCE = 'work_program_lookup_cache_seq'
+    # Nombre maximal de pages gardées par worker et par base
+    _LRU_SIZE = 4096
+    _lock = threading.RLock()
+
+    def init(self):
+        self.env.cr.execute(f"CREATE SEQUENCE IF NOT EXISTS {self._SEQUENCE}")
+
+    @api.model
+    def lookup(self, model_key, term='', offset=0, limit=20):
+        """
+        Retourne une page de résultats ``{'results': [{'id', 'name', ...}], 'more': bool}``
+        pour les enregistrements dont le nom commence par ``term``.
+        """
+        if model_key not in self.LOOKUP_MODELS:
+            return {'results': [], 'more': False}
+        offset = max(int(offset or 0), 0)
+        limit = min(max(int(limit or 20), 1), self.MAX_LIMIT)
+        term = (term or '').strip().lower()
+        results = self._lookup_cached(model_key, term, offset, limit)
+        return {'results': [dict(result) for result in results[:limit]], 'more': len(results) > limit}
+
+    @api.model
+    def _get_db_version(self):
+        self.env.cr.execute(f"SELECT last_value, is_called FROM {self._SEQUENCE}")
+        last_value, is_called = self.env.cr.fetchone()
+        return last_value if is_called else 0
+
+    @api.model
+    def _lookup_cached(self, model_key, term, offset, limit):
+        if self.env.cr.postcommit.data.get('work_program_lookup_cache'):
+            return self._lookup_read(model_key, term, offset, limit)
+        key = (model_key, term, offset, limit)
+        version = self._get_db_version()
+        with self._lock:
+            cache = getattr(self.pool, '_work_program_lookup_cache', None)
+            if cache is None or cache['version'] != version:
+                cache = self.pool._work_program_lookup_cache = {'version': version, 'pages': LRU(self._LRU_SIZE)}
+            results = cache['pages'].get(key)
+        if results is None:
+            with self.pool.cursor() as cr:
+                results = self.with_env(self.env(cr=cr))._lookup_read(model_key, term, offset, limit)
+            with self._lock:
+                cache['pages'][key] = results
+        return results
+
+    @api.model
+    def _lookup_read(self, model_key, term, offset, limit):
+        model_name, extra_fields = self.LOOKUP_MODELS[model_key]
+        domain = [('name', '=ilike', self._escape_like(term) + '%')] if term else []
+        # Une ligne de plus que demandé pour savoir s'il existe une page suivante
+        records = self.env[model_name].sudo().search_read(
+            domain, ['id', 'name'] + extra_fields, offset=offset, limit=limit + 1, order='name, id')
+        # Valeurs immuables : le résultat est partagé entre les requêtes via le cache
+        return tuple(tuple(sorted(record.items())) for record in records)
+
+    @api.model
+    def _escape_like(self, term):
+        return term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+    @api.model
+    def _invalidate_lookup_cache(self, vals=None):
+        """Signale une modification ; les caches sont invalidés après le commit."""
+        if vals is not None and not self.LOOKUP_TRIGGER_FIELDS.intersection(vals):
+            return
+        cr = self.env.cr
+        if cr.postcommit.data.get('work_program_lookup_cache'):
+            return
+        cr.postcommit.data['work_program_lookup_cache'] = True
+        registry = self.pool
+
+        def invalidate_lookup_cache():
+            cr.postcommit.data.pop('work_program_lookup_cache', None)
+            with registry.cursor() as new_cr:
+                env = api.Environment(new_cr, SUPERUSER_ID, {})
+                env['work.program.lookup']._bump_version()
+
+        cr.postcommit.add(invalidate_lookup_cache)
+
+    @api.model
+    def _bump_version(self):
+        with self._lock:
+            self.env.cr.execute(f"SELECT nextval('{self._SEQUENCE}')")
+            self.pool._work_program_lookup_cache = None
+
+
+class WorkProgramLookupInvalidationMixin(models.AbstractModel):
+    """Invalide le cache des listes de choix quand les enregistrements changent."""
+    _name = 'work.program.lookup.mixin'
+    _description = 'Invalidation du cache des listes de choix'
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        records = super().create(vals_list)
+        self.env['work.program.lookup']._invalidate_lookup_cache()
+        return records
+
+    def write(self, vals):
+        res = super().write(vals)
+        self.env['work.program.lookup']._invalidate_lookup_cache(vals)
+        return res
+
+    def unlink(self):
+        res = super().unlink()
+        self.env['work.program.lookup']._invalidate_lookup_cache()
+        return res
+
+
+class HrEmployeeLookup(models.Model):
+    _name = 'hr.employee'
+    _inherit = ['hr.employee', 'work.program.lookup.mixin']
+
+
+class HrDepartmentLookup(models.Model):
+    _name = 'hr.department'
+    _inherit = ['hr.department', 'work.program.lookup.mixin']
+
+
+class ProjectProjectLookup(models.Model):
+    _name = 'project.project'
+    _inherit = ['project.project', 'work.program.lookup.mixin']
@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+import functools
+import json
+import logging
+import re
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+from odoo import models, api, fields, SUPERUSER_ID
+from odoo.http import request
+
+_logger = logging.getLogger(__name__)
+
+
+def profiled(entry_point):
+    """
+    Mesure l'appel décoré (méthode de modèle ou de contrôleur) lorsque le profilage
+    est activé par le paramètre système ``workprogramm.profiling_enabled``.
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            env = self.env if isinstance(self, models.BaseModel) else request.env
+            with env['work.program.profile']._profile(entry_point):
+                return method(self, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class WorkProgramProfile(models.Model):
+    """
+    Mesures des points d'entrée du module (contrôleurs, imports, create/write/search).
+
+    Pour chaque appel profilé : nombre de requêtes, temps SQL, temps Python et
+    formes de requêtes répétées (signe d'un N+1). Chaque mesure est écrite en ligne
+    de journal JSON et enregistrée ici via un curseur séparé, pour ne pas dépendre
+    de la transaction mesurée. Seul l'appel le plus externe est enregistré.
+    """
+    _name = 'work.program.profile'
+    _description = 'Mesure des points d\'entrée du programme de travail'
+    _order = 'id desc'
+    _rec_name = 'entry_point'
+
+    entry_point = fields.Char(string="Point d'entrée", required=True, readonly=True, index=True)
+    user_id = fields.Many2one('res.users', string='Utilisateur', readonly=True, ondelete='set null')
+    query_count = fields.Integer(string='Requêtes', readonly=True, group_operator='avg')
+    sql_ms = fields.Float(string='Temps SQL (ms)', readonly=True, group_operator='avg')
+    python_ms = fields.Float(string='Temps Python (ms)', readonly=True, group_operator='avg')
+    total_ms = fields.Float(string='Durée totale (ms)', readonly=True, group_operator='avg')
+    hot_spot_count = fields.Integer(string='Requêtes répétées', readonly=True, group_operator='max',
+                                    help="Nombre de formes de requêtes exécutées au moins "
+                                         "_HOT_SPOT_MIN_REPEAT fois pendant l'appel.")
+    hot_spots = fields.Text(string='Formes de requêtes répétées', readonly=True)
+    error = fields.Char(string='Erreur', readonly=True)
+
+    _CONFIG_ENABLED = 'workprogramm.profiling_enabled'
+    _CONFIG_MIN_MS = 'workprogramm.profiling_min_ms'
+    _HOT_SPOT_MIN_REPEAT = 5
+    _HOT_SPOT_MAX = 10
+    _KEEP_DAYS = 30
+    _local = threading.local()
+
+    @api.model
+    def _is_enabled(self):
+        return self.env['ir.config_parameter'].sudo().get_param(self._CONFIG_ENABLED, 'False').lower() in ('1', 'true')
+
+    @api.model
+    def _query_shape(self, query):
+        if isinstance(query, bytes):
+            query = query.decode(errors='replace')
+        # Les paramètres étant séparés (%s), seuls les littéraux écrits dans la requête varient
+        shape = re.sub(r"\b\d+\b", '?', str(query))
+        return re.sub(r'\s+', ' ', shape).strip()[:500]
+
+    @contextmanager
+    def _profile(self, entry_point):
+        if getattr(self._local, 'active', False) or not self._is_enabled():
+            yield
+            return
+        min_ms = float(self.env['ir.config_parameter'].sudo().get_param(self._CONFIG_MIN_MS, '0') or 0)
+        thread = threading.current_thread()
+        shapes = defaultdict(lambda: [0, 0.0])
+        stats = {'count': 0, 'sql': 0.0}
+
+        def query_hook(cr, query, params, query_start, query_time):
+            stats['count'] += 1
+            stats['sql'] += query_time
+            shape = shapes[self._query_shape(query)]
+            shape[0] += 1
+            shape[1] += query_time
+
+        if not hasattr(thread, 'query_hooks'):
+            thread.query_hooks = []
+        thread.query_hooks.append(query_hook)
+        self._local.active = True
+        error = False
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"[:250]
+            raise
+        finally:
+            total = time.perf_counter() - start
+            self._local.active = False
+            thread.query_hooks.remove(query_hook)
+            if total * 1000 >= min_ms:
+                self._record(entry_point, total, stats, shapes, error)
+
+    @api.model
+    def _record(self, entry_point, total, stats, shapes, error):
+        hot_spots = sorted(
+            ({'query': shape, 'count': count, 'sql_ms': round(duration * 1000, 2)}
+             for shape, (count, duration) in shapes.items() if count >= self._HOT_SPOT_MIN_REPEAT),
+            key=lambda spot: spot['count'], reverse=True,
+        )
+        payload = {
+            'entry_point': entry_point,
+            'uid': self.env.uid,
+            'query_count': stats['count'],
+            'sql_ms': round(stats['sql'] * 1000, 2),
+            'python_ms': round(max(total - stats['sql'], 0.0) * 1000, 2),
+            'total_ms': round(total * 1000, 2),
+            'hot_spot_count': len(hot_spots),
+            'hot_spots': hot_spots[:self._HOT_SPOT_MAX],
+            'error': error,
+        }
+        _logger.info("work_program_profile %s", json.dumps(payload))
+        try:
+            with self.pool.cursor() as cr:
+                env = api.Environment(cr, SUPERUSER_ID, {})
+                env[self._name].create({
+                    'entry_point': entry_point,
+                    'user_id': self.env.uid,
+                    'query_count': payload['query_count'],
+                    'sql_ms': payload['sql_ms'],
+                    'python_ms': payload['python_ms'],
+                    'total_ms': payload['total_ms'],
+                    'hot_spot_count': payload['hot_spot_count'],
+                    'hot_spots': json.dumps(payload['hot_spots'], indent=1) if hot_spots else False,
+                    'error': error,
+                })
+        except Exception as e:
+            _logger.warning(f"Impossible d'enregistrer la mesure de {entry_point} : {e}")
+
+    @api.model
+    def _cron_purge(self):
+        limit_date = fields.Datetime.subtract(fields.Datetime.now(), days=self._KEEP_DAYS)
+        self.search([('create_date', '<', limit_date)]).unlink()
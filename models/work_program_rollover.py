@@ -0,0 +1,212 @@
+# -*- coding: utf-8 -*-
+import logging
+from datetime import timedelta
+
+from odoo import models, api, fields, _
+from odoo.exceptions import UserError
+
+_logger = logging.getLogger(__name__)
+
+
+class WorkProgramRollover(models.Model):
+    """
+    Report en masse des programmes d'une semaine sur une semaine cible.
+
+    Les programmes non terminés (brouillon, en cours) sont reconduits tels quels ;
+    les programmes récurrents terminés donnent lieu à une nouvelle occurrence
+    (dates décalées, statut brouillon, achèvement remis à zéro). Tous les clones
+    sont insérés en une requête ``INSERT ... SELECT``, leurs livrables et supports
+    en une requête par relation. Chaque programme ne peut être reconduit qu'une
+    fois (contrainte d'unicité sur ``rollover_source_id``) : relancer le report
+    ne crée aucun doublon.
+    """
+    _inherit = 'work.program'
+
+    is_recurring = fields.Boolean(string='Récurrent', default=False,
+                                  help="Reconduit chaque semaine, même une fois terminé.")
+    rollover_source_id = fields.Many2one('work.program', string='Reconduit depuis', readonly=True, copy=False,
+                                         ondelete='set null')
+
+    _sql_constraints = [
+        ('rollover_source_uniq', 'unique (rollover_source_id)',
+         'Un programme de travail ne peut être reconduit qu\'une seule fois.'),
+    ]
+
+    # Colonnes réécrites lors du report ; les autres colonnes stockées sont copiées telles quelles
+    _ROLLOVER_EXCLUDED_COLUMNS = {'id', 'create_uid', 'create_date', 'write_uid', 'write_date',
+                                  'message_main_attachment_id'}
+
+    @api.model
+    def _get_rollover_domain(self, week, department_ids=None):
+        domain = [
+            ('my_week_of', '=', self._get_monday(week)),
+            '|', ('status', 'in', ['draft', 'ongoing']),
+            '&', ('is_recurring', '=', True), ('status', '=', 'done'),
+        ]
+        if department_ids:
+            domain.append(('work_programm_department_id', 'in', list(department_ids)))
+        return domain
+
+    @api.model
+    def _get_rollover_candidates(self, week, department_ids=None):
+        """(ids à reconduire, ids déjà reconduits) pour la semaine et les départements donnés."""
+        source_ids = self.search(self._get_rollover_domain(week, department_ids)).ids
+        if not source_ids:
+            return [], []
+        self.flush_model(['rollover_source_id'])
+        self.env.cr.execute("SELECT rollover_source_id FROM work_program WHERE rollover_source_id = ANY(%s)",
+                            [source_ids])
+        done_ids = {row[0] for row in self.env.cr.fetchall()}
+        return [source_id for source_id in source_ids if source_id not in done_ids], sorted(done_ids)
+
+    @api.model
+    def _get_rollover_columns(self):
+        """Colonnes stockées de work_program copiées telles quelles lors du report."""
+        overridden = {'my_week_of', 'my_month', 'week_of', 'assignment_date', 'initial_deadline',
+                      'actual_deadline', 'nb_postpones', 'status', 'completion_percentage',
+                      'satisfaction_level', 'rollover_source_id'}
+        return [
+            name for name, field in self._fields.items()
+            if field.store and field.column_type and name not in overridden
+            and name not in self._ROLLOVER_EXCLUDED_COLUMNS
+        ]
+
+    @api.model
+    def rollover_week(self, week, target_week=None, department_ids=None):
+        """
+        Reconduit les programmes de la semaine ``week`` (lundi ou n'importe quel jour
+        de la semaine) sur ``target_week`` (semaine suivante par défaut), limités aux
+        ``department_ids`` s'ils sont donnés.
+
+        Pour un programme reconduit non terminé, la date limite réelle (ou à défaut
+        initiale) dépassée au début de la semaine cible est décalée d'autant de jours
+        que les semaines et le nombre de reports est incrémenté.
+
+        Retourne ``{'created', 'postponed', 'skipped', 'ids'}``.
+        """
+        self.check_access_rights('create')
+        week = self._get_monday(week)
+        target_week = self._get_monday(target_week) if target_week else week + timedelta(weeks=1)
+        if target_week <= week:
+            raise UserError(_("La semaine cible doit être postérieure à la semaine reconduite."))
+        source_ids, skipped_ids = self._get_rollover_candidates(week, department_ids)
+        result = {'created': 0, 'postponed': 0, 'skipped': len(skipped_ids), 'ids': []}
+        if not source_ids:
+            return result
+
+        self.env.flush_all()
+        columns = self._get_rollover_columns()
+        copied = ', '.join(f'"{column}"' for column in columns)
+        selected = ', '.join(f'wp."{column}"' for column in columns)
+        # Occurrence nouvelle (récurrent terminé) ou reconduction d'un programme en cours
+        fresh = "wp.status = 'done'"
+        reference = "COALESCE(wp.actual_deadline, wp.initial_deadline)"
+        overdue = f"({reference} < %(target)s)"
+        self.env.cr.execute(f"""
+            INSERT INTO work_program ({copied}, my_week_of, my_month, week_of, assignment_date, initial_deadline,
+                                      actual_deadline, nb_postpones, status, completion_percentage,
+                                      satisfaction_level, rollover_source_id,
+                                      create_uid, write_uid, create_date, write_date)
+            SELECT {selected}, %(target)s, %(month)s, %(week_number)s,
+                   CASE WHEN {fresh} THEN wp.assignment_date + %(delta)s ELSE wp.assignment_date END,
+                   CASE WHEN {fresh} THEN wp.initial_deadline + %(delta)s ELSE wp.initial_deadline END,
+                   CASE WHEN {fresh} THEN wp.actual_deadline + %(delta)s
+                        WHEN {overdue} THEN {reference} + %(delta)s
+                        ELSE wp.actual_deadline END,
+                   CASE WHEN {fresh} THEN 0
+                        WHEN {overdue} THEN COALESCE(wp.nb_postpones, 0) + 1
+                        ELSE wp.nb_postpones END,
+                   CASE WHEN {fresh} THEN 'draft' ELSE wp.status END,
+                   CASE WHEN {fresh} THEN 0 ELSE wp.completion_percentage END,
+                   CASE WHEN {fresh} THEN NULL ELSE wp.satisfaction_level END,
+                   wp.id,
+                   %(uid)s, %(uid)s, now() at time zone 'UTC', now() at time zone 'UTC'
+              FROM work_program wp
+             WHERE wp.id = ANY(%(source_ids)s)
+             ORDER BY wp.id
+            ON CONFLICT (rollover_source_id) DO NOTHING
+            RETURNING id, rollover_source_id
+        """, {
+            'target': target_week,
+            'month': self.MONTH_KEYS[target_week.month - 1],
+            'week_number': target_week.isocalendar()[1],
+            'delta': (target_week - week).days,
+            'uid': self.env.uid,
+            'source_ids': source_ids,
+        })
+        rows = self.env.cr.fetchall()
+        if not rows:
+            return result
+        new_ids = [row[0] for row in rows]
+        for field_name in ('deliverable_ids', 'support_ids'):
+            field = self._fields[field_name]
+            self.env.cr.execute(f"""
+                INSERT INTO {field.relation} ({field.column1}, {field.column2})
+                SELECT new.id, rel.{field.column2}
+                  FROM unnest(%s::int[], %s::int[]) AS new(id, source_id)
+                  JOIN {field.relation} rel ON rel.{field.column1} = new.source_id
+                ON CONFLICT DO NOTHING
+            """, [new_ids, [row[1] for row in rows]])
+        self.env.cr.execute("""
+            SELECT count(*)
+              FROM work_program clone
+              JOIN work_program src ON src.id = clone.rollover_source_id
+             WHERE clone.id = ANY(%s) AND clone.nb_postpones > COALESCE(src.nb_postpones, 0)
+        """, [new_ids])
+        postponed = self.env.cr.fetchone()[0]
+        self._update_search_vector(new_ids)
+        self.invalidate_model()
+
+        clones = self.browse(new_ids)
+        kpi = self.env['work.program.kpi']
+        kpi._apply_contributions({}, kpi._get_contributions(clones))
+        result.update(created=len(new_ids), postponed=postponed, ids=new_ids)
+        result['skipped'] += len(source_ids) - len(new_ids)
+        _logger.info(f"Report de la semaine {week} sur {target_week} : {result['created']} programme(s) reconduit(s), "
+                     f"{result['postponed']} reporté(s), {result['skipped']} déjà reconduit(s)")
+        return result
+
+
+class WorkProgramRolloverWizard(models.TransientModel):
+    """Assistant de report des programmes d'une semaine sur la semaine suivante."""
+    _name = 'work.program.rollover.wizard'
+    _description = 'Report des programmes de travail sur une autre semaine'
+
+    week = fields.Date(string='Semaine à reconduire', required=True,
+                       default=lambda self: self.env['work.program']._get_default_my_week())
+    target_week = fields.Date(string='Semaine cible', compute='_compute_target_week', store=True, readonly=False,
+                              required=True)
+    department_ids = fields.Many2many('hr.department', string='Départements',
+                                      help="Laisser vide pour reconduire les programmes de tous les départements.")
+    candidate_count = fields.Integer(string='Programmes à reconduire', compute='_compute_candidates')
+    skipped_count = fields.Integer(string='Déjà reconduits', compute='_compute_candidates')
+
+    @api.depends('week')
+    def _compute_target_week(self):
+        Program = self.env['work.program']
+        for wizard in self:
+            wizard.target_week = wizard.week and Program._get_monday(wizard.week) + timedelta(weeks=1)
+
+    @api.depends('week', 'department_ids')
+    def _compute_candidates(self):
+        Program = self.env['work.program']
+        for wizard in self:
+            source_ids, skipped_ids = Program._get_rollover_candidates(
+                wizard.week, wizard.department_ids.ids) if wizard.week else ([], [])
+            wizard.candidate_count = len(source_ids)
+            wizard.skipped_count = len(skipped_ids)
+
+    def action_rollover(self):
+        self.ensure_one()
+        result = self.env['work.program'].rollover_week(self.week, self.target_week, self.department_ids.ids)
+        return {
+            'type': 'ir.actions.client',
+            'tag': 'display_notification',
+            'params': {
+                'title': _("Report terminé"),
+                'message': _("%(created)s programme(s) reconduit(s), dont %(postponed)s reporté(s) ; "
+                             "%(skipped)s déjà reconduit(s).") % result,
+                'type': 'success',
+                'next': {'type': 'ir.actions.act_window_close'},
+            },
+        }
@@ -0,0 +1,295 @@
+# -*- coding: utf-8 -*-
+import heapq
+import logging
+import math
+from collections import defaultdict
+from datetime import timedelta
+
+from odoo import models, api, fields, Command, _
+from odoo.exceptions import UserError
+
+_logger = logging.getLogger(__name__)
+
+
+class WorkProgramScheduler(models.AbstractModel):
+    """
+    Affectation automatique des programmes d'une semaine aux employés d'un département.
+
+    Les programmes sont traités par échéance la plus proche, puis par priorité et
+    effort décroissants ; chacun est confié à l'employé disponible le plus tôt
+    (file de priorité sur la charge déjà planifiée de la semaine, rapportée à sa
+    capacité journalière), tant que sa capacité hebdomadaire restante le permet.
+    Un programme de complexité élevée reçoit en plus un employé en support, l'effort
+    étant partagé à parts égales comme dans le rapport de charge. La charge déjà
+    affectée sur la semaine, tous départements confondus, est déduite de la
+    capacité. Un programme qui ne tient ni dans la capacité ni avant son échéance
+    n'est pas affecté.
+    """
+    _name = 'work.program.scheduler'
+    _description = 'Affectation automatique des programmes de travail'
+
+    _WORKING_DAYS = 5
+    _PRIORITY_RANK = {'high': 0, 'medium': 1, 'low': 2}
+
+    @api.model
+    def _get_candidate_domain(self, week, department_id, include_assigned_drafts=False):
+        domain = [
+            ('my_week_of', '=', week),
+            ('work_programm_department_id', '=', department_id),
+        ]
+        if include_assigned_drafts:
+            domain += ['|', ('status', '=', 'draft'),
+                       '&', ('status', '=', 'ongoing'), ('responsible_id', '=', False)]
+        else:
+            domain += [('status', 'in', ['draft', 'ongoing']), ('responsible_id', '=', False)]
+        return domain
+
+    @api.model
+    def _get_tasks(self, program_ids):
+        """Programmes à planifier, lus en une requête."""
+        self.env.cr.execute("""
+            SELECT id, COALESCE(duration_effort, 0), priority, complexity,
+                   COALESCE(actual_deadline, initial_deadline)
+              FROM work_program
+             WHERE id = ANY(%s)
+        """, [program_ids])
+        return self.env.cr.fetchall()
+
+    @api.model
+    def _get_committed_hours(self, week, employee_ids, excluded_program_ids):
+        """{employé: heures déjà affectées sur la semaine} hors programmes à planifier, en une requête."""
+        support_field = self.env['work.program']._fields['support_ids']
+        self.env.cr.execute(f"""
+            WITH programs AS (
+                SELECT id, responsible_id, COALESCE(duration_effort, 0) AS hours
+                  FROM work_program
+                 WHERE my_week_of = %(week)s
+                   AND COALESCE(status, 'draft') != 'cancelled'
+                   AND id != ALL(%(excluded)s)
+            ), assignment AS (
+                SELECT id AS program_id, responsible_id AS employee_id
+                  FROM programs
+                 WHERE responsible_id IS NOT NULL
+                 UNION
+                SELECT rel.{support_field.column1}, rel.{support_field.column2}
+                  FROM {support_field.relation} rel
+                  JOIN programs p ON p.id = rel.{support_field.column1}
+            ), share AS (
+                SELECT asg.employee_id, p.hours / count(*) OVER (PARTITION BY p.id) AS hours
+                  FROM assignment asg
+                  JOIN programs p ON p.id = asg.program_id
+            )
+            SELECT employee_id, sum(hours)
+              FROM share
+             WHERE employee_id = ANY(%(employees)s)
+             GROUP BY employee_id
+        """, {'week': week, 'excluded': list(excluded_program_ids), 'employees': list(employee_ids)})
+        return dict(self.env.cr.fetchall())
+
+    @api.model
+    def _schedule(self, week, tasks, employees):
+        """
+        Planifie ``tasks`` ([(id, effort, priorité, complexité, échéance)]) sur
+        ``employees`` ({id: (capacité restante, capacité journalière, heures déjà affectées)}).
+
+        Retourne la liste des propositions ``{'program_id', 'responsible_id',
+        'support_id', 'assignment_date', 'end_date', 'hours', 'reason'}``.
+        """
+        week_end = week + timedelta(days=self._WORKING_DAYS - 1)
+        remaining = {employee_id: values[0] for employee_id, values in employees.items()}
+        daily = {employee_id: values[1] for employee_id, values in employees.items()}
+        committed = {employee_id: values[2] for employee_id, values in employees.items()}
+        # (jour de disponibilité, employé) : l'employé libre le plus tôt est en tête
+        heap = [(committed[employee_id] / daily[employee_id], employee_id)
+                for employee_id in employees if remaining[employee_id] > 0]
+        heapq.heapify(heap)
+
+        def sort_key(task):
+            program_id, effort, priority, complexity, deadline = task
+            return min(deadline or week_end, week_end), self._PRIORITY_RANK.get(priority, 1), -effort, program_id
+
+        proposals = []
+        for program_id, effort, priority, complexity, deadline in sorted(tasks, key=sort_key):
+            proposal = {'program_id': program_id, 'responsible_id': False, 'support_id': False,
+                        'assignment_date': False, 'end_date': False, 'hours': effort, 'reason': False}
+            proposals.append(proposal)
+            wanted = 2 if complexity == 'high' else 1
+            chosen, skipped = [], []
+            while heap and len(chosen) < wanted:
+                entry = heapq.heappop(heap)
+                (chosen if remaining[entry[1]] >= effort / wanted else skipped).append(entry)
+            # Sans second employé disponible, le responsable seul doit pouvoir absorber tout l'effort
+            if len(chosen) < wanted and chosen and remaining[chosen[0][1]] < effort:
+                skipped += chosen
+                chosen = []
+            if not chosen:
+                proposal['reason'] = 'capacity'
+                for entry in skipped:
+                    heapq.heappush(heap, entry)
+                continue
+            share = effort / len(chosen)
+            start_day = min(int(committed[employee_id] / daily[employee_id]) for _day, employee_id in chosen)
+            end_day = max(max(math.ceil((committed[employee_id] + share) / daily[employee_id]) - 1, 0)
+                          for _day, employee_id in chosen)
+            start_day = min(start_day, self._WORKING_DAYS - 1)
+            end_date = week + timedelta(days=min(max(end_day, start_day), self._WORKING_DAYS - 1))
+            if deadline and end_date > deadline:
+                proposal['reason'] = 'deadline'
+                for entry in chosen + skipped:
+                    heapq.heappush(heap, entry)
+                continue
+            for _day, employee_id in chosen:
+                committed[employee_id] += share
+                remaining[employee_id] -= share
+                if remaining[employee_id] > 0:
+                    heapq.heappush(heap, (committed[employee_id] / daily[employee_id], employee_id))
+            for entry in skipped:
+                heapq.heappush(heap, entry)
+            proposal.update(
+                responsible_id=chosen[0][1],
+                support_id=len(chosen) > 1 and chosen[1][1],
+                assignment_date=week + timedelta(days=start_day),
+                end_date=end_date,
+            )
+        return proposals
+
+    @api.model
+    def compute_schedule(self, week, department_id, include_assigned_drafts=False):
+        """
+        Propose les affectations des programmes de la semaine ``week`` du département
+        ``department_id`` : les programmes sans responsable (et les brouillons déjà
+        affectés si ``include_assigned_drafts``), répartis entre les employés du
+        département. Rien n'est écrit ; voir ``apply_schedule``.
+        """
+        Program = self.env['work.program']
+        week = Program._get_monday(week)
+        program_ids = Program.search(self._get_candidate_domain(week, department_id, include_assigned_drafts)).ids
+        if not program_ids:
+            return []
+        employees = self.env['hr.employee'].search([('department_id', '=', department_id)])
+        self.env.flush_all()
+        committed_hours = self._get_committed_hours(week, employees.ids, program_ids)
+        capacities = {}
+        for employee in employees:
+            if employee.weekly_capacity > 0:
+                committed = committed_hours.get(employee.id, 0.0)
+                capacities[employee.id] = (employee.weekly_capacity - committed,
+                                           employee.weekly_capacity / self._WORKING_DAYS, committed)
+        proposals = self._schedule(week, self._get_tasks(program_ids), capacities)
+        _logger.info(f"Affectation automatique de la semaine {week} (département {department_id}) : "
+                     f"{sum(1 for proposal in proposals if proposal['responsible_id'])}/{len(proposals)} "
+                     f"programme(s) affecté(s)")
+        return proposals
+
+    @api.model
+    def apply_schedule(self, proposals):
+        """
+        Applique en masse les propositions affectées : une écriture par combinaison
+        (responsable, support, date d'assignation, échéance initiale à renseigner).
+        Les supports sont remplacés par celui de la proposition (aucun s'il n'y en a
+        pas). La date limite initiale n'est renseignée que si elle est vide.
+        """
+        Program = self.env['work.program']
+        proposals = [proposal for proposal in proposals if proposal.get('responsible_id')]
+        programs = Program.browse([proposal['program_id'] for proposal in proposals]).exists()
+        existing_ids = set(programs.ids)
+        without_deadline = set(programs.filtered(lambda program: not program.initial_deadline).ids)
+        groups = defaultdict(list)
+        for proposal in proposals:
+            if proposal['program_id'] not in existing_ids:
+                continue
+            end_date = proposal['end_date'] if proposal['program_id'] in without_deadline else False
+            groups[(proposal['responsible_id'], proposal.get('support_id') or False,
+                    proposal['assignment_date'], end_date)].append(proposal['program_id'])
+        for (responsible_id, support_id, assignment_date, end_date), program_ids in groups.items():
+            # Les supports remplacent ceux d'une affectation précédente (brouillons replanifiés)
+            vals = {'responsible_id': responsible_id, 'assignment_date': assignment_date,
+                    'support_ids': [Command.set([support_id] if support_id else [])]}
+            if end_date:
+                vals['initial_deadline'] = end_date
+            Program.browse(program_ids).write(vals)
+        return sum(len(program_ids) for program_ids in groups.values())
+
+
+class WorkProgramScheduleWizard(models.TransientModel):
+    """Assistant d'affectation automatique : aperçu modifiable puis application en masse."""
+    _name = 'work.program.schedule.wizard'
+    _description = 'Affectation automatique des programmes de travail'
+
+    week = fields.Date(string='Semaine', required=True,
+                       default=lambda self: self.env['work.program']._get_default_my_week())
+    department_id = fields.Many2one('hr.department', string='Département', required=True,
+                                    default=lambda self: self.env.user.employee_id.department_id)
+    include_assigned_drafts = fields.Boolean(string='Réaffecter les brouillons déjà affectés',
+                                             help="Replanifie aussi les programmes en brouillon ayant déjà un "
+                                                  "responsable ; sinon seuls les programmes sans responsable "
+                                                  "sont affectés.")
+    line_ids = fields.One2many('work.program.schedule.wizard.line', 'wizard_id', string='Propositions')
+    planned_count = fields.Integer(string='Programmes affectés', compute='_compute_counts')
+    unplanned_count = fields.Integer(string='Programmes non affectés', compute='_compute_counts')
+
+    @api.depends('line_ids.responsible_id')
+    def _compute_counts(self):
+        for wizard in self:
+            wizard.planned_count = len(wizard.line_ids.filtered('responsible_id'))
+            wizard.unplanned_count = len(wizard.line_ids) - wizard.planned_count
+
+    def _reopen(self):
+        return {
+            'type': 'ir.actions.act_window',
+            'res_model': self._name,
+            'res_id': self.id,
+            'view_mode': 'form',
+            'target': 'new',
+        }
+
+    def action_preview(self):
+        self.ensure_one()
+        proposals = self.env['work.program.scheduler'].compute_schedule(
+            self.week, self.department_id.id, self.include_assigned_drafts)
+        self.line_ids.unlink()
+        self.env['work.program.schedule.wizard.line'].create([
+            dict(proposal, wizard_id=self.id) for proposal in proposals
+        ])
+        return self._reopen()
+
+    def action_apply(self):
+        self.ensure_one()
+        if not self.line_ids:
+            raise UserError(_("Calculez d'abord les propositions d'affectation."))
+        count = self.env['work.program.scheduler'].apply_schedule([{
+            'program_id': line.program_id.id,
+            'responsible_id': line.responsible_id.id,
+            'support_id': line.support_id.id,
+            'assignment_date': line.assignment_date,
+            'end_date': line.end_date,
+        } for line in self.line_ids])
+        return {
+            'type': 'ir.actions.client',
+            'tag': 'display_notification',
+            'params': {
+                'title': _("Affectation terminée"),
+                'message': _("%s programme(s) affecté(s).") % count,
+                'type': 'success',
+                'next': {'type': 'ir.actions.act_window_close'},
+            },
+        }
+
+
+class WorkProgramScheduleWizardLine(models.TransientModel):
+    _name = 'work.program.schedule.wizard.line'
+    _description = "Proposition d'affectation d'un programme de travail"
+    _order = 'responsible_id, assignment_date, id'
+
+    wizard_id = fields.Many2one('work.program.schedule.wizard', required=True, ondelete='cascade')
+    program_id = fields.Many2one('work.program', string='Programme', required=True, readonly=True,
+                                 ondelete='cascade')
+    hours = fields.Float(string='Effort (heures)', readonly=True)
+    responsible_id = fields.Many2one('hr.employee', string='Responsable')
+    support_id = fields.Many2one('hr.employee', string='Support')
+    assignment_date = fields.Date(string="Date d'assignation")
+    end_date = fields.Date(string='Fin prévue')
+    reason = fields.Selection([
+        ('capacity', 'Capacité insuffisante'),
+        ('deadline', 'Échéance intenable'),
+    ], string='Non affecté', readonly=True)
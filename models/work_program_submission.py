@@ -0,0 +1,200 @@
+# -*- coding: utf-8 -*-
+import json
+import logging
+import threading
+import uuid
+
+from odoo import models, api, fields, _
+from odoo.exceptions import ValidationError
+
+_logger = logging.getLogger(__name__)
+
+
+class WorkProgramSubmission(models.Model):
+    """
+    File d'attente des soumissions du formulaire public (mode tamponné).
+
+    En mode tamponné, ``/work_program/submit`` valide les valeurs puis insère une
+    simple ligne dans cette table, sans toucher à work.program ni au chatter. Une
+    tâche planifiée vide la file par paquets (``FOR UPDATE SKIP LOCKED``), crée les
+    programmes en une fois avec le suivi désactivé puis journalise la création en
+    lot. Les échecs sont réessayés avec un délai croissant, puis mis de côté
+    (« rejeté ») après ``_MAX_ATTEMPTS`` tentatives.
+    """
+    _name = 'work.program.submission'
+    _description = 'Soumission en attente du formulaire public'
+    _order = 'id desc'
+    _rec_name = 'token'
+
+    token = fields.Char(string='Jeton', required=True, readonly=True, index=True, copy=False,
+                        default=lambda self: uuid.uuid4().hex)
+    payload = fields.Text(string='Valeurs soumises', required=True, readonly=True)
+    state = fields.Selection([
+        ('pending', 'En attente'),
+        ('failed', 'En échec (nouvel essai prévu)'),
+        ('done', 'Traitée'),
+        ('dead', 'Rejetée'),
+    ], string='Statut', default='pending', required=True, readonly=True, index=True)
+    attempts = fields.Integer(string='Tentatives', default=0, readonly=True)
+    next_attempt_date = fields.Datetime(string='Prochaine tentative', readonly=True,
+                                        default=fields.Datetime.now, index=True)
+    error = fields.Text(string='Dernière erreur', readonly=True)
+    work_program_id = fields.Many2one('work.program', string='Programme créé', readonly=True, ondelete='set null')
+    # Identifiant simple : survit à l'archivage du programme, qui vide work_program_id
+    work_program_res_id = fields.Integer(string='Identifiant du programme créé', readonly=True, index=True)
+
+    _sql_constraints = [
+        ('token_uniq', 'unique (token)', 'Le jeton de soumission doit être unique.'),
+    ]
+
+    _CONFIG_BUFFERED = 'workprogramm.submit_buffered'
+    _MAX_ATTEMPTS = 5
+    # Délai avant la nouvelle tentative, en minutes, selon le nombre d'échecs
+    _RETRY_DELAYS = [1, 5, 30, 120]
+    _BATCH_SIZE = 200
+    # Les soumissions traitées sont supprimées après ce délai
+    _KEEP_DONE_DAYS = 30
+
+    def init(self):
+        self.env.cr.execute(f"""
+            UPDATE {self._table} SET work_program_res_id = work_program_id
+             WHERE work_program_res_id IS NULL AND work_program_id IS NOT NULL
+        """)
+
+    # ------------------------------------------------------------------
+    # Mise en file
+    # ------------------------------------------------------------------
+    @api.model
+    def is_buffered(self):
+        return self.env['ir.config_parameter'].sudo().get_param(self._CONFIG_BUFFERED, 'False').lower() in ('1', 'true')
+
+    @api.model
+    def _validate_vals(self, vals):
+        """Contrôles légers effectués avant la mise en file (sans écriture sur work.program)."""
+        program_fields = self.env['work.program']._fields
+        for field_name, value in vals.items():
+            field = program_fields[field_name]
+            if field.type == 'selection' and value and isinstance(field.selection, list):
+                if value not in dict(field.selection):
+                    raise ValidationError(_("Valeur invalide pour %s : %s") % (field.string, value))
+            elif field.type == 'many2one' and value:
+                if not self._get_existing_ids(field.comodel_name, {value}):
+                    raise ValidationError(_("%s introuvable.") % field.string)
+            elif field.type == 'many2many' and value:
+                ids = set(value[0][2])
+                if len(self._get_existing_ids(field.comodel_name, ids)) != len(ids):
+                    raise ValidationError(_("%s : élément introuvable.") % field.string)
+        if not 0 <= vals.get('completion_percentage', 0.0) <= 100:
+            raise ValidationError(_("Le pourcentage d'achèvement doit être compris entre 0 et 100."))
+
+    @api.model
+    def _get_existing_ids(self, model_name, ids):
+        """Ids existants parmi ``ids`` ; les modèles de référence workflow.* passent par le cache partagé."""
+        cache = self.env['workflow.reference.cache'].sudo()
+        if model_name in cache.CACHED_MODELS:
+            return set(cache.get_names(model_name, ids))
+        return set(self.env[model_name].sudo().browse(ids).exists().ids)
+
+    @api.model
+    def enqueue(self, vals):
+        """Valide et met en file une soumission ; retourne l'enregistrement de file."""
+        self._validate_vals(vals)
+        submission = self.create({'payload': json.dumps(vals)})
+        self.env.ref('workprogramm.ir_cron_process_submissions')._trigger()
+        return submission
+
+    @api.model
+    def get_status(self, token):
+        """Statut public d'une soumission : {'state', 'label', 'error'}."""
+        submission = self.search([('token', '=', token)], limit=1)
+        if not submission:
+            return {'state': 'unknown', 'label': _('Soumission inconnue'), 'error': False}
+        return {
+            'state': submission.state,
+            'label': dict(self._fields['state']._description_selection(self.env))[submission.state],
+            'error': submission.state == 'dead' and submission.error or False,
+        }
+
+    # ------------------------------------------------------------------
+    # Traitement
+    # ------------------------------------------------------------------
+    @api.model
+    def _lock_batch(self, batch_size):
+        self.env.cr.execute("""
+            SELECT id FROM work_program_submission
+             WHERE state IN ('pending', 'failed')
+               AND (next_attempt_date IS NULL OR next_attempt_date <= now() at time zone 'UTC')
+             ORDER BY id
+             LIMIT %s
+               FOR UPDATE SKIP LOCKED
+        """, [batch_size])
+        return self.browse([row[0] for row in self.env.cr.fetchall()])
+
+    def _create_programs(self):
+        """Crée les programmes d'un paquet, suivi différé : une seule création puis journal en lot."""
+        programs = self.env['work.program']._bulk_mode().create([json.loads(submission.payload) for submission in self])
+        programs._message_log_batch(bodies={
+            program.id: _("Programme créé depuis le formulaire public (soumission %s).") % submission.token
+            for program, submission in zip(programs, self)
+        })
+        for program, submission in zip(programs, self):
+            submission.write({'state': 'done', 'work_program_id': program.id, 'work_program_res_id': program.id,
+                              'error': False})
+
+    def _mark_failed(self, error):
+        for submission in self:
+            attempts = submission.attempts + 1
+            vals = {'attempts': attempts, 'error': error}
+            if attempts >= self._MAX_ATTEMPTS:
+                vals['state'] = 'dead'
+            else:
+                delay = self._RETRY_DELAYS[min(attempts, len(self._RETRY_DELAYS)) - 1]
+                vals.update(state='failed', next_attempt_date=fields.Datetime.add(fields.Datetime.now(), minutes=delay))
+            submission.write(vals)
+
+    def _process_batch(self):
+        try:
+            with self.env.cr.savepoint():
+                self._create_programs()
+            return
+        except Exception as e:
+            _logger.info(f"Paquet de {len(self)} soumissions en échec ({e}), traitement unitaire")
+        # Rejoue ligne par ligne pour isoler les soumissions fautives
+        for submission in self:
+            try:
+                with self.env.cr.savepoint():
+                    submission._create_programs()
+            except Exception as e:
+                _logger.warning(f"Soumission {submission.token} en échec : {e}")
+                submission._mark_failed(str(e))
+
+    @api.model
+    def _cron_process_queue(self, batch_size=None, max_batches=50):
+        """Vide la file par paquets ; chaque paquet est validé indépendamment."""
+        auto_commit = not getattr(threading.current_thread(), 'testing', False)
+        batch_size = batch_size or self._BATCH_SIZE
+        for __ in range(max_batches):
+            batch = self._lock_batch(batch_size)
+            if not batch:
+                break
+            batch._process_batch()
+            self.env.flush_all()
+            if auto_commit:
+                self.env.cr.commit()
+            self.env.invalidate_all()
+        self._purge_done()
+
+    @api.model
+    def _purge_done(self):
+        limit_date = fields.Datetime.subtract(fields.Datetime.now(), days=self._KEEP_DONE_DAYS)
+        self.search([('state', '=', 'done'), ('write_date', '<', limit_date)]).unlink()
+
+    def action_retry(self):
+        """Remet en file des soumissions rejetées ou en échec."""
+        self.filtered(lambda s: s.state in ('failed', 'dead')).write({
+            'state': 'pending',
+            'attempts': 0,
+            'next_attempt_date': fields.Datetime.now(),
+        })
+        self.env.ref('workprogramm.ir_cron_process_submissions')._trigger()
+        return True
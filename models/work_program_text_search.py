@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+import logging
+
+from odoo import models, api, fields, tools, _
+from odoo.exceptions import UserError
+from odoo.osv import expression
+
+_logger = logging.getLogger(__name__)
+
+
+class WorkProgramTextSearch(models.Model):
+    """
+    Recherche plein texte sur les champs libres des programmes de travail.
+
+    La colonne ``search_vector`` (tsvector, index GIN) combine le nom de la
+    formulation (poids A), le nom de l'activité (poids B), puis les entrées
+    nécessaires, les commentaires et le champ 2 (poids C), analysés avec la
+    configuration ``workprogramm_fr`` : français (racines) et sans accents lorsque
+    l'extension unaccent est disponible. La colonne est tenue à jour en une
+    requête à chaque création ou modification des champs concernés. Une recherche
+    sur ``text_search`` utilise l'index et trie les résultats par pertinence.
+    """
+    _inherit = 'work.program'
+
+    _TEXT_SEARCH_CONFIG = 'workprogramm_fr'
+    _TEXT_SEARCH_FIELDS = {'inputs_needed', 'comments', 'champ2', 'task_description_id', 'activity_id'}
+    _TEXT_SEARCH_OPERATORS = ('=', 'ilike', 'like')
+    _TEXT_SEARCH_NEGATIVE_OPERATORS = ('!=', 'not ilike', 'not like')
+
+    text_search = fields.Char(string='Recherche plein texte', compute='_compute_text_search',
+                              search='_search_text_search',
+                              help="Mots recherchés dans la formulation, l'activité, les entrées nécessaires, "
+                                   "les commentaires et le champ 2 (syntaxe : mots, \"expression exacte\", -exclu, or).")
+
+    def _compute_text_search(self):
+        for record in self:
+            record.text_search = False
+
+    def _auto_init(self):
+        res = super()._auto_init()
+        self._init_text_search_config()
+        if not tools.column_exists(self.env.cr, self._table, 'search_vector'):
+            tools.create_column(self.env.cr, self._table, 'search_vector', 'tsvector')
+            self._update_search_vector()
+        self.env.cr.execute(f"""
+            CREATE INDEX IF NOT EXISTS work_program_search_vector_idx
+                ON {self._table} USING gin (search_vector)
+        """)
+        return res
+
+    @api.model
+    def _init_text_search_config(self):
+        """Configuration française sans accents (français seul si unaccent ne peut être installé)."""
+        cr = self.env.cr
+        try:
+            with cr.savepoint(flush=False):
+                cr.execute("CREATE EXTENSION IF NOT EXISTS unaccent")
+        except Exception as e:
+            _logger.warning(f"Extension unaccent indisponible, recherche plein texte sans suppression des accents : {e}")
+        cr.execute("SELECT 1 FROM pg_ts_config WHERE cfgname = %s", [self._TEXT_SEARCH_CONFIG])
+        if not cr.fetchone():
+            cr.execute(f"CREATE TEXT SEARCH CONFIGURATION {self._TEXT_SEARCH_CONFIG} (COPY = pg_catalog.french)")
+        cr.execute("SELECT 1 FROM pg_extension WHERE extname = 'unaccent'")
+        if cr.fetchone():
+            cr.execute(f"""
+                ALTER TEXT SEARCH CONFIGURATION {self._TEXT_SEARCH_CONFIG}
+                    ALTER MAPPING FOR hword, hword_part, word WITH unaccent, french_stem
+            """)
+
+    @api.model
+    def _update_search_vector(self, ids=None, where=None, params=None):
+        """Recalcule ``search_vector`` des programmes donnés (ids ou clause SQL sur ``wp``), en une requête."""
+        if ids is not None:
+            if not ids:
+                return
+            where, params = "wp.id = ANY(%s)", [list(ids)]
+        config = self._TEXT_SEARCH_CONFIG
+        self.env.cr.execute(f"""
+            UPDATE work_program wp
+               SET search_vector =
+                   setweight(to_tsvector('{config}', COALESCE(
+                       (SELECT tf.name FROM workflow_task_formulation tf WHERE tf.id = wp.task_description_id), '')), 'A')
+                || setweight(to_tsvector('{config}', COALESCE(
+                       (SELECT a.name FROM workflow_activity a WHERE a.id = wp.activity_id), '')), 'B')
+                || setweight(to_tsvector('{config}', concat_ws(' ', wp.inputs_needed, wp.comments, wp.champ2)), 'C')
+             WHERE {where or 'TRUE'}
+        """, params or [])
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        records = super().create(vals_list)
+        records.flush_recordset(list(self._TEXT_SEARCH_FIELDS))
+        self._update_search_vector(records.ids)
+        return records
+
+    def write(self, vals):
+        res = super().write(vals)
+        if self._TEXT_SEARCH_FIELDS.intersection(vals):
+            self.flush_recordset(list(self._TEXT_SEARCH_FIELDS))
+            self._update_search_vector(self.ids)
+        return res
+
+    # ------------------------------------------------------------------
+    # Recherche et tri par pertinence
+    # ------------------------------------------------------------------
+    @api.model
+    def _search_text_search(self, operator, value):
+        negative = operator in self._TEXT_SEARCH_NEGATIVE_OPERATORS
+        if not negative and operator not in self._TEXT_SEARCH_OPERATORS:
+            raise UserError(_("Opérateur non pris en charge par la recherche plein texte : %s") % operator)
+        if value and not isinstance(value, str):
+            raise UserError(_("La recherche plein texte attend une chaîne de caractères."))
+        if not value:
+            # Comme pour un champ texte vide : tout correspond, rien ne l'exclut
+            return expression.FALSE_DOMAIN if negative else expression.TRUE_DOMAIN
+        return [('id', 'not inselect' if negative else 'inselect', (
+            f"SELECT id FROM work_program WHERE search_vector @@ websearch_to_tsquery('{self._TEXT_SEARCH_CONFIG}', %s)",
+            [value],
+        ))]
+
+    @api.model
+    def _get_text_search_terms(self, domain):
+        terms = [leaf[2] for leaf in domain or []
+                 if isinstance(leaf, (list, tuple)) and len(leaf) == 3 and leaf[0] == 'text_search'
+                 and leaf[1] in self._TEXT_SEARCH_OPERATORS and isinstance(leaf[2], str) and leaf[2]]
+        return ' '.join(terms)
+
+    @api.model
+    def _search(self, domain, offset=0, limit=None, order=None, count=False, access_rights_uid=None):
+        # Sans tri explicite, une recherche plein texte est triée par pertinence
+        terms = self._get_text_search_terms(domain)
+        if terms and not count and (not order or order == self._order):
+            self = self.with_context(work_program_text_search_rank=terms)
+        return super()._search(domain, offset=offset, limit=limit, order=order, count=count,
+                               access_rights_uid=access_rights_uid)
+
+    def _generate_order_by(self, order_spec, query):
+        order_by = super()._generate_order_by(order_spec, query)
+        terms = self.env.context.get('work_program_text_search_rank')
+        if not terms:
+            return order_by
+        rank = self.env.cr.mogrify(
+            f'ts_rank_cd("{self._table}".search_vector, websearch_to_tsquery(%s, %s)) DESC',
+            [self._TEXT_SEARCH_CONFIG, terms]).decode()
+        return f" ORDER BY {rank}" + (f", {order_by[len(' ORDER BY '):]}" if order_by else '')
+
+
+class WorkflowTaskFormulationTextSearch(models.Model):
+    _inherit = 'workflow.task.formulation'
+
+    def write(self, vals):
+        res = super().write(vals)
+        if 'name' in vals:
+            self.flush_recordset(['name'])
+            self.env['work.program']._update_search_vector(where="wp.task_description_id = ANY(%s)",
+                                                            params=[self.ids])
+        return res
+
+
+class WorkflowActivityTextSearch(models.Model):
+    _inherit = 'workflow.activity'
+
+    def write(self, vals):
+        res = super().write(vals)
+        if 'name' in vals:
+            self.flush_recordset(['name'])
+            self.env['work.program']._update_search_vector(where="wp.activity_id = ANY(%s)", params=[self.ids])
+        return res
@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+import logging
+import threading
+
+from odoo import models, api, fields
+
+_logger = logging.getLogger(__name__)
+
+
+class WorkProgramTrackingArchive(models.Model):
+    """
+    Archive des anciennes valeurs de suivi (mail.tracking.value) des programmes de travail.
+
+    Une tâche planifiée déplace par paquets les valeurs de suivi plus anciennes que
+    la durée de rétention (paramètre système ``workprogramm.tracking_retention_days``,
+    0 pour désactiver) vers cette table compacte, puis les supprime de
+    ``mail_tracking_value``. L'historique reste consultable sans alourdir le chatter.
+    Les valeurs des programmes archivés (work.program.archive) sont archivées aussi ;
+    l'identifiant du programme est gardé dans ``work_program_res_id``, et le lien
+    ``work_program_id`` rétabli à la restauration du programme.
+    """
+    _name = 'work.program.tracking.archive'
+    _description = 'Archive du suivi des programmes de travail'
+    _order = 'message_date desc, id desc'
+    _rec_name = 'field_name'
+
+    work_program_id = fields.Many2one('work.program', string='Programme', readonly=True, index=True,
+                                      ondelete='set null')
+    # Identifiant simple : survit à l'archivage du programme, qui vide work_program_id
+    work_program_res_id = fields.Integer(string='Identifiant du programme', readonly=True, index=True)
+    message_date = fields.Datetime(string='Date', readonly=True, index=True)
+    author_id = fields.Many2one('res.partner', string='Auteur', readonly=True, ondelete='set null')
+    field_name = fields.Char(string='Champ', readonly=True)
+    field_description = fields.Char(string='Libellé du champ', readonly=True)
+    old_value = fields.Char(string='Ancienne valeur', readonly=True)
+    new_value = fields.Char(string='Nouvelle valeur', readonly=True)
+
+    _CONFIG_RETENTION_DAYS = 'workprogramm.tracking_retention_days'
+    _DEFAULT_RETENTION_DAYS = 365
+    _BATCH_SIZE = 10000
+
+    def init(self):
+        self.env.cr.execute(f"""
+            UPDATE {self._table} SET work_program_res_id = work_program_id
+             WHERE work_program_res_id IS NULL AND work_program_id IS NOT NULL
+        """)
+
+    @api.model
+    def _get_retention_days(self):
+        value = self.env['ir.config_parameter'].sudo().get_param(
+            self._CONFIG_RETENTION_DAYS, str(self._DEFAULT_RETENTION_DAYS))
+        try:
+            return max(int(value), 0)
+        except ValueError:
+            return self._DEFAULT_RETENTION_DAYS
+
+    @api.model
+    def _archive_batch(self, limit_date, batch_size):
+        """Archive un paquet de valeurs de suivi ; retourne le nombre de lignes déplacées."""
+        self.env.cr.execute("""
+            WITH moved AS (
+                DELETE FROM mail_tracking_value
+                 WHERE id IN (
+                        SELECT tv.id
+                          FROM mail_tracking_value tv
+                          JOIN mail_message m ON m.id = tv.mail_message_id
+                         WHERE m.model = 'work.program'
+                           AND m.date < %(limit_date)s
+                           AND (EXISTS (SELECT 1 FROM work_program wp WHERE wp.id = m.res_id)
+                                OR EXISTS (SELECT 1 FROM work_program_archive wpa WHERE wpa.id = m.res_id))
+                         ORDER BY tv.id
+                         LIMIT %(batch_size)s
+                       )
+                RETURNING *
+            )
+            INSERT INTO work_program_tracking_archive (
+                work_program_id, work_program_res_id, message_date, author_id, field_name, field_description, old_value, new_value,
+                create_uid, write_uid, create_date, write_date)
+            SELECT wp.id, m.res_id, m.date, m.author_id, f.name, moved.field_desc,
+                   COALESCE(moved.old_value_char, moved.old_value_text, moved.old_value_datetime::text,
+                            moved.old_value_integer::text, moved.old_value_float::text),
+                   COALESCE(moved.new_value_char, moved.new_value_text, moved.new_value_datetime::text,
+                            moved.new_value_integer::text, moved.new_value_float::text),
+                   %(uid)s, %(uid)s, now() at time zone 'UTC', now() at time zone 'UTC'
+              FROM moved
+              JOIN mail_message m ON m.id = moved.mail_message_id
+              LEFT JOIN ir_model_fields f ON f.id = moved.field
+              LEFT JOIN work_program wp ON wp.id = m.res_id
+        """, {'limit_date': limit_date, 'batch_size': batch_size, 'uid': self.env.uid})
+        return self.env.cr.rowcount
+
+    @api.model
+    def _cron_archive_tracking_values(self):
+        retention_days = self._get_retention_days()
+        if not retention_days:
+            return
+        auto_commit = not getattr(threading.current_thread(), 'testing', False)
+        limit_date = fields.Datetime.subtract(fields.Datetime.now(), days=retention_days)
+        total = 0
+        while True:
+            moved = self._archive_batch(limit_date, self._BATCH_SIZE)
+            total += moved
+            if auto_commit:
+                self.env.cr.commit()
+            if moved < self._BATCH_SIZE:
+                break
+        self.env['mail.tracking.value'].invalidate_model()
+        _logger.info(f"{total} valeur(s) de suivi des programmes de travail archivée(s)")
@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+from odoo import models, api, fields, tools
+
+
+class HrEmployeeWorkload(models.Model):
+    _inherit = 'hr.employee'
+
+    weekly_capacity = fields.Float(string='Capacité hebdomadaire (heures)', default=40.0,
+                                   help="Nombre d'heures planifiables par semaine, utilisé pour détecter les surcharges.")
+
+
+class WorkProgramWorkloadReport(models.Model):
+    """
+    Charge hebdomadaire par employé, département et semaine (vue SQL).
+
+    L'effort d'un programme est réparti à parts égales entre son responsable et ses
+    employés en support, puis agrégé en SQL ; la charge totale de l'employé sur la
+    semaine (tous départements confondus) est comparée à sa capacité. Les programmes
+    archivés (work.program.archive) figurent dans des lignes distinctes marquées
+    ``is_archived``, exclues par défaut.
+    """
+    _name = 'work.program.workload.report'
+    _description = 'Charge de travail hebdomadaire'
+    _auto = False
+    _order = 'week desc, employee_id'
+
+    employee_id = fields.Many2one('hr.employee', string='Employé', readonly=True)
+    employee_department_id = fields.Many2one('hr.department', string="Département de l'employé", readonly=True)
+    department_id = fields.Many2one('hr.department', string='Département du programme', readonly=True)
+    week = fields.Date(string='Semaine', readonly=True)
+    program_count = fields.Integer(string='Programmes', readonly=True)
+    planned_hours = fields.Float(string='Heures planifiées', readonly=True)
+    responsible_hours = fields.Float(string='Heures en responsabilité', readonly=True)
+    support_hours = fields.Float(string='Heures en support', readonly=True)
+    employee_week_hours = fields.Float(string='Charge totale de la semaine', readonly=True, group_operator='max')
+    capacity = fields.Float(string='Capacité', readonly=True, group_operator='max')
+    load_rate = fields.Float(string='Taux de charge (%)', readonly=True, group_operator='max')
+    is_overloaded = fields.Boolean(string='Surcharge', readonly=True)
+    is_archived = fields.Boolean(string='Archivé', readonly=True)
+
+    def init(self):
+        program = self.env['work.program']
+        archive = self.env['work.program.archive']
+        support_field = program._fields['support_ids']
+        archive_support_field = archive._fields['support_ids']
+        tools.drop_view_if_exists(self.env.cr, self._table)
+        self.env.cr.execute(f"""
+            CREATE OR REPLACE VIEW {self._table} AS (
+                WITH programs AS (
+                    SELECT id, work_programm_department_id, my_week_of, duration_effort, status, responsible_id,
+                           FALSE AS is_archived
+                      FROM work_program
+                    UNION ALL
+                    SELECT id, work_programm_department_id, my_week_of, duration_effort, status, responsible_id,
+                           TRUE
+                      FROM {archive._table}
+                ), assignment AS (
+                    SELECT program_id, employee_id, bool_or(is_responsible) AS is_responsible
+                      FROM (
+                            SELECT id AS program_id, responsible_id AS employee_id, TRUE AS is_responsible
+                              FROM programs
+                             WHERE responsible_id IS NOT NULL
+                            UNION ALL
+                            SELECT {support_field.column1}, {support_field.column2}, FALSE
+                              FROM {support_field.relation}
+                            UNION ALL
+                            SELECT {archive_support_field.column1}, {archive_support_field.column2}, FALSE
+                              FROM {archive_support_field.relation}
+                           ) AS a
+                     GROUP BY program_id, employee_id
+                ), share AS (
+                    SELECT wp.id AS program_id,
+                           wp.work_programm_department_id AS department_id,
+                           wp.my_week_of AS week,
+                           wp.is_archived,
+                           COALESCE(wp.duration_effort, 0) / count(*) OVER (PARTITION BY wp.id) AS hours,
+                           asg.employee_id,
+                           asg.is_responsible
+                      FROM programs wp
+                      JOIN assignment asg ON asg.program_id = wp.id
+                     WHERE wp.my_week_of IS NOT NULL
+                       AND COALESCE(wp.status, 'draft') != 'cancelled'
+                ), load AS (
+                    SELECT employee_id, department_id, week, is_archived,
+                           count(*) AS program_count,
+                           sum(hours) AS planned_hours,
+                           sum(hours) FILTER (WHERE is_responsible) AS responsible_hours,
+                           sum(hours) FILTER (WHERE NOT is_responsible) AS support_hours
+                      FROM share
+                     GROUP BY employee_id, department_id, week, is_archived
+                )
+                SELECT row_number() OVER (ORDER BY l.week, l.employee_id, l.department_id, l.is_archived) AS id,
+                       l.employee_id,
+                       emp.department_id AS employee_department_id,
+                       l.department_id,
+                       l.week,
+                       l.program_count,
+                       l.planned_hours,
+                       COALESCE(l.responsible_hours, 0) AS responsible_hours,
+                       COALESCE(l.support_hours, 0) AS support_hours,
+                       sum(l.planned_hours) OVER w AS employee_week_hours,
+                       COALESCE(emp.weekly_capacity, 0) AS capacity,
+                       CASE WHEN COALESCE(emp.weekly_capacity, 0) > 0
+                            THEN 100.0 * sum(l.planned_hours) OVER w / emp.weekly_capacity
+                       END AS load_rate,
+                       sum(l.planned_hours) OVER w > COALESCE(emp.weekly_capacity, 0) AS is_overloaded,
+                       l.is_archived
+                  FROM load l
+                  JOIN hr_employee emp ON emp.id = l.employee_id
+                WINDOW w AS (PARTITION BY l.employee_id, l.week)
+            )
+        """)
+
+    @api.model
+    def get_workload(self, week_from=None, week_to=None, department_ids=None, employee_ids=None,
+                     include_archived=False):
+        """
+        Charge par employé et par semaine, calculée en base par ``read_group``.
+        Les programmes archivés ne sont comptés que si ``include_archived`` est vrai.
+
+        Retourne une liste de dictionnaires ``{'employee_id', 'employee_name', 'week',
+        'planned_hours', 'responsible_hours', 'support_hours', 'program_count',
+        'capacity', 'load_rate', 'is_overloaded'}``.
+        """
+        domain = [] if include_archived else [('is_archived', '=', False)]
+        if week_from:
+            domain.append(('week', '>=', week_from))
+        if week_to:
+            domain.append(('week', '<=', week_to))
+        if department_ids:
+            domain.append(('department_id', 'in', department_ids))
+        if employee_ids:
+            domain.append(('employee_id', 'in', employee_ids))
+        groups = self.read_group(
+            domain,
+            ['planned_hours:sum', 'responsible_hours:sum', 'support_hours:sum', 'program_count:sum', 'capacity:max'],
+            ['employee_id', 'week:day'],
+            lazy=False,
+            orderby='week, employee_id',
+        )
+        result = []
+        for group in groups:
+            capacity = group['capacity'] or 0.0
+            planned_hours = group['planned_hours'] or 0.0
+            result.append({
+                'employee_id': group['employee_id'] and group['employee_id'][0],
+                'employee_name': group['employee_id'] and group['employee_id'][1],
+                'week': group['__range']['week:day']['from'] if group.get('__range') else group['week:day'],
+                'planned_hours': planned_hours,
+                'responsible_hours': group['responsible_hours'] or 0.0,
+                'support_hours': group['support_hours'] or 0.0,
+                'program_count': group['program_count'] or 0,
+                'capacity': capacity,
+                'load_rate': capacity and 100.0 * planned_hours / capacity,
+                'is_overloaded': planned_hours > capacity,
+            })
+        return result
@@ -0,0 +1,326 @@
+# -*- coding: utf-8 -*-
+import logging
+import threading
+
+from odoo import models, api, fields, _
+from odoo.exceptions import UserError
+
+_logger = logging.getLogger(__name__)
+
+
+class WorkflowConsistencyIssue(models.Model):
+    """
+    Rapport des incohérences entre la chaîne parent des cadres de référence et
+    les sacs many2many de workflow.hierarchy ou les références des programmes.
+
+    Chaque contrôle est une requête ensembliste (jointures SQL sur l'ensemble des
+    données) retournant ``(enregistrement, référence fautive, valeur attendue)``.
+    La tâche planifiée ne contrôle que les enregistrements modifiés depuis son
+    dernier passage, et revérifie les anomalies encore ouvertes pour clore celles
+    qui ont été corrigées. La réparation automatique (paramètre système
+    ``workprogramm.consistency_auto_repair``) applique la correction proposée.
+    """
+    _name = 'workflow.consistency.issue'
+    _description = 'Incohérence des cadres de référence'
+    _order = 'state, check_type, res_id'
+    _rec_name = 'check_type'
+
+    CHECKS = [
+        ('program_procedure', "Procédure hors de l'activité du programme"),
+        ('program_task', 'Formulation hors de la procédure du programme'),
+        ('program_deliverable', "Livrable hors de l'activité du programme"),
+        ('hierarchy_process', 'Processus sans son domaine dans la hiérarchie'),
+        ('hierarchy_subprocess', 'Sous-processus sans son processus dans la hiérarchie'),
+        ('hierarchy_activity', 'Activité sans son sous-processus dans la hiérarchie'),
+        ('hierarchy_procedure', 'Procédure sans son activité dans la hiérarchie'),
+        ('hierarchy_deliverable', 'Livrable sans son activité dans la hiérarchie'),
+        ('hierarchy_task', 'Formulation sans sa procédure dans la hiérarchie'),
+    ]
+
+    check_type = fields.Selection(CHECKS, string='Contrôle', required=True, readonly=True, index=True)
+    res_model = fields.Char(string='Modèle', required=True, readonly=True)
+    res_id = fields.Integer(string='Enregistrement', required=True, readonly=True)
+    work_program_id = fields.Many2one('work.program', string='Programme', readonly=True, index=True,
+                                      ondelete='cascade')
+    hierarchy_id = fields.Many2one('workflow.hierarchy', string='Hiérarchie', readonly=True, index=True,
+                                   ondelete='cascade')
+    related_model = fields.Char(string='Modèle de la référence', readonly=True)
+    related_id = fields.Integer(string='Référence fautive', required=True, readonly=True)
+    related_name = fields.Char(string='Référence', compute='_compute_reference_names')
+    expected_model = fields.Char(string='Modèle attendu', readonly=True)
+    expected_id = fields.Integer(string='Valeur attendue', readonly=True)
+    expected_name = fields.Char(string='Correction proposée', compute='_compute_reference_names')
+    state = fields.Selection([
+        ('open', 'Ouverte'),
+        ('resolved', 'Résolue'),
+        ('repaired', 'Réparée'),
+    ], string='État', default='open', required=True, readonly=True, index=True)
+    first_seen = fields.Datetime(string='Détectée le', readonly=True)
+    last_seen = fields.Datetime(string='Vue le', readonly=True)
+
+    _sql_constraints = [
+        ('check_record_uniq', 'unique (check_type, res_id, related_id)',
+         'Une seule anomalie par contrôle, enregistrement et référence.'),
+    ]
+
+    _CONFIG_LAST_RUN = 'workprogramm.consistency_last_run'
+    _CONFIG_AUTO_REPAIR = 'workprogramm.consistency_auto_repair'
+
+    # Contrôles des sacs de la hiérarchie : (sac des enfants, colonne parent de l'enfant, sac des parents)
+    _HIERARCHY_CHECKS = {
+        'hierarchy_process': ('process_ids', 'domain_id', 'domain_ids'),
+        'hierarchy_subprocess': ('sub_process_ids', 'process_id', 'process_ids'),
+        'hierarchy_activity': ('activity_ids', 'sub_process_id', 'sub_process_ids'),
+        'hierarchy_procedure': ('procedure_ids', 'activity_id', 'activity_ids'),
+        'hierarchy_deliverable': ('deliverable_ids', 'activity_id', 'activity_ids'),
+        'hierarchy_task': ('task_formulation_ids', 'procedure_id', 'procedure_ids'),
+    }
+
+    @api.depends('related_model', 'related_id', 'expected_model', 'expected_id')
+    def _compute_reference_names(self):
+        cache = self.env['workflow.reference.cache']
+        names = {}
+        for model_name in set(self.mapped('related_model')) | set(self.mapped('expected_model')):
+            if not model_name:
+                continue
+            ids = self.filtered(lambda issue: issue.related_model == model_name).mapped('related_id') + \
+                self.filtered(lambda issue: issue.expected_model == model_name).mapped('expected_id')
+            names[model_name] = cache.get_names(model_name, ids)
+        for issue in self:
+            issue.related_name = names.get(issue.related_model, {}).get(issue.related_id, False)
+            issue.expected_name = names.get(issue.expected_model, {}).get(issue.expected_id, False)
+
+    # ------------------------------------------------------------------
+    # Contrôles ensemblistes
+    # ------------------------------------------------------------------
+    @api.model
+    def _get_check_queries(self):
+        """
+        {contrôle: (modèle contrôlé, modèle de la référence, modèle attendu, requête)}.
+
+        Chaque requête retourne ``(res_id, related_id, expected_id)`` et contient un
+        marqueur ``{scope}`` remplacé par la restriction du passage (tout, enregistrements
+        modifiés depuis une date, ou liste d'ids à revérifier).
+        """
+        Program = self.env['work.program']
+        Hierarchy = self.env['workflow.hierarchy']
+        deliverables = Program._fields['deliverable_ids']
+        queries = {
+            'program_procedure': ('work.program', 'workflow.procedure', 'workflow.activity', """
+                SELECT main.id, related.id, related.activity_id
+                  FROM work_program main
+                  JOIN workflow_procedure related ON related.id = main.procedure_id
+                 WHERE related.activity_id IS DISTINCT FROM main.activity_id
+                   AND {scope}
+            """),
+            'program_task': ('work.program', 'workflow.task.formulation', 'workflow.procedure', """
+                SELECT main.id, related.id, related.procedure_id
+                  FROM work_program main
+                  JOIN workflow_task_formulation related ON related.id = main.task_description_id
+                 WHERE related.procedure_id IS DISTINCT FROM main.procedure_id
+                   AND {scope}
+            """),
+            'program_deliverable': ('work.program', 'workflow.deliverable', 'workflow.activity', f"""
+                SELECT main.id, related.id, related.activity_id
+                  FROM work_program main
+                  JOIN {deliverables.relation} rel ON rel.{deliverables.column1} = main.id
+                  JOIN workflow_deliverable related ON related.id = rel.{deliverables.column2}
+                 WHERE related.activity_id IS DISTINCT FROM main.activity_id
+                   AND {{scope}}
+            """),
+        }
+        for check, (children_name, parent_column, parents_name) in self._HIERARCHY_CHECKS.items():
+            children = Hierarchy._fields[children_name]
+            parents = Hierarchy._fields[parents_name]
+            queries[check] = ('workflow.hierarchy', children.comodel_name, parents.comodel_name, f"""
+                SELECT main.id, related.id, related.{parent_column}
+                  FROM workflow_hierarchy main
+                  JOIN {children.relation} rel ON rel.{children.column1} = main.id
+                  JOIN {self.env[children.comodel_name]._table} related ON related.id = rel.{children.column2}
+                 WHERE related.{parent_column} IS NOT NULL
+                   AND NOT EXISTS (SELECT 1 FROM {parents.relation} parent
+                                    WHERE parent.{parents.column1} = main.id
+                                      AND parent.{parents.column2} = related.{parent_column})
+                   AND {{scope}}
+            """)
+        return queries
+
+    @api.model
+    def _run_check(self, query, since=None, ids=None):
+        """Exécute un contrôle sur tout, sur les modifications depuis ``since`` ou sur ``ids``."""
+        if ids is not None:
+            scope, params = "main.id = ANY(%(ids)s)", {'ids': list(ids)}
+        elif since:
+            scope, params = "(main.write_date >= %(since)s OR related.write_date >= %(since)s)", {'since': since}
+        else:
+            scope, params = "TRUE", {}
+        self.env.cr.execute(query.format(scope=scope), params)
+        return self.env.cr.fetchall()
+
+    @api.model
+    def run_checks(self, since=None):
+        """
+        Exécute tous les contrôles (incrémentaux si ``since`` est donné) et met à jour
+        le rapport. Retourne ``{contrôle: nombre d'anomalies ouvertes}``.
+        """
+        self.env.flush_all()
+        now = fields.Datetime.now()
+        summary = {}
+        for check, (res_model, related_model, expected_model, query) in self._get_check_queries().items():
+            rows = self._run_check(query, since=since)
+            open_issues = self.search([('check_type', '=', check), ('state', '=', 'open')])
+            if open_issues and since:
+                # Les anomalies ouvertes hors du périmètre incrémental sont revérifiées
+                rows = set(rows) | set(self._run_check(query, ids=set(open_issues.mapped('res_id'))))
+            found = {(res_id, related_id): expected_id for res_id, related_id, expected_id in rows}
+            self._upsert_issues(check, res_model, related_model, expected_model, found, now)
+            # Toutes les anomalies ouvertes ont été revérifiées : celles qui ne sont plus détectées sont résolues
+            open_issues.filtered(lambda issue: (issue.res_id, issue.related_id) not in found).write(
+                {'state': 'resolved'})
+            summary[check] = len(found)
+        _logger.info(f"Contrôle de cohérence des cadres de référence : {summary}")
+        return summary
+
+    @api.model
+    def _upsert_issues(self, check, res_model, related_model, expected_model, found, now):
+        if not found:
+            return
+        keys = list(found)
+        program_column = 'res_id' if res_model == 'work.program' else 'NULL::int'
+        hierarchy_column = 'res_id' if res_model == 'workflow.hierarchy' else 'NULL::int'
+        self.env.cr.execute(f"""
+            INSERT INTO workflow_consistency_issue (
+                check_type, res_model, res_id, work_program_id, hierarchy_id, related_model, related_id,
+                expected_model, expected_id, state, first_seen, last_seen,
+                create_uid, write_uid, create_date, write_date)
+            SELECT %(check)s, %(res_model)s, res_id, {program_column}, {hierarchy_column}, %(related_model)s,
+                   related_id, %(expected_model)s, expected_id, 'open', %(now)s, %(now)s,
+                   %(uid)s, %(uid)s, %(now)s, %(now)s
+              FROM unnest(%(res_ids)s::int[], %(related_ids)s::int[], %(expected_ids)s::int[])
+                   AS found(res_id, related_id, expected_id)
+            ON CONFLICT (check_type, res_id, related_id) DO UPDATE
+               SET state = 'open', expected_id = EXCLUDED.expected_id, last_seen = EXCLUDED.last_seen,
+                   first_seen = CASE WHEN workflow_consistency_issue.state = 'open'
+                                     THEN workflow_consistency_issue.first_seen ELSE EXCLUDED.first_seen END,
+                   write_date = EXCLUDED.write_date
+        """, {
+            'check': check,
+            'res_model': res_model,
+            'related_model': related_model,
+            'expected_model': expected_model,
+            'res_ids': [key[0] for key in keys],
+            'related_ids': [key[1] for key in keys],
+            'expected_ids': [found[key] for key in keys],
+            'now': now,
+            'uid': self.env.uid,
+        })
+        self.invalidate_model()
+
+    @api.model
+    def _get_change_horizon(self):
+        """
+        Début (UTC) de la plus ancienne transaction ouverte sur la base, lu par un
+        curseur neuf. ``write_date`` vaut le début de la transaction qui écrit : une
+        écriture validée après cette lecture a une date postérieure ou égale.
+        """
+        with self.pool.cursor() as cr:
+            cr.execute("""
+                SELECT COALESCE(min(xact_start), now()) at time zone 'UTC'
+                  FROM pg_stat_activity
+                 WHERE datname = current_database() AND xact_start IS NOT NULL AND pid != pg_backend_pid()
+            """)
+            return cr.fetchone()[0]
+
+    @api.model
+    def _cron_check(self):
+        """
+        Passage incrémental : seuls les enregistrements modifiés depuis le dernier passage sont contrôlés.
+
+        Le passage suivant reprend à l'horizon des transactions ouvertes, lu avant
+        l'instantané des contrôles, et non à l'heure de début : une transaction
+        commencée plus tôt et validée pendant le passage est contrôlée la fois suivante.
+        """
+        if not getattr(threading.current_thread(), 'testing', False):
+            # Les contrôles liront un instantané postérieur à l'horizon
+            self.env.cr.commit()
+        horizon = self._get_change_horizon()
+        params = self.env['ir.config_parameter'].sudo()
+        since = params.get_param(self._CONFIG_LAST_RUN)
+        self.run_checks(since=fields.Datetime.to_datetime(since) if since else None)
+        params.set_param(self._CONFIG_LAST_RUN, fields.Datetime.to_string(horizon))
+        if params.get_param(self._CONFIG_AUTO_REPAIR, 'False').lower() in ('1', 'true'):
+            self.search([('state', '=', 'open')])._repair()
+
+    # ------------------------------------------------------------------
+    # Réparation
+    # ------------------------------------------------------------------
+    def _repair(self):
+        """
+        Applique la correction proposée, par lot et par contrôle :
+
+        - procédure (resp. formulation) hors de l'activité (resp. procédure) du programme :
+          l'activité (resp. procédure) manquante est renseignée, sinon la référence
+          fautive est retirée du programme ;
+        - livrable hors de l'activité du programme : le lien est retiré ;
+        - élément de hiérarchie sans son parent : le parent est ajouté au sac.
+        """
+        issues = self.filtered(lambda issue: issue.state == 'open')
+        Program = self.env['work.program']
+        Hierarchy = self.env['workflow.hierarchy']
+        for check in set(issues.mapped('check_type')):
+            check_issues = issues.filtered(lambda issue: issue.check_type == check)
+            if check in ('program_procedure', 'program_task'):
+                parent_field, child_fields = (
+                    ('activity_id', ['procedure_id', 'task_description_id']) if check == 'program_procedure'
+                    else ('procedure_id', ['task_description_id']))
+                programs = check_issues.work_program_id
+                fill = {}
+                clear = Program.browse()
+                for issue in check_issues:
+                    if not issue.work_program_id[parent_field] and issue.expected_id:
+                        fill.setdefault(issue.expected_id, Program.browse())
+                        fill[issue.expected_id] |= issue.work_program_id
+                    else:
+                        clear |= issue.work_program_id
+                for expected_id, records in fill.items():
+                    records.write({parent_field: expected_id})
+                if clear:
+                    clear.write(dict.fromkeys(child_fields, False))
+                _logger.info(f"Réparation {check} : {len(programs)} programme(s)")
+            elif check == 'program_deliverable':
+                field = Program._fields['deliverable_ids']
+                self.env.cr.execute(f"""
+                    DELETE FROM {field.relation} rel
+                     USING unnest(%s::int[], %s::int[]) AS fix(res_id, related_id)
+                     WHERE rel.{field.column1} = fix.res_id AND rel.{field.column2} = fix.related_id
+                """, [check_issues.mapped('res_id'), check_issues.mapped('related_id')])
+                Program.invalidate_model(['deliverable_ids'])
+            else:
+                parents = Hierarchy._fields[self._HIERARCHY_CHECKS[check][2]]
+                self.env.cr.execute(f"""
+                    INSERT INTO {parents.relation} ({parents.column1}, {parents.column2})
+                    SELECT res_id, expected_id FROM unnest(%s::int[], %s::int[]) AS fix(res_id, expected_id)
+                    ON CONFLICT DO NOTHING
+                """, [check_issues.mapped('res_id'), check_issues.mapped('expected_id')])
+                Hierarchy.invalidate_model([parents.name])
+        issues.write({'state': 'repaired'})
+        return len(issues)
+
+    def action_repair(self):
+        if not self.env.user.has_group('workprogramm.workprogramm_group_admin'):
+            raise UserError(_("Seuls les administrateurs des workflows peuvent réparer les incohérences."))
+        repaired = self._repair()
+        return {
+            'type': 'ir.actions.client',
+            'tag': 'display_notification',
+            'params': {
+                'title': _("Réparation terminée"),
+                'message': _("%s incohérence(s) réparée(s).") % repaired,
+                'type': 'success',
+                'next': {'type': 'ir.actions.client', 'tag': 'reload'},
+            },
+        }
+
+    def action_run_full_check(self):
+        self.run_checks()
+        return {'type': 'ir.actions.client', 'tag': 'reload'}
@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+from odoo import models, api, fields, _
+from odoo.exceptions import UserError
+
+
+class WorkflowNameDedupWizard(models.TransientModel):
+    """Assistant de fusion des doublons de nom dans les cadres de référence."""
+    _name = 'workflow.name.dedup.wizard'
+    _description = 'Fusion des doublons de nom des cadres de référence'
+
+    DEDUP_MODELS = [
+        ('workflow.domain', 'Domaines'),
+        ('workflow.process', 'Processus'),
+        ('workflow.subprocess', 'Sous-processus'),
+        ('workflow.activity', 'Activités'),
+        ('workflow.procedure', 'Procédures'),
+        ('workflow.deliverable', 'Livrables'),
+        ('workflow.task.formulation', 'Formulations de tâches'),
+    ]
+
+    model_name = fields.Selection(DEDUP_MODELS, string='Modèle', required=True, default='workflow.domain')
+    duplicate_group_count = fields.Integer(string='Noms en doublon', compute='_compute_duplicates')
+    duplicate_record_count = fields.Integer(string='Enregistrements à fusionner', compute='_compute_duplicates')
+    preview = fields.Text(string='Aperçu', compute='_compute_duplicates')
+
+    @api.depends('model_name')
+    def _compute_duplicates(self):
+        for wizard in self:
+            groups = self.env[wizard.model_name]._get_name_duplicates() if wizard.model_name else []
+            wizard.duplicate_group_count = len(groups)
+            wizard.duplicate_record_count = sum(len(ids) - 1 for ids in groups)
+            names = self.env[wizard.model_name].browse([ids[0] for ids in groups[:50]]).mapped('name') if groups else []
+            wizard.preview = '\n'.join(
+                f"{name} : {len(ids)} enregistrements" for name, ids in zip(names, groups[:50]))
+
+    def action_merge(self):
+        self.ensure_one()
+        if not self.env.user.has_group('workprogramm.workprogramm_group_admin'):
+            raise UserError(_("Seuls les administrateurs des workflows peuvent fusionner des doublons."))
+        merged = self.env[self.model_name].sudo()._enforce_name_uniqueness()
+        return {
+            'type': 'ir.actions.client',
+            'tag': 'display_notification',
+            'params': {
+                'title': _("Fusion terminée"),
+                'message': _("%s doublon(s) fusionné(s).") % merged,
+                'type': 'success',
+                'next': {'type': 'ir.actions.act_window_close'},
+            },
+        }
@@ -0,0 +1,193 @@
+# -*- coding: utf-8 -*-
+import logging
+from collections import defaultdict
+
+from odoo import models, api, fields, tools, _
+from odoo.exceptions import UserError
+
+_logger = logging.getLogger(__name__)
+
+
+class WorkflowNameKeyMixin(models.AbstractModel):
+    """
+    Clé de nom normalisée (sans accents, en minuscules, espaces réduits) et indexée,
+    utilisée par les imports pour rapprocher « Procédure A  » de « procedure a ».
+
+    La clé est calculée en base par la fonction SQL ``workprogramm_name_key`` et
+    tenue à jour à chaque création ou renommage. Un nom est résolu d'abord à
+    l'identique, puis par sa clé ; à défaut, si le paramètre système
+    ``workprogramm.name_match_threshold`` (0 pour désactiver) est renseigné et
+    pg_trgm disponible, par similarité trigramme au-dessus de ce seuil. Un nom
+    correspondant à plusieurs enregistrements est signalé comme ambigu.
+    """
+    _name = 'workflow.name.key.mixin'
+    _description = 'Clé de nom normalisée pour les imports'
+
+    _NAME_KEY_FUNCTION = 'workprogramm_name_key'
+    _CONFIG_MATCH_THRESHOLD = 'workprogramm.name_match_threshold'
+
+    name_key = fields.Char(string='Clé de nom', index=True, readonly=True, copy=False,
+                           help="Nom sans accents, en minuscules et aux espaces réduits, utilisé pour les imports.")
+
+    def init(self):
+        super().init()
+        if self._abstract:
+            return
+        self._init_name_key_function()
+        self.env.cr.execute(f"""
+            UPDATE "{self._table}" SET name_key = {self._NAME_KEY_FUNCTION}(name)
+             WHERE name_key IS DISTINCT FROM {self._NAME_KEY_FUNCTION}(name)
+        """)
+        if getattr(self.pool, 'has_trigram', False):
+            tools.create_index(self.env.cr, f'{self._table}_name_key_trgm_index', self._table,
+                               ['name_key gin_trgm_ops'], method='gin')
+
+    @api.model
+    def _init_name_key_function(self):
+        """Crée (ou met à jour) la fonction de normalisation, sans accents si unaccent est disponible."""
+        cr = self.env.cr
+        try:
+            with cr.savepoint(flush=False):
+                cr.execute("CREATE EXTENSION IF NOT EXISTS unaccent")
+        except Exception as e:
+            _logger.warning(f"Extension unaccent indisponible, clés de nom sans suppression des accents : {e}")
+        cr.execute("SELECT 1 FROM pg_extension WHERE extname = 'unaccent'")
+        value = "unaccent(value)" if cr.fetchone() else "value"
+        cr.execute(f"""
+            CREATE OR REPLACE FUNCTION {self._NAME_KEY_FUNCTION}(value text) RETURNS text AS $$
+                SELECT NULLIF(lower(btrim(regexp_replace({value}, '\\s+', ' ', 'g'))), '')
+            $$ LANGUAGE sql STABLE
+        """)
+
+    def _update_name_key(self):
+        if not self:
+            return
+        self.flush_recordset(['name'])
+        self.env.cr.execute(f"""
+            UPDATE "{self._table}" SET name_key = {self._NAME_KEY_FUNCTION}(name) WHERE id = ANY(%s)
+        """, [self.ids])
+        self.invalidate_recordset(['name_key'])
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        records = super().create(vals_list)
+        records._update_name_key()
+        return records
+
+    def write(self, vals):
+        res = super().write(vals)
+        if 'name' in vals:
+            self._update_name_key()
+        return res
+
+    # ------------------------------------------------------------------
+    # Résolution des noms
+    # ------------------------------------------------------------------
+    @api.model
+    def _get_name_keys(self, names):
+        """{nom: clé} calculé en base, en une requête."""
+        names = [name for name in set(names) if name]
+        if not names:
+            return {}
+        self.env.cr.execute(f"SELECT name, {self._NAME_KEY_FUNCTION}(name) FROM unnest(%s::text[]) AS input(name)",
+                            [names])
+        return dict(self.env.cr.fetchall())
+
+    @api.model
+    def _get_match_threshold(self):
+        value = self.env['ir.config_parameter'].sudo().get_param(self._CONFIG_MATCH_THRESHOLD, '0')
+        try:
+            return min(max(float(value), 0.0), 1.0)
+        except ValueError:
+            return 0.0
+
+    @api.model
+    def _resolve_similar_names(self, name_keys, threshold):
+        """{nom: id ou tuple d'ids} par similarité trigramme des clés, en une requête."""
+        self.env.cr.execute("SELECT set_config('pg_trgm.similarity_threshold', %s, true)", [str(threshold)])
+        self.env.cr.execute(f"""
+            SELECT input.name, match.id, match.score
+              FROM unnest(%s::text[], %s::text[]) AS input(name, key)
+             CROSS JOIN LATERAL (
+                    SELECT t.id, similarity(t.name_key, input.key) AS score
+                      FROM "{self._table}" t
+                     WHERE t.name_key %% input.key
+                     ORDER BY score DESC, t.id
+                     LIMIT 2
+                   ) AS match
+             ORDER BY input.name, match.score DESC, match.id
+        """, [list(name_keys), list(name_keys.values())])
+        rows = self.env.cr.fetchall()
+        # Les règles d'accès s'appliquent aussi aux correspondances approchées
+        allowed = set(self.search([('id', 'in', list({row[1] for row in rows}))]).ids)
+        candidates = defaultdict(list)
+        for name, record_id, score in rows:
+            if record_id in allowed:
+                candidates[name].append((score, record_id))
+        result = {}
+        for name, matches in candidates.items():
+            if len(matches) > 1 and matches[0][0] == matches[1][0]:
+                result[name] = tuple(record_id for score, record_id in matches)
+            else:
+                result[name] = matches[0][1]
+        return result
+
+    @api.model
+    def _resolve_names(self, names):
+        """
+        Résout des noms en ids, en bloc : ``{nom: id}``, ou ``{nom: (id, id, ...)}``
+        lorsque le nom correspond à plusieurs enregistrements sans correspondance
+        exacte. Les noms introuvables sont absents du résultat.
+        """
+        names = {name for name in names if name}
+        if not names:
+            return {}
+        result = {}
+        if self._name in self.env['workflow.reference.cache'].CACHED_MODELS:
+            result.update(self.env['workflow.reference.cache'].get_ids(self._name, names))
+        missing = names - set(result)
+        if not missing:
+            return result
+
+        name_keys = {name: key for name, key in self._get_name_keys(missing).items() if key}
+        self.flush_model(['name', 'name_key'])
+        records_by_key = defaultdict(list)
+        for record in self.search_read([('name_key', 'in', list(set(name_keys.values())))],
+                                       ['name', 'name_key'], order='id'):
+            records_by_key[record['name_key']].append(record)
+        for name, key in name_keys.items():
+            records = records_by_key.get(key)
+            if not records:
+                continue
+            exact = [record['id'] for record in records if record['name'] == name]
+            if exact or len(records) == 1:
+                result[name] = (exact or [records[0]['id']])[0]
+            else:
+                result[name] = tuple(record['id'] for record in records)
+
+        threshold = self._get_match_threshold()
+        unresolved = {name: key for name, key in name_keys.items() if name not in result}
+        if unresolved and threshold and getattr(self.pool, 'has_trigram', False):
+            result.update(self._resolve_similar_names(unresolved, threshold))
+        return result
+
+    @api.model
+    def _check_ambiguous_names(self, name_map, names):
+        """Lève une erreur listant les noms de ``names`` résolus vers plusieurs enregistrements."""
+        ambiguous = [name for name in names if isinstance(name_map.get(name), tuple)]
+        if ambiguous:
+            raise UserError(_("Correspondance ambiguë (%(model)s) : %(names)s") % {
+                'model': self._description,
+                'names': '; '.join(f"« {name} » → {', '.join(str(record_id) for record_id in name_map[name])}"
+                                   for name in ambiguous),
+            })
+
+
+class HrEmployeeNameKey(models.Model):
+    _name = 'hr.employee'
+    _inherit = ['hr.employee', 'workflow.name.key.mixin']
+
+
+class HrDepartmentNameKey(models.Model):
+    _name = 'hr.department'
+    _inherit = ['hr.department', 'workflow.name.key.mixin']
@@ -0,0 +1,209 @@
+# -*- coding: utf-8 -*-
+import logging
+import threading
+
+from odoo import models, api, SUPERUSER_ID
+from odoo.tools import LRU
+
+_logger = logging.getLogger(__name__)
+
+
+class WorkflowReferenceCache(models.AbstractModel):
+    """
+    Cache partagé nom -> id et id -> nom des modèles de référence workflow.*.
+
+    Chaque worker garde, par registre (donc par base) et par modèle, deux LRU
+    bornés. Après chaque commit créant, renommant ou supprimant un enregistrement
+    de référence, la séquence PostgreSQL ``workflow_reference_cache_seq`` est
+    incrémentée : les autres workers comparent sa valeur à celle de leur cache et
+    le vident en cas d'écart. Une transaction ayant des modifications non validées
+    sur un modèle lit directement la base pour ce modèle.
+
+    La version est lue au premier accès de la transaction et gardée dans
+    ``cr.cache`` ; les noms manquants sont lus par un curseur neuf, ouvert après
+    cette lecture, de sorte qu'une valeur rangée ne précède jamais une
+    modification déjà signalée. Une transaction dont la version est dépassée lit
+    la base sans alimenter le cache.
+
+    Le cache est partagé entre utilisateurs : seuls les droits d'accès au modèle
+    sont vérifiés, les règles d'enregistrement ne sont pas appliquées (celles des
+    modèles workflow.* ouvrent tous les enregistrements en lecture). Un modèle
+    soumis à des règles restrictives ne doit pas figurer dans CACHED_MODELS.
+    """
+    _name = 'workflow.reference.cache'
+    _description = 'Cache des noms des modèles de référence du workflow'
+
+    _SEQUENCE = 'workflow_reference_cache_seq'
+    CACHED_MODELS = (
+        'workflow.domain',
+        'workflow.process',
+        'workflow.subprocess',
+        'workflow.activity',
+        'workflow.procedure',
+        'workflow.deliverable',
+        'workflow.task.formulation',
+    )
+    # Nombre maximal d'entrées par modèle et par sens de correspondance
+    _LRU_SIZE = 8192
+    _lock = threading.RLock()
+
+    def init(self):
+        self.env.cr.execute(f"CREATE SEQUENCE IF NOT EXISTS {self._SEQUENCE}")
+
+    # ------------------------------------------------------------------
+    # Lecture
+    # ------------------------------------------------------------------
+    @api.model
+    def _get_db_version(self):
+        self.env.cr.execute(f"SELECT last_value, is_called FROM {self._SEQUENCE}")
+        last_value, is_called = self.env.cr.fetchone()
+        return last_value if is_called else 0
+
+    @api.model
+    def _get_transaction_version(self):
+        """Version lue au premier accès de la transaction, oubliée à sa fin."""
+        cr = self.env.cr
+        if 'workflow_reference_cache_version' not in cr.cache:
+            cr.cache['workflow_reference_cache_version'] = self._get_db_version()
+
+            def forget_version():
+                cr.cache.pop('workflow_reference_cache_version', None)
+
+            cr.postcommit.add(forget_version)
+            cr.postrollback.add(forget_version)
+        return cr.cache['workflow_reference_cache_version']
+
+    @api.model
+    def _get_model_cache(self, model_name):
+        """Caches {'name': LRU, 'id': LRU} du modèle, ou None si la lecture doit contourner le cache."""
+        if model_name in self.env.cr.postcommit.data.get('workflow_reference_cache', ()):
+            return None
+        version = self._get_transaction_version()
+        with self._lock:
+            cache = getattr(self.pool, '_workflow_reference_cache', None)
+            if cache is not None and cache['version'] > version:
+                return None
+            if cache is None or cache['version'] != version:
+                cache = self.pool._workflow_reference_cache = {'version': version, 'models': {}}
+            models_cache = cache['models']
+            if model_name not in models_cache:
+                models_cache[model_name] = {'name': LRU(self._LRU_SIZE), 'id': LRU(self._LRU_SIZE)}
+            return models_cache[model_name]
+
+    @api.model
+    def _fetch(self, model_cache, query, params):
+        """
+        Lignes (id, nom) de la requête : par la transaction courante si le cache est
+        contourné, sinon par un curseur neuf, puis rangées dans le cache.
+        """
+        if model_cache is None:
+            self.env.cr.execute(query, params)
+            return self.env.cr.fetchall()
+        with self.pool.cursor() as cr:
+            cr.execute(query, params)
+            rows = cr.fetchall()
+        self._store(model_cache, rows)
+        return rows
+
+    @api.model
+    def _store(self, model_cache, rows):
+        for record_id, name in rows:
+            model_cache['id'][record_id] = name
+            # En cas de doublon, le plus petit id l'emporte (lignes triées par id)
+            if model_cache['name'].get(name) is None:
+                model_cache['name'][name] = record_id
+
+    @api.model
+    def get_ids(self, model_name, names):
+        """Résout des noms en ids : {nom: id}. Les noms absents du cache sont lus en une requête."""
+        self.env[model_name].check_access_rights('read')
+        names = {name for name in names if name}
+        if not names:
+            return {}
+        model_cache = self._get_model_cache(model_name)
+        result = {}
+        if model_cache is not None:
+            for name in names:
+                record_id = model_cache['name'].get(name)
+                if record_id is not None:
+                    result[name] = record_id
+        missing = names - set(result)
+        if missing:
+            self.env[model_name].flush_model(['name'])
+            rows = self._fetch(model_cache, f"SELECT id, name FROM {self.env[model_name]._table} "
+                                            f"WHERE name IN %s ORDER BY id", [tuple(missing)])
+            for record_id, name in rows:
+                result.setdefault(name, record_id)
+        return result
+
+    @api.model
+    def get_names(self, model_name, ids):
+        """Noms d'affichage d'ids existants : {id: nom}. Les ids inexistants sont absents du résultat."""
+        self.env[model_name].check_access_rights('read')
+        ids = {record_id for record_id in ids if record_id}
+        if not ids:
+            return {}
+        model_cache = self._get_model_cache(model_name)
+        result = {}
+        if model_cache is not None:
+            for record_id in ids:
+                name = model_cache['id'].get(record_id)
+                if name is not None:
+                    result[record_id] = name
+        missing = ids - set(result)
+        if missing:
+            self.env[model_name].flush_model(['name'])
+            rows = self._fetch(model_cache, f"SELECT id, name FROM {self.env[model_name]._table} "
+                                            f"WHERE id IN %s ORDER BY id", [tuple(missing)])
+            result.update(rows)
+        return result
+
+    # ------------------------------------------------------------------
+    # Invalidation
+    # ------------------------------------------------------------------
+    @api.model
+    def _notify_changes(self, model_name):
+        """Enregistre un modèle modifié ; les caches sont invalidés après le commit."""
+        cr = self.env.cr
+        pending = cr.postcommit.data.get('workflow_reference_cache')
+        if pending is None:
+            pending = cr.postcommit.data['workflow_reference_cache'] = set()
+            registry = self.pool
+
+            def invalidate_reference_cache():
+                cr.postcommit.data.pop('workflow_reference_cache', None)
+                with registry.cursor() as new_cr:
+                    env = api.Environment(new_cr, SUPERUSER_ID, {})
+                    env['workflow.reference.cache']._bump_version()
+
+            cr.postcommit.add(invalidate_reference_cache)
+        pending.add(model_name)
+
+    @api.model
+    def _bump_version(self):
+        with self._lock:
+            self.env.cr.execute(f"SELECT nextval('{self._SEQUENCE}')")
+            self.pool._workflow_reference_cache = None
+
+
+class WorkflowReferenceCacheMixin(models.AbstractModel):
+    """Invalide le cache des noms de référence quand les enregistrements changent."""
+    _name = 'workflow.reference.cache.mixin'
+    _description = 'Invalidation du cache des noms de référence'
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        records = super().create(vals_list)
+        self.env['workflow.reference.cache']._notify_changes(self._name)
+        return records
+
+    def write(self, vals):
+        res = super().write(vals)
+        if 'name' in vals:
+            self.env['workflow.reference.cache']._notify_changes(self._name)
+        return res
+
+    def unlink(self):
+        res = super().unlink()
+        self.env['workflow.reference.cache']._notify_changes(self._name)
+        return res
@@ -0,0 +1,312 @@
+# -*- coding: utf-8 -*-
+import json
+import logging
+import os
+import re
+import time
+import tracemalloc
+from datetime import datetime
+
+from werkzeug.datastructures import MultiDict
+
+from odoo import release
+from odoo.tests import HttpCase, tagged
+
+from ..controllers.main import WorkProgramController
+
+_logger = logging.getLogger(__name__)
+
+
+@tagged('workprogramm_bench', '-standard', 'post_install', '-at_install')
+class TestWorkProgramBenchmark(HttpCase):
+    """
+    Banc de mesure reproductible des chemins critiques du module.
+
+    Le test génère un jeu de données synthétique à l'échelle demandée (profondeur du
+    catalogue, employés, programmes), chronomètre chaque chemin (imports, formulaire
+    public, soumission, vue liste, onchanges de cascade) et rapporte pour chacun le
+    nombre de requêtes SQL, la durée et le pic mémoire Python. Tout est annulé en
+    fin de test. Exclu des tests standard, à lancer sur une base dédiée ::
+
+        WORKPROGRAMM_BENCH_SCALE='{"programs": 50000}' WORKPROGRAMM_BENCH_OUTPUT=/tmp/bench.json \\
+            odoo-bin -d bench -u workprogramm --test-tags workprogramm_bench --stop-after-init
+
+    Le rapport JSON est journalisé, et écrit dans ``WORKPROGRAMM_BENCH_OUTPUT`` si la
+    variable est définie, pour comparer deux versions.
+    """
+
+    DEFAULT_SCALE = {
+        'domains': 5,
+        'processes_per_domain': 4,
+        'subprocesses_per_process': 3,
+        'activities_per_subprocess': 5,
+        'procedures_per_activity': 3,
+        'formulations_per_procedure': 3,
+        'deliverables_per_activity': 2,
+        'departments': 10,
+        'employees': 200,
+        'programs': 10000,
+        'import_rows': 200,
+        'iterations': 5,
+    }
+    _PREFIX = 'BENCH'
+
+    @classmethod
+    def _get_scale(cls):
+        return dict(cls.DEFAULT_SCALE, **json.loads(os.environ.get('WORKPROGRAMM_BENCH_SCALE') or '{}'))
+
+    # ------------------------------------------------------------------
+    # Jeu de données
+    # ------------------------------------------------------------------
+    def _create_level(self, model_name, parents, per_parent, parent_field, label):
+        """Crée ``per_parent`` enfants par parent (ou ``per_parent`` racines) ; retourne les enregistrements."""
+        vals_list = []
+        for parent in parents or [False]:
+            for index in range(per_parent):
+                vals = {'name': f"{self._PREFIX} {label} {parent.id if parent else ''}-{index}"}
+                if parent:
+                    vals[parent_field] = parent.id
+                vals_list.append(vals)
+        return self.env[model_name].create(vals_list)
+
+    def _generate_dataset(self, scale):
+        domains = self._create_level('workflow.domain', None, scale['domains'], False, 'Domaine')
+        processes = self._create_level('workflow.process', domains, scale['processes_per_domain'], 'domain_id', 'Processus')
+        subprocesses = self._create_level('workflow.subprocess', processes, scale['subprocesses_per_process'],
+                                          'process_id', 'Sous-processus')
+        activities = self._create_level('workflow.activity', subprocesses, scale['activities_per_subprocess'],
+                                        'sub_process_id', 'Activité')
+        procedures = self._create_level('workflow.procedure', activities, scale['procedures_per_activity'],
+                                        'activity_id', 'Procédure')
+        formulations = self._create_level('workflow.task.formulation', procedures, scale['formulations_per_procedure'],
+                                          'procedure_id', 'Formulation')
+        deliverables = self._create_level('workflow.deliverable', activities, scale['deliverables_per_activity'],
+                                          'activity_id', 'Livrable')
+        departments = self.env['hr.department'].create([
+            {'name': f"{self._PREFIX} Département {index}", 'dpt_type': 'external' if index % 3 == 0 else 'internal'}
+            for index in range(scale['departments'])
+        ])
+        employees = self.env['hr.employee'].create([
+            {'name': f"{self._PREFIX} Employé {index}", 'department_id': departments[index % len(departments)].id}
+            for index in range(scale['employees'])
+        ])
+        self.env.flush_all()
+        self.env.cr.execute("""
+            INSERT INTO work_program (name, work_programm_department_id, responsible_id, activity_id, procedure_id,
+                                      task_description_id, status, priority, complexity, my_week_of,
+                                      duration_effort, completion_percentage, nb_postpones,
+                                      create_uid, write_uid, create_date, write_date)
+            SELECT %(prefix)s || '-' || n,
+                   (%(departments)s::int[])[1 + n %% array_length(%(departments)s::int[], 1)],
+                   (%(employees)s::int[])[1 + (n / 7) %% array_length(%(employees)s::int[], 1)],
+                   f.activity_id, f.procedure_id, f.id,
+                   (ARRAY['draft', 'ongoing', 'done', 'cancelled'])[1 + n %% 4],
+                   (ARRAY['low', 'medium', 'high'])[1 + n %% 3],
+                   (ARRAY['low', 'medium', 'high'])[1 + (n / 3) %% 3],
+                   date_trunc('week', now())::date - 7 * (n %% 52),
+                   1 + n %% 16, (n %% 11) * 10, n %% 3,
+                   %(uid)s, %(uid)s, now() at time zone 'UTC', now() at time zone 'UTC'
+              FROM generate_series(1, %(nb)s) AS n
+              JOIN LATERAL (
+                    SELECT id, procedure_id, activity_id
+                      FROM workflow_task_formulation
+                     WHERE id = (%(formulations)s::int[])[1 + n %% array_length(%(formulations)s::int[], 1)]
+                   ) AS f ON TRUE
+        """, {
+            'prefix': self._PREFIX,
+            'departments': departments.ids,
+            'employees': employees.ids,
+            'formulations': formulations.ids,
+            'nb': scale['programs'],
+            'uid': self.env.uid,
+        })
+        self.env['work.program.kpi']._rebuild()
+        self.env.cr.execute("ANALYZE work_program")
+        return {
+            'activities': activities,
+            'procedures': procedures,
+            'formulations': formulations,
+            'deliverables': deliverables,
+            'departments': departments,
+            'employees': employees,
+        }
+
+    # ------------------------------------------------------------------
+    # Mesure
+    # ------------------------------------------------------------------
+    def _measure(self, func, iterations=1):
+        """Exécute ``func`` et retourne requêtes SQL, durée (ms) et pic mémoire Python (Kio)."""
+        self.env.flush_all()
+        self.env.invalidate_all()
+        queries_before = self.env.cr.sql_log_count
+        tracemalloc.start()
+        start = time.perf_counter()
+        try:
+            for __ in range(iterations):
+                func()
+            self.env.flush_all()
+        finally:
+            duration = time.perf_counter() - start
+            __, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+        return {
+            'iterations': iterations,
+            'queries': self.env.cr.sql_log_count - queries_before,
+            'wall_ms': round(duration * 1000, 2),
+            'wall_ms_per_call': round(duration * 1000 / iterations, 2),
+            'peak_memory_kib': round(peak / 1024, 1),
+        }
+
+    def _import_rows(self, dataset, nb_rows):
+        formulations = dataset['formulations']
+        employees = dataset['employees']
+        rows = []
+        for index in range(nb_rows):
+            formulation = formulations[index % len(formulations)]
+            rows.append({
+                'Task Description': formulation.name,
+                'Departments': dataset['departments'][index % len(dataset['departments'])].name,
+                'Activity': formulation.activity_id.name,
+                'Task Type (Procedure)': formulation.procedure_id.name,
+                'Task Deliverable(s)': ', '.join(formulation.activity_id.deliverable_ids.mapped('name')),
+                'Responsible': employees[index % len(employees)].name,
+                'Support': employees[(index + 1) % len(employees)].name,
+                'Month': 'january',
+                'Priority': 'medium',
+                'Status': 'ongoing',
+                '% of completion': '50',
+            })
+        return rows
+
+    def _hierarchy_rows(self, dataset, nb_rows):
+        activities = dataset['activities']
+        rows = []
+        for index in range(nb_rows):
+            activity = activities[index % len(activities)]
+            rows.append({
+                'name': f"{self._PREFIX} Hiérarchie {index}",
+                'domain': activity.domain_id.name,
+                'process': activity.process_id.name,
+                'sub_process': activity.sub_process_id.name,
+                'activity': activity.name,
+                'procedure': ', '.join(activity.procedure_ids.mapped('name')),
+                'deliverable': ', '.join(activity.deliverable_ids.mapped('name')),
+            })
+        return rows
+
+    def _submit_post(self, dataset, index=0):
+        formulation = dataset['formulations'][index % len(dataset['formulations'])]
+        return MultiDict([
+            ('project_id', ''),
+            ('activity_id', str(formulation.activity_id.id)),
+            ('procedure_id', str(formulation.procedure_id.id)),
+            ('task_description_id', str(formulation.id)),
+            ('responsible_id', str(dataset['employees'][index % len(dataset['employees'])].id)),
+            ('work_programm_department_id', str(dataset['departments'][0].id)),
+            ('support_ids', str(dataset['employees'][(index + 1) % len(dataset['employees'])].id)),
+            ('priority', 'medium'),
+            ('complexity', 'medium'),
+            ('duration_effort', '4'),
+            ('completion_percentage', '0'),
+        ])
+
+    def _measure_paths(self, dataset, scale):
+        Program = self.env['work.program']
+        iterations = scale['iterations']
+        controller = WorkProgramController()
+        import_rows = self._import_rows(dataset, scale['import_rows'])
+        hierarchy_rows = self._hierarchy_rows(dataset, scale['import_rows'])
+        activities = dataset['activities']
+        formulations = dataset['formulations']
+        onchange_spec = Program._onchange_spec()
+        tree_fields = list(Program.get_views([(False, 'tree')])['models'][Program._name])
+
+        def import_one_by_one():
+            for row in import_rows:
+                Program.import_work_program(row)
+
+        def import_hierarchy_one_by_one():
+            for row in hierarchy_rows:
+                self.env['workflow.hierarchy'].import_hierarchy(row)
+
+        def form_lookups():
+            lookup = self.env['work.program.lookup'].sudo()
+            for model_key in lookup.LOOKUP_MODELS:
+                lookup.lookup(model_key, term=self._PREFIX[:2])
+
+        def submit(buffered):
+            def call():
+                post = self._submit_post(dataset)
+                vals = controller._prepare_work_program_vals(post, post)
+                if buffered:
+                    self.env['work.program.submission'].sudo().enqueue(vals)
+                else:
+                    Program.sudo().create(vals)
+            return call
+
+        def tree_search_read():
+            Program.search_read([], tree_fields, limit=80, order='id desc')
+            Program.search_count([])
+
+        def onchange_cascade():
+            for formulation in formulations[:50]:
+                Program.onchange({'activity_id': formulation.activity_id.id}, 'activity_id', onchange_spec)
+                Program.onchange({'activity_id': formulation.activity_id.id,
+                                  'procedure_id': formulation.procedure_id.id}, 'procedure_id', onchange_spec)
+
+        def cascade_subtree():
+            cascade = self.env['work.program.cascade']
+            for activity in activities[:50]:
+                cascade.get_activity_subtree(activity.id)
+
+        return {
+            'import_work_program': self._measure(import_one_by_one),
+            'import_work_programs': self._measure(lambda: Program.import_work_programs(import_rows)),
+            'import_hierarchy': self._measure(import_hierarchy_one_by_one),
+            'import_hierarchies': self._measure(lambda: self.env['workflow.hierarchy'].import_hierarchies(hierarchy_rows)),
+            'form_lookups': self._measure(form_lookups, iterations),
+            'submit_sync': self._measure(submit(False), iterations),
+            'submit_buffered': self._measure(submit(True), iterations),
+            'tree_search_read': self._measure(tree_search_read, iterations),
+            'onchange_cascade': self._measure(onchange_cascade, iterations),
+            'cascade_subtree': self._measure(cascade_subtree, iterations),
+        }
+
+    def _measure_http(self, dataset, iterations):
+        """Formulaire et soumission via HTTP, servis dans la transaction du test."""
+        responses = []
+
+        def form():
+            responses.append(self.url_open('/work_program/form', timeout=60))
+
+        result = {'http_form': self._measure(form, iterations)}
+        self.assertEqual(responses[-1].status_code, 200)
+        token = re.search(r'name="csrf_token" value="([^"]+)"', responses[-1].text)
+        if token:
+            data = dict(self._submit_post(dataset).items(), csrf_token=token.group(1))
+            result['http_submit'] = self._measure(
+                lambda: responses.append(self.url_open('/work_program/submit', data=data, timeout=60)))
+            self.assertEqual(responses[-1].status_code, 200)
+        return result
+
+    def test_benchmark(self):
+        scale = self._get_scale()
+        module = self.env['ir.module.module'].search([('name', '=', 'workprogramm')], limit=1)
+        report = {
+            'module_version': module.latest_version,
+            'odoo_version': release.version,
+            'database': self.env.cr.dbname,
+            'date': datetime.utcnow().isoformat(timespec='seconds'),
+            'scale': scale,
+        }
+        start = time.perf_counter()
+        dataset = self._generate_dataset(scale)
+        report['dataset_seconds'] = round(time.perf_counter() - start, 2)
+        report['results'] = self._measure_paths(dataset, scale)
+        report['results'].update(self._measure_http(dataset, scale['iterations']))
+
+        _logger.info(f"Mesures du module programme de travail : {json.dumps(report, default=str)}")
+        output_path = os.environ.get('WORKPROGRAMM_BENCH_OUTPUT')
+        if output_path:
+            with open(output_path, 'w', encoding='utf-8') as output:
+                json.dump(report, output, indent=2, ensure_ascii=False, default=str)
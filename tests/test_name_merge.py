@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+from odoo.tests import TransactionCase, tagged
+
+
+@tagged('post_install', '-at_install')
+class TestWorkflowNameMerge(TransactionCase):
+    """Fusion des doublons de nom : les champs dépendant du parent fusionné sont recalculés."""
+
+    def test_merge_subprocesses_recomputes_hierarchy(self):
+        domain_a, domain_b = self.env['workflow.domain'].create([
+            {'name': 'Domaine fusion A'}, {'name': 'Domaine fusion B'},
+        ])
+        process_a, process_b = self.env['workflow.process'].create([
+            {'name': 'Processus fusion A', 'domain_id': domain_a.id},
+            {'name': 'Processus fusion B', 'domain_id': domain_b.id},
+        ])
+        SubProcess = self.env['workflow.subprocess']
+        keep = SubProcess.create({'name': 'Sous-processus fusion', 'process_id': process_a.id})
+        # Doublon impossible à créer sous la contrainte, recréée par la fusion
+        self.env.cr.execute(f"ALTER TABLE {SubProcess._table} DROP CONSTRAINT IF EXISTS {SubProcess._table}_name_uniq")
+        duplicate = SubProcess.create({'name': 'Sous-processus fusion', 'process_id': process_b.id})
+        activity = self.env['workflow.activity'].create({'name': 'Activité fusion', 'sub_process_id': duplicate.id})
+        program = self.env['work.program'].create({'name': 'Programme fusion', 'activity_id': activity.id})
+        self.assertEqual(program.process_id, process_b)
+
+        SubProcess._enforce_name_uniqueness()
+
+        self.assertFalse(duplicate.exists())
+        self.assertEqual(activity.sub_process_id, keep)
+        self.assertEqual(activity.process_id, process_a)
+        self.assertEqual(activity.domain_id, domain_a)
+        self.assertEqual(activity.hierarchy_path, f'{domain_a.id}/{process_a.id}/{keep.id}/{activity.id}/')
+        self.assertEqual(program.sub_process_id, keep)
+        self.assertEqual(program.process_id, process_a)
+        self.assertEqual(program.hierarchy_path, activity.hierarchy_path)